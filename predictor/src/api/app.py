@@ -4,12 +4,16 @@ import pandas as pd
 import sys
 import os
 
-# Add the parent directory to Python path
+# Add the parent and API directories to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models.recommendations import RecommendationEngine
+from models.cohort import CohortIndex
+from models.model_pool import ModelBundlePool, UnknownTenant
+from jobs import RecommendationJobs, JobQueueFull
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 import numpy as np
 
 # Configure logging
@@ -19,8 +23,127 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize recommendation engine
-engine = RecommendationEngine()
+# Initialize recommendation engine; PREDICTOR_OFFLINE=1 serves rule-based
+# recommendations without Gemini, PREDICTOR_CASCADE=1 predicts subject scores
+# with the calibrated early-exit cascades
+engine = RecommendationEngine(offline=os.getenv('PREDICTOR_OFFLINE') == '1',
+                              cascade=os.getenv('PREDICTOR_CASCADE') == '1')
+
+# Per-tenant model bundles (models/tenants/<tenant id>), loaded on demand
+model_pool = ModelBundlePool(
+    os.getenv('TENANT_MODEL_DIR', 'models/tenants'),
+    max_bytes=int(os.getenv('MODEL_POOL_MB', '512')) * 2 ** 20,
+    offline=engine.offline,
+    cascade=engine.use_cascade
+)
+
+def resolve_engine(tenant_id: str = None) -> RecommendationEngine:
+    """
+    Engine for a request's tenant; requests without a tenant use ``models/``.
+    
+    Raises:
+        UnknownTenant: If the tenant has no model bundle
+    """
+    return model_pool.get(tenant_id) if tenant_id else engine
+
+def request_engine() -> RecommendationEngine:
+    """Engine for the tenant named by the ``X-Tenant-ID`` header or ``?tenant=``."""
+    return resolve_engine(request.headers.get('X-Tenant-ID') or request.args.get('tenant'))
+
+# Sample profile used by the health check
+HEALTH_CHECK_SAMPLE = {
+    'current_cgpa': 7.5,
+    'education_level': 'btech2',
+    'study_style': 'visual',
+    'parent_education': 'bachelors',
+    'screen_time': 6,
+    'sleep_time': 7,
+    'ads_marks': 75,
+    'ads_attendance': 85,
+    'ads_interest': 8,
+    'ads_assignments': 78,
+    'ads_quizzes': 72,
+    'ads_participation': 80,
+    'ds_marks': 68,
+    'ds_attendance': 80,
+    'ds_interest': 7,
+    'ds_assignments': 70,
+    'ds_quizzes': 65,
+    'ds_participation': 75,
+    'am_marks': 82,
+    'am_attendance': 90,
+    'am_interest': 9,
+    'am_assignments': 85,
+    'am_quizzes': 80,
+    'am_participation': 88,
+    'java_marks': 70,
+    'java_attendance': 75,
+    'java_interest': 6,
+    'java_assignments': 72,
+    'java_quizzes': 68,
+    'java_participation': 70,
+    'dbms_marks': 77,
+    'dbms_attendance': 88,
+    'dbms_interest': 8,
+    'dbms_assignments': 80,
+    'dbms_quizzes': 75,
+    'dbms_participation': 82
+}
+
+def get_cohort_index(tenant_engine: RecommendationEngine) -> CohortIndex:
+    """
+    Cohort index built by ``src/models/cohort.py`` for an engine's models.
+    
+    The index is loaded with the engine, so tenant indexes are evicted
+    together with their model bundles.
+    
+    Raises:
+        FileNotFoundError: If the index has not been built
+    """
+    if tenant_engine.cohort_index is None:
+        raise FileNotFoundError("Cohort index not found. Please run src/models/cohort.py first.")
+    return tenant_engine.cohort_index
+
+# Background recommendation jobs, started on first use
+recommendation_jobs = None
+
+def get_recommendation_jobs() -> RecommendationJobs:
+    """Create the recommendation job store and worker pool once per process."""
+    global recommendation_jobs
+    if recommendation_jobs is None:
+        recommendation_jobs = RecommendationJobs(
+            engine.generate_subject_recommendations,
+            os.getenv('RECOMMENDATION_JOBS_DB', 'data/recommendation_jobs.sqlite'),
+            workers=int(os.getenv('RECOMMENDATION_JOB_WORKERS', '4')),
+            max_pending=int(os.getenv('RECOMMENDATION_JOB_QUEUE', '256')),
+            ttl=float(os.getenv('RECOMMENDATION_JOB_TTL', '3600'))
+        )
+    return recommendation_jobs
+
+def defer_recommendations(df: pd.DataFrame, tenant_engine: RecommendationEngine = None) -> Dict[str, Any]:
+    """
+    Predict scores now and queue the recommendations as a background job.
+    
+    Args:
+        df: Model input frame for one student
+        tenant_engine: Engine of the requesting tenant (default: ``models/``)
+        
+    Returns:
+        Dict: Predictions without recommendations, and the job id
+        
+    Raises:
+        JobQueueFull: If too many recommendation jobs are pending
+    """
+    tenant_engine = tenant_engine or engine
+    predictions = tenant_engine.subject_trajectories(df)
+    inputs = [prediction.pop('recommendation_inputs') for prediction in predictions]
+    job_id = get_recommendation_jobs().submit([prediction['subject'] for prediction in predictions], inputs)
+    for prediction in predictions:
+        prediction['recommendations'] = None
+    return {
+        'predictions': engine.format_predictions(predictions),
+        'job_id': job_id
+    }
 
 def validate_student_data(data: Dict[str, Any]) -> None:
     """
@@ -89,99 +212,338 @@ def validate_student_data(data: Dict[str, Any]) -> None:
         if not (1 <= data[f'{subject}_interest'] <= 10):
             raise ValueError(f"{subject.upper()} interest must be between 1 and 10")
 
+def build_student_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the model input frame from raw student records.
+    
+    Derived features missing from a record are computed, columns are put in
+    the expected order and every record is validated.
+    
+    Args:
+        records: Student data dictionaries
+        
+    Returns:
+        pd.DataFrame: One row per student
+        
+    Raises:
+        ValueError: If a record is incomplete or invalid
+    """
+    # Define the expected feature order
+    expected_features = [
+        'current_cgpa', 'education_level', 'study_style', 'parent_education',
+        'screen_time', 'sleep_time', 'study_efficiency', 'overall_attendance',
+        'overall_interest', 'overall_performance',
+        
+        # ADS features
+        'ads_marks', 'ads_attendance', 'ads_interest', 'ads_assignments',
+        'ads_quizzes', 'ads_participation', 'ads_performance',
+        'ads_improvement', 'ads_confidence', 'ads_trend',
+        
+        # DS features
+        'ds_marks', 'ds_attendance', 'ds_interest', 'ds_assignments',
+        'ds_quizzes', 'ds_participation', 'ds_performance',
+        'ds_improvement', 'ds_confidence', 'ds_trend',
+        
+        # AM features
+        'am_marks', 'am_attendance', 'am_interest', 'am_assignments',
+        'am_quizzes', 'am_participation', 'am_performance',
+        'am_improvement', 'am_confidence', 'am_trend',
+        
+        # Java features
+        'java_marks', 'java_attendance', 'java_interest', 'java_assignments',
+        'java_quizzes', 'java_participation', 'java_performance',
+        'java_improvement', 'java_confidence', 'java_trend',
+        
+        # DBMS features
+        'dbms_marks', 'dbms_attendance', 'dbms_interest', 'dbms_assignments',
+        'dbms_quizzes', 'dbms_participation', 'dbms_performance',
+        'dbms_improvement', 'dbms_confidence', 'dbms_trend'
+    ]
+    
+    # Convert to DataFrame with consistent feature order
+    df = pd.DataFrame(records)
+    
+    # Calculate derived features if not provided
+    subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+    
+    if 'study_efficiency' not in df.columns:
+        # Same definition as training (DataPreprocessor.create_features)
+        df['study_efficiency'] = (df['sleep_time'] / (df['screen_time'] + 1)) * 10
+    
+    if 'overall_attendance' not in df.columns:
+        df['overall_attendance'] = df[[f'{s}_attendance' for s in subjects]].mean(axis=1)
+    
+    if 'overall_interest' not in df.columns:
+        df['overall_interest'] = df[[f'{s}_interest' for s in subjects]].mean(axis=1)
+    
+    if 'overall_performance' not in df.columns:
+        df['overall_performance'] = df[[f'{s}_marks' for s in subjects]].mean(axis=1)
+    
+    # Calculate subject-specific features if not provided
+    for subject in subjects:
+        if f'{subject}_performance' not in df.columns:
+            df[f'{subject}_performance'] = df[f'{subject}_marks']
+        
+        if f'{subject}_improvement' not in df.columns:
+            df[f'{subject}_improvement'] = 0
+        
+        if f'{subject}_confidence' not in df.columns:
+            df[f'{subject}_confidence'] = (
+                df[f'{subject}_attendance'] * 0.4 +
+                df[f'{subject}_interest'] * 10 * 0.3 +
+                (df[f'{subject}_marks'] / 100) * 30
+            )
+        
+        if f'{subject}_trend' not in df.columns:
+            df[f'{subject}_trend'] = 0
+    
+    # Ensure all expected features are present
+    missing_features = [f for f in expected_features if f not in df.columns]
+    if missing_features:
+        raise ValueError(f"Missing required features: {', '.join(missing_features)}")
+    
+    # Reorder columns to match expected feature order
+    df = df[expected_features]
+    
+    # Validate input data
+    for record in df.to_dict('records'):
+        validate_student_data(record)
+    
+    return df
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     try:
+        tenant_engine = request_engine()
         # Get student data from request
         student_data = request.json
         
-        # Define the expected feature order
-        expected_features = [
-            'current_cgpa', 'education_level', 'study_style', 'parent_education',
-            'screen_time', 'sleep_time', 'study_efficiency', 'overall_attendance',
-            'overall_interest', 'overall_performance',
-            
-            # ADS features
-            'ads_marks', 'ads_attendance', 'ads_interest', 'ads_assignments',
-            'ads_quizzes', 'ads_participation', 'ads_performance',
-            'ads_improvement', 'ads_confidence', 'ads_trend',
-            
-            # DS features
-            'ds_marks', 'ds_attendance', 'ds_interest', 'ds_assignments',
-            'ds_quizzes', 'ds_participation', 'ds_performance',
-            'ds_improvement', 'ds_confidence', 'ds_trend',
-            
-            # AM features
-            'am_marks', 'am_attendance', 'am_interest', 'am_assignments',
-            'am_quizzes', 'am_participation', 'am_performance',
-            'am_improvement', 'am_confidence', 'am_trend',
-            
-            # Java features
-            'java_marks', 'java_attendance', 'java_interest', 'java_assignments',
-            'java_quizzes', 'java_participation', 'java_performance',
-            'java_improvement', 'java_confidence', 'java_trend',
-            
-            # DBMS features
-            'dbms_marks', 'dbms_attendance', 'dbms_interest', 'dbms_assignments',
-            'dbms_quizzes', 'dbms_participation', 'dbms_performance',
-            'dbms_improvement', 'dbms_confidence', 'dbms_trend'
-        ]
+        df = build_student_frame([student_data])
+        
+        if request.args.get('recommendations') == 'deferred':
+            deferred = defer_recommendations(df, tenant_engine)
+            return jsonify({
+                'success': True,
+                **deferred,
+                'status_url': f"/api/recommendations/{deferred['job_id']}"
+            }), 202
+        
+        # Generate predictions
+        predictions = tenant_engine.generate_predictions(df)
+        
+        return jsonify({
+            'success': True,
+            'predictions': predictions
+        })
+        
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+        
+    except ValueError as e:
+        logger.warning(f"Invalid input data: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    except JobQueueFull as e:
+        logger.warning(f"Recommendation queue full: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "Too many pending recommendation jobs, please retry later"
+        }), 503
+        
+    except Exception as e:
+        logger.error(f"Error generating predictions: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "An unexpected error occurred while generating predictions"
+        }), 500
+
+@app.route('/api/recommendations/<job_id>', methods=['GET'])
+def recommendations(job_id):
+    """Status of a deferred recommendation job, with the recommendations once done."""
+    try:
+        job = get_recommendation_jobs().get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': "Unknown or expired job id"
+            }), 404
         
-        # Convert to DataFrame with consistent feature order
-        df = pd.DataFrame([student_data])
+        return jsonify({
+            'success': True,
+            **job
+        })
         
-        # Calculate derived features if not provided
-        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+    except Exception as e:
+        logger.error(f"Error reading recommendation job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "An unexpected error occurred while reading the recommendation job"
+        }), 500
+
+@app.route('/api/explain', methods=['POST'])
+def explain():
+    """
+    Explain model predictions with per-subject feature contributions.
+    
+    Accepts one student object, or ``{"students": [...]}`` for a batch.
+    ``top`` (query parameter or body field) limits each subject to its
+    largest contributions; ``exact=true`` returns SHAP values for the
+    boosted models instead of the faster path decomposition.
+    """
+    try:
+        tenant_engine = request_engine()
+        payload = request.json
+        records = payload['students'] if 'students' in payload else [payload]
+        top = int(request.args.get('top', payload.get('top', 10)))
+        exact = str(request.args.get('exact', payload.get('exact', False))).lower() == 'true'
         
-        if 'study_efficiency' not in df.columns:
-            df['study_efficiency'] = df['sleep_time'] / (df['screen_time'] + 1)
+        df = build_student_frame(records)
+        processed_data = tenant_engine.preprocess_data(df)
+        explanations = tenant_engine.explain_predictions(processed_data, top=top, exact=exact)
         
-        if 'overall_attendance' not in df.columns:
-            df['overall_attendance'] = df[[f'{s}_attendance' for s in subjects]].mean(axis=1)
+        return jsonify({
+            'success': True,
+            'explanations': explanations
+        })
         
-        if 'overall_interest' not in df.columns:
-            df['overall_interest'] = df[[f'{s}_interest' for s in subjects]].mean(axis=1)
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+        
+    except ValueError as e:
+        logger.warning(f"Invalid input data: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
         
-        if 'overall_performance' not in df.columns:
-            df['overall_performance'] = df[[f'{s}_marks' for s in subjects]].mean(axis=1)
+    except Exception as e:
+        logger.error(f"Error explaining predictions: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "An unexpected error occurred while explaining predictions"
+        }), 500
+
+@app.route('/api/cohort', methods=['GET', 'POST'])
+def cohort():
+    """
+    Rank students against the training population.
+    
+    POST one student object, or ``{"students": [...]}`` for a batch, to get
+    each student's percentile rank per feature and predicted subject score,
+    plus the cohort aggregates for their education level. GET returns the
+    aggregates alone (``?education_level=btech2``, default all students);
+    ``?histogram=<column>`` adds that column's binned distribution.
+    """
+    try:
+        tenant_engine = request_engine()
+        index = get_cohort_index(tenant_engine)
+        histogram_columns = request.args.getlist('histogram')
         
-        # Calculate subject-specific features if not provided
-        for subject in subjects:
-            if f'{subject}_performance' not in df.columns:
-                df[f'{subject}_performance'] = df[f'{subject}_marks']
+        if request.method == 'GET':
+            group = request.args.get('education_level', 'all')
+            if group not in index.aggregates:
+                raise ValueError(f"Unknown education level: {group}")
+            response = {'success': True, 'aggregates': {group: index.aggregates[group]}}
+        else:
+            payload = request.json
+            records = payload['students'] if 'students' in payload else [payload]
             
-            if f'{subject}_improvement' not in df.columns:
-                df[f'{subject}_improvement'] = 0
+            df = build_student_frame(records)
+            processed_data = tenant_engine.preprocess_data(df)
+            for subject, values in tenant_engine.predict_model_scores(processed_data).items():
+                processed_data[f'{subject}_predicted'] = values
             
-            if f'{subject}_confidence' not in df.columns:
-                df[f'{subject}_confidence'] = (
-                    df[f'{subject}_attendance'] * 0.4 +
-                    df[f'{subject}_interest'] * 10 * 0.3 +
-                    (df[f'{subject}_marks'] / 100) * 30
-                )
+            columns = [col for col in index.columns
+                       if col in tenant_engine.feature_columns or col.endswith('_predicted')]
+            ranks = index.percentiles(processed_data, columns)
+            groups = df['education_level'].tolist()
             
-            if f'{subject}_trend' not in df.columns:
-                df[f'{subject}_trend'] = 0
+            response = {
+                'success': True,
+                'students': [
+                    {
+                        'education_level': group,
+                        'percentiles': {col: round(float(ranks[col][i]), 2) for col in columns}
+                    }
+                    for i, group in enumerate(groups)
+                ],
+                'aggregates': {group: index.aggregates[group]
+                               for group in ['all'] + sorted(set(groups)) if group in index.aggregates}
+            }
         
-        # Ensure all expected features are present
-        missing_features = [f for f in expected_features if f not in df.columns]
-        if missing_features:
-            raise ValueError(f"Missing required features: {', '.join(missing_features)}")
+        if histogram_columns:
+            response['histograms'] = {col: index.histogram(col) for col in histogram_columns}
+        return jsonify(response)
         
-        # Reorder columns to match expected feature order
-        df = df[expected_features]
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
         
-        # Validate input data
-        validate_student_data(df.to_dict('records')[0])
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Invalid cohort request: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
         
-        # Generate predictions
-        predictions = engine.generate_predictions(df)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+        
+    except Exception as e:
+        logger.error(f"Error computing cohort ranks: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "An unexpected error occurred while computing cohort ranks"
+        }), 500
+
+@app.route('/api/similar', methods=['POST'])
+def similar():
+    """
+    Find the most similar historical students and their outcomes.
+    
+    Accepts one student object, or ``{"students": [...]}`` for a batch;
+    ``?k=5`` sets the number of similar students per profile.
+    """
+    try:
+        tenant_engine = request_engine()
+        payload = request.json
+        records = payload['students'] if 'students' in payload else [payload]
+        k = int(request.args.get('k', payload.get('k', 5)))
+        
+        df = build_student_frame(records)
+        processed_data = tenant_engine.preprocess_data(df)
+        similar_students = tenant_engine.find_similar_students(processed_data, k)
         
         return jsonify({
             'success': True,
-            'predictions': predictions
+            'students': similar_students
         })
         
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+        
     except ValueError as e:
         logger.warning(f"Invalid input data: {str(e)}")
         return jsonify({
@@ -189,11 +551,64 @@ def predict():
             'error': str(e)
         }), 400
         
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+        
     except Exception as e:
-        logger.error(f"Error generating predictions: {str(e)}")
+        logger.error(f"Error finding similar students: {str(e)}")
         return jsonify({
             'success': False,
-            'error': "An unexpected error occurred while generating predictions"
+            'error': "An unexpected error occurred while finding similar students"
+        }), 500
+
+def drift_report(tenant_engine: RecommendationEngine) -> Dict[str, Any]:
+    """
+    Drift of a tenant's prediction traffic against its training features.
+    
+    Raises:
+        FileNotFoundError: If no drift reference was saved with the models
+    """
+    if tenant_engine.drift_monitor is None:
+        raise FileNotFoundError(f"No drift reference in {tenant_engine.model_dir}. "
+                                f"Please run src/models/drift.py --build-reference first.")
+    return tenant_engine.drift_monitor.report()
+
+@app.route('/api/drift', methods=['GET'])
+def drift():
+    """
+    Compare the features of the ``/api/predict`` traffic seen so far with
+    the training distribution (PSI and KS per feature).
+    """
+    try:
+        tenant_engine = request_engine()
+        return jsonify({
+            'success': True,
+            **drift_report(tenant_engine)
+        })
+        
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+        
+    except FileNotFoundError as e:
+        logger.warning(str(e))
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+        
+    except Exception as e:
+        logger.error(f"Error computing drift: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': "An unexpected error occurred while computing drift"
         }), 500
 
 @app.route('/api/health', methods=['GET'])
@@ -201,37 +616,16 @@ def health_check():
     """Health check endpoint."""
     try:
         # Test prediction with sample data
-        sample_data = {
-            'current_cgpa': 7.5,
-            'education_level': 'btech2',
-            'study_style': 'visual',
-            'parent_education': 'bachelors',
-            'screen_time': 6,
-            'sleep_time': 7,
-            'ads_marks': 75,
-            'ads_attendance': 85,
-            'ads_interest': 8,
-            'ds_marks': 68,
-            'ds_attendance': 80,
-            'ds_interest': 7,
-            'am_marks': 82,
-            'am_attendance': 90,
-            'am_interest': 9,
-            'java_marks': 70,
-            'java_attendance': 75,
-            'java_interest': 6,
-            'dbms_marks': 77,
-            'dbms_attendance': 88,
-            'dbms_interest': 8
-        }
-        
-        df = pd.DataFrame([sample_data])
-        predictions = engine.generate_predictions(df)
+        df = build_student_frame([HEALTH_CHECK_SAMPLE])
+        predictions = engine.generate_predictions(df, monitor=False)
         
         return jsonify({
             'status': 'healthy',
             'models_loaded': len(engine.models) > 0,
-            'subject_models_loaded': len(engine.subject_models) > 0
+            'subject_models_loaded': len(engine.subject_models) > 0,
+            'llm_requests': dict(engine.llm_stats),
+            'ensemble': engine.ensemble_stats(),
+            'model_pool': model_pool.stats()
         })
         
     except Exception as e:
@@ -0,0 +1,187 @@
+"""
+ASGI variant of the predictor API.
+
+Serves the same ``/api/predict``, ``/api/recommendations``, ``/api/drift`` and ``/api/health``
+contract as ``app.py``, but awaits the Gemini calls instead of blocking a
+worker thread on them, so a single process can hold hundreds of in-flight
+LLM-bound requests. Model inference and preprocessing run in a bounded thread pool
+(``INFERENCE_WORKERS``, default 4) to keep the event loop responsive.
+
+Run from the predictor directory:
+    uvicorn asgi_app:app --app-dir src/api --port 5001
+"""
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import sys
+
+# Add the API directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Share the engine, input handling and sample profile with the Flask app
+from app import (engine, model_pool, resolve_engine, build_student_frame, defer_recommendations,
+                 drift_report, get_recommendation_jobs, logger, HEALTH_CHECK_SAMPLE)
+from models.model_pool import UnknownTenant
+from jobs import JobQueueFull
+
+# Bounded executor for CPU-bound preprocessing and inference
+executor = ThreadPoolExecutor(max_workers=int(os.getenv('INFERENCE_WORKERS', '4')))
+
+async def predict(request: Request) -> JSONResponse:
+    try:
+        # Get student data from request
+        student_data = await request.json()
+
+        loop = asyncio.get_running_loop()
+        tenant_id = request.headers.get('x-tenant-id') or request.query_params.get('tenant')
+        tenant_engine = await loop.run_in_executor(executor, resolve_engine, tenant_id)
+        df = await loop.run_in_executor(executor, build_student_frame, [student_data])
+
+        if request.query_params.get('recommendations') == 'deferred':
+            deferred = await loop.run_in_executor(executor, defer_recommendations, df, tenant_engine)
+            return JSONResponse({
+                'success': True,
+                **deferred,
+                'status_url': f"/api/recommendations/{deferred['job_id']}"
+            }, status_code=202)
+
+        # Generate predictions
+        predictions = await tenant_engine.agenerate_predictions(df, executor)
+
+        return JSONResponse({
+            'success': True,
+            'predictions': predictions
+        })
+
+    except ValueError as e:
+        logger.warning(f"Invalid input data: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=400)
+
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=404)
+
+    except JobQueueFull as e:
+        logger.warning(f"Recommendation queue full: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': "Too many pending recommendation jobs, please retry later"
+        }, status_code=503)
+
+    except Exception as e:
+        logger.error(f"Error generating predictions: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': "An unexpected error occurred while generating predictions"
+        }, status_code=500)
+
+async def recommendations(request: Request) -> JSONResponse:
+    """Status of a deferred recommendation job, with the recommendations once done."""
+    try:
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(executor, get_recommendation_jobs().get,
+                                         request.path_params['job_id'])
+        if job is None:
+            return JSONResponse({
+                'success': False,
+                'error': "Unknown or expired job id"
+            }, status_code=404)
+
+        return JSONResponse({
+            'success': True,
+            **job
+        })
+
+    except Exception as e:
+        logger.error(f"Error reading recommendation job: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': "An unexpected error occurred while reading the recommendation job"
+        }, status_code=500)
+
+async def drift(request: Request) -> JSONResponse:
+    """Drift of the prediction traffic against the training distribution."""
+    try:
+        loop = asyncio.get_running_loop()
+        tenant_id = request.headers.get('x-tenant-id') or request.query_params.get('tenant')
+        tenant_engine = await loop.run_in_executor(executor, resolve_engine, tenant_id)
+        report = await loop.run_in_executor(executor, drift_report, tenant_engine)
+
+        return JSONResponse({
+            'success': True,
+            **report
+        })
+
+    except UnknownTenant as e:
+        logger.warning(str(e))
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=404)
+
+    except FileNotFoundError as e:
+        logger.warning(str(e))
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=503)
+
+    except Exception as e:
+        logger.error(f"Error computing drift: {str(e)}")
+        return JSONResponse({
+            'success': False,
+            'error': "An unexpected error occurred while computing drift"
+        }, status_code=500)
+
+async def health_check(request: Request) -> JSONResponse:
+    """Health check endpoint."""
+    try:
+        # Test prediction with sample data
+        loop = asyncio.get_running_loop()
+        df = await loop.run_in_executor(executor, build_student_frame, [HEALTH_CHECK_SAMPLE])
+        await engine.agenerate_predictions(df, executor, monitor=False)
+
+        return JSONResponse({
+            'status': 'healthy',
+            'models_loaded': len(engine.models) > 0,
+            'subject_models_loaded': len(engine.subject_models) > 0,
+            'llm_requests': dict(engine.llm_stats),
+            'ensemble': engine.ensemble_stats(),
+            'model_pool': model_pool.stats()
+        })
+
+    except Exception as e:
+        logger.error(f"Health check failed: {str(e)}")
+        return JSONResponse({
+            'status': 'unhealthy',
+            'error': str(e)
+        }, status_code=500)
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    executor.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route('/api/predict', predict, methods=['POST']),
+        Route('/api/recommendations/{job_id}', recommendations, methods=['GET']),
+        Route('/api/drift', drift, methods=['GET']),
+        Route('/api/health', health_check, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
@@ -0,0 +1,146 @@
+"""
+Background recommendation jobs for ``/api/predict?recommendations=deferred``.
+
+Jobs are stored in a local SQLite database, so any worker process of the
+same deployment can answer a status poll, and run on a small thread pool in
+the process that accepted them. The number of unfinished jobs is bounded and
+every job expires after a TTL, finished or not.
+"""
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+)
+"""
+
+class JobQueueFull(RuntimeError):
+    """Raised when the number of unfinished jobs has reached the limit."""
+
+class RecommendationJobs:
+    def __init__(self, generate: Callable[..., str], db_path: str, workers: int = 4,
+                 max_pending: int = 256, ttl: float = 3600):
+        """
+        Initialize the job store and worker pool.
+
+        Args:
+            generate: Produces one subject's recommendations from its
+                ``recommendation_inputs`` keyword arguments
+            db_path: SQLite database file
+            workers: Threads generating recommendations in this process
+            max_pending: Maximum queued or running jobs across the deployment
+            ttl: Seconds a job is kept after submission
+        """
+        self.generate = generate
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommendations")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection, closed on exit."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, subjects: List[str], inputs: List[Dict]) -> str:
+        """
+        Queue recommendation generation for one student.
+
+        Args:
+            subjects: Display name of each subject, as in the predictions
+            inputs: ``recommendation_inputs`` of each subject
+
+        Returns:
+            str: Job id
+
+        Raises:
+            JobQueueFull: If ``max_pending`` jobs are already unfinished
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,))
+                pending = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()[0]
+                if pending >= self.max_pending:
+                    raise JobQueueFull(f"{pending} recommendation jobs are already pending")
+                conn.execute(
+                    "INSERT INTO jobs (id, status, created_at, expires_at) VALUES (?, 'queued', ?, ?)",
+                    (job_id, now, now + self.ttl)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        self.executor.submit(self._run, job_id, subjects, inputs)
+        return job_id
+
+    def _run(self, job_id: str, subjects: List[str], inputs: List[Dict]) -> None:
+        """Generate every subject's recommendations and record the outcome."""
+        self._update(job_id, status='running')
+        try:
+            result = [
+                {'subject': subject, 'recommendations': self.generate(**subject_inputs)}
+                for subject, subject_inputs in zip(subjects, inputs)
+            ]
+        except Exception as e:
+            logger.error(f"Recommendation job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e))
+            return
+        self._update(job_id, status='done', result=json.dumps(result))
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: Id returned by ``submit``
+
+        Returns:
+            Optional[Dict]: Job id, status and expiry, plus the recommendations
+            once done or the error if failed; None if unknown or expired
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, expires_at, result, error FROM jobs WHERE id = ? AND expires_at >= ?",
+                (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        status, expires_at, result, error = row
+        job = {'job_id': job_id, 'status': status, 'expires_at': expires_at}
+        if result is not None:
+            job['recommendations'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        return job
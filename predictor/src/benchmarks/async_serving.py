@@ -0,0 +1,152 @@
+"""
+Compare request concurrency of the Flask/gunicorn and ASGI/uvicorn deployments.
+
+Starts each server as a subprocess with the Gemini calls replaced by a fixed
+sleep (the external LLM is what bounds request latency), fires a burst of
+concurrent ``/api/predict`` requests at it and reports throughput and latency
+percentiles.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/benchmarks/async_serving.py --requests 200 --llm-delay 1.0
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.schema import SUBJECTS
+
+# Student profile sent with every benchmark request
+REQUEST = {
+    'current_cgpa': 7.5,
+    'education_level': 'btech2',
+    'study_style': 'visual',
+    'parent_education': 'bachelors',
+    'screen_time': 6,
+    'sleep_time': 7,
+    **{f'{subject}_{metric}': value for subject in SUBJECTS
+       for metric, value in [('marks', 75), ('attendance', 85), ('interest', 8),
+                              ('assignments', 78), ('quizzes', 72), ('participation', 80)]}
+}
+
+def stub_gemini() -> None:
+    """Replace the Gemini calls with sleeps of ``BENCHMARK_LLM_DELAY`` seconds."""
+    import google.generativeai as genai
+
+    delay = float(os.getenv('BENCHMARK_LLM_DELAY', '1.0'))
+    response = type('Response', (), {'text': "**Study Strategy Recommendations:**\n- Revise weekly"})()
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(delay)
+        return response
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(delay)
+        return response
+
+    genai.GenerativeModel.generate_content = generate_content
+    genai.GenerativeModel.generate_content_async = generate_content_async
+
+def flask_app():
+    """gunicorn factory: the Flask app with stubbed Gemini calls."""
+    stub_gemini()
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+    from app import app
+    return app
+
+def asgi_app():
+    """uvicorn factory: the ASGI app with stubbed Gemini calls."""
+    stub_gemini()
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+    from asgi_app import app
+    return app
+
+async def fire(url: str, n_requests: int, timeout: float) -> dict:
+    """Send ``n_requests`` concurrent predictions and summarize the outcome."""
+    import httpx
+
+    async def one(client):
+        start = time.perf_counter()
+        response = await client.post(f"{url}/api/predict", json=REQUEST)
+        return time.perf_counter() - start, response.status_code
+
+    limits = httpx.Limits(max_connections=n_requests)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(client) for _ in range(n_requests)), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results if not isinstance(r, Exception) and r[1] == 200])
+    return {
+        'ok': len(latencies),
+        'failed': n_requests - len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': np.percentile(latencies, 50) if len(latencies) else float('nan'),
+        'p95': np.percentile(latencies, 95) if len(latencies) else float('nan'),
+    }
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120) -> None:
+    """Block until the server answers its health check."""
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/api/health", timeout=30).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} did not become healthy within {timeout}s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help="Concurrent requests per server")
+    parser.add_argument('--llm-delay', type=float, default=1.0, help="Simulated Gemini latency in seconds")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=1, help="Threads per gunicorn worker")
+    parser.add_argument('--port', type=int, default=5101)
+    args = parser.parse_args()
+
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, 'BENCHMARK_LLM_DELAY': str(args.llm_delay),
+           'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY', 'benchmark')}
+    servers = {
+        f"flask/gunicorn ({args.workers}x{args.threads})": [
+            sys.executable, '-m', 'gunicorn', '--pythonpath', src_dir,
+            '--workers', str(args.workers), '--threads', str(args.threads),
+            '--timeout', '600', '--bind', f"127.0.0.1:{args.port}",
+            'benchmarks.async_serving:flask_app()'
+        ],
+        "asgi/uvicorn (1 process)": [
+            sys.executable, '-m', 'uvicorn', '--factory', '--app-dir', src_dir,
+            '--port', str(args.port + 1), '--log-level', 'warning',
+            'benchmarks.async_serving:asgi_app'
+        ],
+    }
+
+    print(f"{args.requests} concurrent requests, simulated LLM latency {args.llm_delay:.2f}s per call")
+    print(f"{'server':<28}{'ok':>6}{'failed':>8}{'req/s':>10}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for offset, (name, command) in enumerate(servers.items()):
+        url = f"http://127.0.0.1:{args.port + offset}"
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(url, process)
+            result = asyncio.run(fire(url, args.requests, timeout=args.requests * args.llm_delay * 5 + 60))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{name:<28}{result['ok']:>6}{result['failed']:>8}{result['throughput']:>10.1f}"
+              f"{result['p50']:>10.2f}{result['p95']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
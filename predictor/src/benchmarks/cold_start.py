@@ -0,0 +1,87 @@
+"""
+Measure serving cold start: process start to first prediction.
+
+Starts a fresh interpreter that imports the Flask app (which builds the
+engine) and answers one ``/api/predict`` request, and reports the time spent
+importing, building the engine and predicting. Offline mode (the default
+here) must not import the Gemini client, and no serving path may import
+Optuna. Exits non-zero if the total exceeds ``--budget`` seconds or a
+deferred library was imported, so it can gate deployments.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/benchmarks/cold_start.py --budget 10 --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that must stay unimported until first use, per mode
+DEFERRED_MODULES = {
+    'offline': ['google.generativeai', 'optuna'],
+    'online': ['optuna'],
+}
+
+def first_prediction(started: float) -> dict:
+    """Import the app, predict once and return phase timings (runs in the child)."""
+    timings = {'interpreter': time.time() - started}
+    start = time.perf_counter()
+    sys.path.append(os.path.join(SRC_DIR, 'api'))
+    from app import app, HEALTH_CHECK_SAMPLE
+    timings['import_and_engine'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = app.test_client().post('/api/predict', json=HEALTH_CHECK_SAMPLE)
+    if response.status_code != 200:
+        raise RuntimeError(f"Prediction failed: {response.get_json()}")
+    timings['first_prediction'] = time.perf_counter() - start
+    timings['total'] = time.time() - started
+    timings['imported'] = [name for names in DEFERRED_MODULES.values() for name in names
+                           if name in sys.modules]
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=10.0, help="Seconds allowed to first prediction")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--online', action='store_true', help="Build the Gemini client too")
+    parser.add_argument('--child', type=float, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(first_prediction(args.child)))
+        return
+
+    mode = 'online' if args.online else 'offline'
+    env = {**os.environ, 'PREDICTOR_OFFLINE': '0' if args.online else '1'}
+    runs = []
+    for _ in range(args.runs):
+        command = [sys.executable, os.path.abspath(__file__), '--child', repr(time.time())]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{mode} cold start over {args.runs} runs (seconds)")
+    print(f"{'run':<6}{'interpreter':>13}{'import+engine':>15}{'first predict':>15}{'total':>9}")
+    for i, run in enumerate(runs):
+        print(f"{i:<6}{run['interpreter']:>13.2f}{run['import_and_engine']:>15.2f}"
+              f"{run['first_prediction']:>15.2f}{run['total']:>9.2f}")
+
+    failures = []
+    worst = max(run['total'] for run in runs)
+    if worst > args.budget:
+        failures.append(f"slowest cold start {worst:.2f}s exceeds the {args.budget:.2f}s budget")
+    imported = sorted({name for run in runs for name in run['imported']} & set(DEFERRED_MODULES[mode]))
+    if imported:
+        failures.append(f"deferred modules imported before first prediction: {', '.join(imported)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: within the {args.budget:.2f}s budget")
+
+if __name__ == "__main__":
+    main()
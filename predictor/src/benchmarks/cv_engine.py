@@ -0,0 +1,77 @@
+"""
+Benchmark the per-trial cost of hyperparameter tuning CV.
+
+Compares the legacy path (``cross_val_score`` on the pandas frame, which
+re-converts the data and re-bins every fold on every trial) against the
+cached ``CVFolds`` path used by ``StudentPerformanceModel``.
+
+Usage (from the predictor directory):
+    python src/benchmarks/cv_engine.py [--trials 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import lightgbm as lgb
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import cross_val_score
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.prepare_data import load_processed_dataset
+from models.train_model import CVFolds
+
+# Representative mid-range configurations from each search space
+TRIAL_PARAMS = {
+    'rf': {'n_estimators': 300, 'max_depth': 12, 'min_samples_split': 4,
+           'min_samples_leaf': 2, 'max_features': 0.5},
+    'xgb': {'max_depth': 6, 'learning_rate': 0.1, 'n_estimators': 400,
+            'min_child_weight': 3, 'subsample': 0.8, 'colsample_bytree': 0.8, 'gamma': 0.5},
+    'lgb': {'max_depth': 6, 'learning_rate': 0.1, 'n_estimators': 400, 'num_leaves': 40,
+            'feature_fraction': 0.8, 'bagging_fraction': 0.8, 'lambda_l1': 1.0, 'lambda_l2': 1.0},
+}
+
+LEGACY_ESTIMATORS = {
+    'rf': lambda params: RandomForestRegressor(**params, random_state=42),
+    'xgb': lambda params: xgb.XGBRegressor(**params, random_state=42),
+    'lgb': lambda params: lgb.LGBMRegressor(**params, random_state=42, verbosity=-1),
+}
+
+def time_call(fn, repeats: int) -> float:
+    """Return the mean wall-clock seconds of ``fn`` over ``repeats`` calls."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trials', type=int, default=3, help="Trials timed per engine")
+    parser.add_argument('--data-dir', default="data/processed")
+    args = parser.parse_args()
+    
+    X_train = load_processed_dataset("X_train", args.data_dir)
+    y_train = load_processed_dataset("y_train", args.data_dir)['ads_performance']
+    
+    start = time.perf_counter()
+    folds = CVFolds(X_train, y_train)
+    build_time = time.perf_counter() - start
+    print(f"CVFolds build (once per target): {build_time * 1000:.1f} ms")
+    
+    cached_engines = {'rf': folds.rf_cv, 'xgb': folds.xgb_cv, 'lgb': folds.lgb_cv}
+    
+    print(f"\n{'model':<6}{'legacy/trial':>15}{'cached/trial':>15}{'saving':>10}")
+    for name, params in TRIAL_PARAMS.items():
+        legacy = time_call(
+            lambda: cross_val_score(LEGACY_ESTIMATORS[name](params), X_train, y_train,
+                                    cv=5, scoring='neg_mean_squared_error'),
+            args.trials
+        )
+        cached = time_call(lambda: cached_engines[name](params), args.trials)
+        print(f"{name:<6}{legacy:>14.3f}s{cached:>14.3f}s{(1 - cached / legacy) * 100:>9.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the latency of feature contributions against plain prediction.
+
+Loads every saved subject model and times ``predict`` against
+``model_contributions`` (path decomposition, and exact SHAP for boosted
+models) for a single row and a batch of test rows, and checks that each
+model's contributions add up to its predictions.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/benchmarks/explain_latency.py --rows 2000
+"""
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.prepare_data import load_processed_dataset
+from benchmarks.multi_output import latency
+from models.explain import contribution_table, model_contributions
+
+SUBJECTS = ['ads', 'ds', 'am', 'java', 'dbms']
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--rows', type=int, default=2000, help="Batch size (test rows are repeated as needed)")
+    parser.add_argument('--repeats', type=int, default=10, help="Repeats per latency measurement")
+    args = parser.parse_args()
+
+    X_test = load_processed_dataset("X_test", args.data_dir)
+    batch = pd.concat([X_test] * (args.rows // len(X_test) + 1), ignore_index=True).iloc[:args.rows]
+    single_row = X_test.iloc[:1]
+
+    print(f"{'model':<12}{'1-row predict':>15}{'1-row explain':>15}{'batch predict':>15}"
+          f"{'batch explain':>15}{'batch exact':>15}{'max |sum - pred|':>18}")
+    for name in [f"{subject}_{model_type}" for subject in SUBJECTS for model_type in ['rf', 'xgb', 'lgb']]:
+        path = os.path.join(args.model_dir, f"{name}.joblib")
+        if not os.path.exists(path):
+            continue
+        model = joblib.load(path)
+        table = contribution_table(model)
+
+        contributions = model_contributions(model, batch, table)
+        error = np.abs(contributions.sum(axis=2)[:, 0] - model.predict(batch)).max()
+        timings = [
+            latency(lambda: model.predict(single_row), args.repeats),
+            latency(lambda: model_contributions(model, single_row, table), args.repeats),
+            latency(lambda: model.predict(batch), args.repeats),
+            latency(lambda: model_contributions(model, batch, table), args.repeats),
+            latency(lambda: model_contributions(model, batch, table, exact=True), 1),
+        ]
+        print(f"{name:<12}" + "".join(f"{ms:>12.2f} ms" for ms in timings) + f"{error:>18.2e}")
+
+if __name__ == "__main__":
+    main()
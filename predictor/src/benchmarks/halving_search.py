@@ -0,0 +1,80 @@
+"""
+Compare full-fidelity hyperparameter search against successive halving.
+
+Both searches draw the same configurations (a seeded random sampler), so
+the comparison isolates the fidelity schedule. The full search scores every
+configuration with 5-fold CV on all rows and trees. Successive halving scores
+them on row subsamples with fewer trees and promotes only the best ones. The
+report gives the wall time of each and the full-fidelity CV MSE of the
+configuration each one picks.
+
+Usage (from the predictor directory):
+    python src/benchmarks/halving_search.py --configs 27 --models xgboost lightgbm
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import optuna
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.prepare_data import load_processed_dataset
+from models.train_model import (CVFolds, HALVING_SCHEDULE, SEARCH_SPACES, parse_rung,
+                                successive_halving, suggest_params)
+
+CV_FUNCTIONS = {
+    'random_forest': CVFolds.rf_cv,
+    'xgboost': CVFolds.xgb_cv,
+    'lightgbm': CVFolds.lgb_cv,
+}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--target', default='ads_performance')
+    parser.add_argument('--models', nargs='+', choices=list(CV_FUNCTIONS), default=['xgboost', 'lightgbm'])
+    parser.add_argument('--configs', type=int, default=27, help="Configurations drawn per search")
+    parser.add_argument('--halving-schedule', type=parse_rung, nargs='+', default=HALVING_SCHEDULE,
+                        metavar='ROWS:TREES')
+    parser.add_argument('--reduction-factor', type=int, default=3)
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2], help="Sampler seeds, one run each")
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    logging.getLogger('models.train_model').setLevel(logging.WARNING)
+
+    X_train = load_processed_dataset("X_train", args.data_dir)
+    y_train = load_processed_dataset("y_train", args.data_dir)[args.target]
+    folds = CVFolds(X_train, y_train)
+
+    schedule = ' '.join(f"{rows:g}:{trees:g}" for rows, trees in args.halving_schedule)
+    print(f"{args.configs} configurations per search, halving schedule {schedule}, "
+          f"reduction factor {args.reduction_factor}")
+    print(f"{'model':<10}{'seed':>6}{'full s':>9}{'halving s':>11}{'speedup':>9}"
+          f"{'full MSE':>11}{'halving MSE':>13}{'same pick':>11}")
+    for model_type in args.models:
+        search_space, cv = SEARCH_SPACES[model_type], CV_FUNCTIONS[model_type]
+        for seed in args.seeds:
+            full = optuna.create_study(direction='minimize', sampler=optuna.samplers.RandomSampler(seed))
+            start = time.perf_counter()
+            full.optimize(lambda trial: cv(folds, suggest_params(trial, search_space)), n_trials=args.configs)
+            full_seconds = time.perf_counter() - start
+
+            halving = optuna.create_study(direction='minimize', sampler=optuna.samplers.RandomSampler(seed))
+            start = time.perf_counter()
+            successive_halving(halving, search_space, cv, folds, args.configs,
+                               args.halving_schedule, args.reduction_factor)
+            halving_seconds = time.perf_counter() - start
+
+            # Score the halving pick at full fidelity (the last rung may be cheaper)
+            halving_mse = cv(folds, halving.best_params)
+            print(f"{model_type:<10}{seed:>6}{full_seconds:>9.1f}{halving_seconds:>11.1f}"
+                  f"{full_seconds / halving_seconds:>8.1f}x{full.best_value:>11.4f}{halving_mse:>13.4f}"
+                  f"{str(full.best_params == halving.best_params):>11}")
+
+if __name__ == "__main__":
+    main()
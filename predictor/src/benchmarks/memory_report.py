@@ -0,0 +1,120 @@
+"""
+Report the memory saved by the compact dtype schema.
+
+Three measurements, each comparing default pandas dtypes (float64/int64,
+object strings) with the declared schema in ``data_preprocessing/schema.py``:
+
+- raw records loaded from CSV
+- peak RSS of a training run (Random Forest + XGBoost on synthetic rows),
+  each measured in a fresh process
+- per-batch serving memory of preprocessed feature frames
+
+Usage (from the predictor directory):
+    python src/benchmarks/memory_report.py [--rows 200000]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.generate_sample_data import generate_academic_records
+from data_preprocessing.prepare_data import load_processed_dataset
+from data_preprocessing.schema import RAW_DTYPES, FEATURE_DTYPES, apply_schema
+
+def frame_mb(df: pd.DataFrame) -> float:
+    """Deep memory usage of a DataFrame in MB."""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in MB.
+    
+    Reads VmHWM on Linux, because ru_maxrss survives exec and would report
+    the parent's peak in a freshly spawned worker.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def peak_training_rss(X_path: str, y_path: str) -> tuple:
+    """
+    Train on the given data in this (fresh) process and return RSS figures in MB.
+    
+    Returns:
+        Tuple of (peak RSS before loading data, peak RSS after training)
+    """
+    import xgboost as xgb
+    from sklearn.ensemble import RandomForestRegressor
+    
+    baseline = peak_rss_mb()
+    X = pd.read_parquet(X_path)
+    y = pd.read_parquet(y_path).iloc[:, 0]
+    
+    RandomForestRegressor(n_estimators=20, max_depth=12, random_state=42, n_jobs=1).fit(X, y)
+    xgb.XGBRegressor(n_estimators=100, max_depth=6, tree_method='hist', random_state=42).fit(X, y)
+    return baseline, peak_rss_mb()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--data-dir', default="data/processed")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as scratch:
+        # Raw records
+        raw_path = os.path.join(scratch, "academic_records.csv")
+        generate_academic_records(args.rows).to_csv(raw_path, index=False)
+        raw_default = frame_mb(pd.read_csv(raw_path))
+        raw_compact = frame_mb(pd.read_csv(raw_path, dtype=RAW_DTYPES))
+        
+        # Training data: resample the processed training set up to --rows
+        X_train = load_processed_dataset("X_train", args.data_dir)
+        y_train = load_processed_dataset("y_train", args.data_dir)
+        idx = np.random.default_rng(42).integers(0, len(X_train), args.rows)
+        X_big = X_train.iloc[idx].reset_index(drop=True).astype(np.float64)
+        y_big = y_train.iloc[idx, :1].reset_index(drop=True).astype(np.float64)
+        paths = {}
+        for compact in [False, True]:
+            paths[compact] = (os.path.join(scratch, f"X_{compact}.parquet"),
+                              os.path.join(scratch, f"y_{compact}.parquet"))
+            (apply_schema(X_big, FEATURE_DTYPES) if compact else X_big).to_parquet(paths[compact][0])
+            (y_big.astype(np.float32) if compact else y_big).to_parquet(paths[compact][1])
+        
+        rss = {}
+        context = multiprocessing.get_context('spawn')
+        for compact in [False, True]:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                rss[compact] = executor.submit(peak_training_rss, *paths[compact]).result()
+        
+        # Serving batch
+        batch = X_big.iloc[:args.batch_size]
+        batch_default = frame_mb(batch)
+        batch_compact = frame_mb(apply_schema(batch, FEATURE_DTYPES))
+    
+    print(f"{'measurement':<34}{'default MB':>12}{'compact MB':>12}{'saving':>9}")
+    rows = [
+        (f"raw records ({args.rows:,} rows)", raw_default, raw_compact),
+        ("peak training RSS", rss[False][1], rss[True][1]),
+        ("training RSS over baseline", rss[False][1] - rss[False][0], rss[True][1] - rss[True][0]),
+        (f"serving batch ({args.batch_size} rows)", batch_default, batch_compact),
+    ]
+    for name, default, compact in rows:
+        print(f"{name:<34}{default:>12.2f}{compact:>12.2f}{(1 - compact / default) * 100:>8.1f}%")
+
+if __name__ == "__main__":
+    main()
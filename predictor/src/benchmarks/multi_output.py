@@ -0,0 +1,94 @@
+"""
+Compare joint multi-output subject models against per-subject models.
+
+Trains both layouts with the same fixed hyperparameters (no tuning, so the
+comparison isolates the model layout) and reports per-subject test RMSE,
+training time and inference latency for a single row and the whole test set.
+
+Usage (from the predictor directory):
+    python src/benchmarks/multi_output.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestRegressor
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.prepare_data import load_processed_dataset
+from benchmarks.cv_engine import TRIAL_PARAMS
+from models.train_model import MULTI_OUTPUT_XGB_PARAMS
+
+SUBJECTS = ['ads', 'ds', 'am', 'java', 'dbms']
+TARGETS = [f'{subject}_performance' for subject in SUBJECTS]
+
+def build_models(multi_output: bool) -> dict:
+    """Return unfitted models keyed by model type, then by subject (or 'all')."""
+    rf = lambda: RandomForestRegressor(**TRIAL_PARAMS['rf'], random_state=42)
+    if multi_output:
+        return {
+            'rf': {'all': rf()},
+            'xgb': {'all': xgb.XGBRegressor(**TRIAL_PARAMS['xgb'], **MULTI_OUTPUT_XGB_PARAMS,
+                                            random_state=42)},
+        }
+    return {
+        'rf': {subject: rf() for subject in SUBJECTS},
+        'xgb': {subject: xgb.XGBRegressor(**TRIAL_PARAMS['xgb'], tree_method='hist',
+                                          random_state=42) for subject in SUBJECTS},
+    }
+
+def predict_all(models: dict, X: pd.DataFrame) -> np.ndarray:
+    """Predict every subject target, returning an (n_rows, n_subjects) matrix."""
+    if 'all' in models:
+        return models['all'].predict(X)
+    return np.column_stack([models[subject].predict(X) for subject in SUBJECTS])
+
+def latency(fn, repeats: int) -> float:
+    """Mean wall-clock milliseconds of ``fn`` over ``repeats`` calls."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--repeats', type=int, default=20, help="Repeats per latency measurement")
+    args = parser.parse_args()
+    
+    X_train = load_processed_dataset("X_train", args.data_dir)
+    X_test = load_processed_dataset("X_test", args.data_dir)
+    y_train = load_processed_dataset("y_train", args.data_dir)[TARGETS]
+    y_test = load_processed_dataset("y_test", args.data_dir)[TARGETS].to_numpy()
+    single_row = X_test.iloc[:1]
+    
+    for model_type in ['rf', 'xgb']:
+        print(f"\n{model_type.upper()}")
+        print(f"{'layout':<14}{'train s':>9}{'1-row ms':>10}{'batch ms':>10}  "
+              + "".join(f"{subject:>8}" for subject in SUBJECTS))
+        
+        for multi_output in [False, True]:
+            models = build_models(multi_output)[model_type]
+            
+            start = time.perf_counter()
+            for key, model in models.items():
+                model.fit(X_train, y_train if key == 'all' else y_train[f'{key}_performance'])
+            train_time = time.perf_counter() - start
+            
+            y_pred = predict_all(models, X_test)
+            rmse = np.sqrt(((y_pred - y_test) ** 2).mean(axis=0))
+            row_ms = latency(lambda: predict_all(models, single_row), args.repeats)
+            batch_ms = latency(lambda: predict_all(models, X_test), args.repeats)
+            
+            layout = 'multi-output' if multi_output else 'per-subject'
+            print(f"{layout:<14}{train_time:>9.2f}{row_ms:>10.2f}{batch_ms:>10.2f}  "
+                  + "".join(f"{value:>8.4f}" for value in rmse))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark load time of the processed-data storage formats.
+
+Builds a large synthetic copy of ``X_train`` (rows resampled with jitter so
+values are not repeated verbatim), writes it as CSV, Parquet, Feather and
+``.npy`` into a scratch directory, and times loading each one back into a
+DataFrame, plus a full pass over the values so lazily mapped pages are
+actually read.
+
+Usage (from the predictor directory):
+    python src/benchmarks/processed_storage.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.prepare_data import load_processed_dataset, save_processed_dataset
+
+def timed(fn):
+    """Return (result, seconds) of calling ``fn``."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--data-dir', default="data/processed")
+    args = parser.parse_args()
+    
+    X_train = load_processed_dataset("X_train", args.data_dir)
+    rng = np.random.default_rng(42)
+    sample = X_train.to_numpy()[rng.integers(0, len(X_train), args.rows)]
+    big = pd.DataFrame(sample * rng.normal(1.0, 0.01, sample.shape), columns=X_train.columns)
+    print(f"Synthetic dataset: {big.shape[0]:,} rows x {big.shape[1]} columns")
+    
+    with tempfile.TemporaryDirectory() as scratch:
+        _, write_time = timed(lambda: save_processed_dataset(big, "X_big", scratch, csv=True))
+        big.to_feather(os.path.join(scratch, "X_big.feather"))
+        print(f"Write (parquet + npy + csv): {write_time:.2f}s\n")
+        
+        readers = {
+            'csv': lambda: pd.read_csv(os.path.join(scratch, "X_big.csv")),
+            'parquet': lambda: pd.read_parquet(os.path.join(scratch, "X_big.parquet"), memory_map=True),
+            'feather': lambda: feather.read_feather(os.path.join(scratch, "X_big.feather"), memory_map=True),
+            'npy (mmap)': lambda: load_processed_dataset("X_big", scratch),
+        }
+        extensions = {'csv': 'csv', 'parquet': 'parquet', 'feather': 'feather', 'npy (mmap)': 'npy'}
+        
+        print(f"{'format':<12}{'size MB':>9}{'open s':>9}{'open+scan s':>13}")
+        for name, reader in readers.items():
+            size = os.path.getsize(os.path.join(scratch, f"X_big.{extensions[name]}")) / 1e6
+            df, open_time = timed(reader)
+            _, scan_time = timed(lambda: float(df.to_numpy().sum()))
+            print(f"{name:<12}{size:>9.1f}{open_time:>9.3f}{open_time + scan_time:>13.3f}")
+            del df
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Check that served features match the training feature space.
+
+Raw records from the training population (``data/raw/academic_records.csv``)
+are sent through the API as clients send them. Their mean percentile rank
+from ``/api/cohort`` should match the mean rank of the processed training
+population against itself for every feature. The match is about 50, or
+higher for features with many ties at the top. A feature whose mean rank is
+far off is derived or scaled differently at serving time than in training.
+
+The same records are then sent through ``/api/predict``. ``/api/drift``
+must not report drift against the training reference. The drift state goes
+to a temporary directory, so the live counts are not touched.
+
+Exits non-zero if any feature's mean rank is more than ``--tolerance``
+points off, or if drift is reported.
+
+Usage (from the predictor directory, after train_model.py and cohort.py):
+    python src/benchmarks/serving_features.py
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUBJECTS = ['ads', 'ds', 'am', 'java', 'dbms']
+
+def request_records(raw: pd.DataFrame) -> list:
+    """Raw records as API clients send them: no ids, targets or training-derived columns."""
+    records = raw.drop(columns=['student_id', 'study_efficiency', 'overall_attendance', 'overall_interest']
+                       + [f'{subject}_performance' for subject in SUBJECTS], errors='ignore')
+    records['overall_performance'] = records[[f'{subject}_marks' for subject in SUBJECTS]].mean(axis=1)
+    return records.to_dict('records')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--raw', default="data/raw/academic_records.csv")
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--students', type=int, default=None, help="Records to send (default: all)")
+    parser.add_argument('--tolerance', type=float, default=2.0,
+                        help="Allowed distance of a served feature's mean percentile rank from the population's")
+    args = parser.parse_args()
+
+    os.environ.setdefault('PREDICTOR_OFFLINE', '1')
+    # Removed when the interpreter exits
+    state_dir = tempfile.TemporaryDirectory(prefix="predictor-drift-")
+    os.environ['DRIFT_STATE_DIR'] = state_dir.name
+    logging.disable(logging.WARNING)
+    sys.path.append(os.path.join(SRC_DIR, 'api'))
+    from app import app, engine, get_cohort_index
+    from data_preprocessing.prepare_data import load_processed_dataset
+
+    raw = pd.read_csv(args.raw)
+    records = request_records(raw.sample(args.students, random_state=0) if args.students else raw)
+    client = app.test_client()
+
+    response = client.post('/api/cohort', json={'students': records})
+    if response.status_code != 200:
+        raise RuntimeError(f"Cohort request failed: {response.get_json()}")
+    students = response.get_json()['students']
+    features = [col for col in students[0]['percentiles'] if not col.endswith('_predicted')]
+    mean_rank = {col: float(np.mean([student['percentiles'][col] for student in students])) for col in features}
+
+    # The same ranks for the processed population itself
+    population = pd.concat([load_processed_dataset("X_train", args.data_dir),
+                            load_processed_dataset("X_test", args.data_dir)], ignore_index=True)
+    expected = {col: float(np.mean(ranks))
+                for col, ranks in get_cohort_index(engine).percentiles(population, features).items()}
+
+    failures = [col for col, rank in mean_rank.items() if abs(rank - expected[col]) > args.tolerance]
+    print(f"{len(records)} training-population students, mean percentile rank per feature "
+          f"(tolerance {args.tolerance:g})")
+    print(f"{'feature':<22}{'served':>8}{'training':>10}")
+    for col, rank in sorted(mean_rank.items(), key=lambda item: -abs(item[1] - expected[item[0]])):
+        print(f"{col:<22}{rank:>8.1f}{expected[col]:>10.1f}{'  MISMATCH' if col in failures else ''}")
+
+    for record in records:
+        response = client.post('/api/predict', json=record)
+        if response.status_code != 200:
+            raise RuntimeError(f"Prediction failed: {response.get_json()}")
+    drift = client.get('/api/drift').get_json()
+    if not drift['success']:
+        raise RuntimeError(f"Drift report failed: {drift['error']}")
+    print(f"\n/api/drift after {drift['observations']} predictions: {drift['status']}")
+    print(f"{'feature':<22}{'PSI':>8}{'KS':>8}{'mean':>9}{'ref mean':>10}")
+    for col, entry in sorted(drift['features'].items(), key=lambda item: -item[1]['psi'])[:5]:
+        print(f"{col:<22}{entry['psi']:>8.3f}{entry['ks']:>8.3f}{entry['mean']:>9.2f}{entry['reference_mean']:>10.2f}")
+
+    if failures:
+        sys.exit(f"Serving features differ from training: {', '.join(failures)}")
+    if drift['drifted_features']:
+        sys.exit(f"Drift reported for training-population traffic: {', '.join(drift['drifted_features'])}")
+
+if __name__ == "__main__":
+    main()
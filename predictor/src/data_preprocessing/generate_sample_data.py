@@ -1,21 +1,33 @@
 import pandas as pd
 import numpy as np
 import os
-from typing import Tuple
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Tuple, List
 
-def generate_academic_records(n_samples: int = 1000) -> pd.DataFrame:
-    """Generate sample academic records with realistic patterns."""
-    np.random.seed(42)
+def generate_academic_records(n_samples: int = 1000, rng: np.random.RandomState = None,
+                              start_id: int = 1) -> pd.DataFrame:
+    """
+    Generate sample academic records with realistic patterns.
+    
+    Args:
+        n_samples: Number of records to generate
+        rng: Random source; defaults to the legacy seed 42 stream
+        start_id: First student id (for generating a range of a larger dataset)
+    """
+    if rng is None:
+        rng = np.random.RandomState(42)
     
     # Generate base student characteristics
     data = {
-        'student_id': range(1, n_samples + 1),
-        'current_cgpa': np.random.normal(7.0, 1.5, n_samples).clip(0, 10),
-        'education_level': np.random.choice(['btech1', 'btech2', 'btech3', 'btech4'], n_samples),
-        'study_style': np.random.choice(['reading', 'auditory', 'kinesthetic', 'visual'], n_samples),
-        'parent_education': np.random.choice(['high_school', 'bachelors', 'masters', 'phd'], n_samples),
-        'screen_time': np.random.randint(0, 25, n_samples),
-        'sleep_time': np.random.randint(4, 13, n_samples)
+        'student_id': range(start_id, start_id + n_samples),
+        'current_cgpa': rng.normal(7.0, 1.5, n_samples).clip(0, 10),
+        'education_level': rng.choice(['btech1', 'btech2', 'btech3', 'btech4'], n_samples),
+        'study_style': rng.choice(['reading', 'auditory', 'kinesthetic', 'visual'], n_samples),
+        'parent_education': rng.choice(['high_school', 'bachelors', 'masters', 'phd'], n_samples),
+        'screen_time': rng.randint(0, 25, n_samples),
+        'sleep_time': rng.randint(4, 13, n_samples)
     }
     
     # Define subjects and their characteristics
@@ -30,14 +42,14 @@ def generate_academic_records(n_samples: int = 1000) -> pd.DataFrame:
     # Generate subject-specific data with realistic correlations
     for subject, params in subjects.items():
         # Base performance influenced by CGPA and study style
-        base_performance = data['current_cgpa'] * 10 + np.random.normal(0, 5, n_samples)
+        base_performance = data['current_cgpa'] * 10 + rng.normal(0, 5, n_samples)
         
         # Attendance influenced by base performance and random factor
-        attendance = np.clip(base_performance * 0.5 + np.random.normal(30, 10, n_samples), 0, 100)
+        attendance = np.clip(base_performance * 0.5 + rng.normal(30, 10, n_samples), 0, 100)
         
         # Interest influenced by performance and practical weight
         interest = np.clip(
-            (base_performance * 0.1 + params['practical_weight'] * 5 + np.random.normal(0, 2, n_samples)),
+            (base_performance * 0.1 + params['practical_weight'] * 5 + rng.normal(0, 2, n_samples)),
             1, 10
         )
         
@@ -47,7 +59,7 @@ def generate_academic_records(n_samples: int = 1000) -> pd.DataFrame:
             attendance * 0.3 + 
             interest * 2 + 
             (1 - params['difficulty']) * 10 + 
-            np.random.normal(0, 5, n_samples),
+            rng.normal(0, 5, n_samples),
             0, 100
         )
         
@@ -57,9 +69,9 @@ def generate_academic_records(n_samples: int = 1000) -> pd.DataFrame:
         data[f'{subject}_interest'] = interest
         
         # Add additional features
-        data[f'{subject}_assignments'] = np.clip(marks * 0.8 + np.random.normal(0, 5, n_samples), 0, 100)
-        data[f'{subject}_quizzes'] = np.clip(marks * 0.7 + np.random.normal(0, 5, n_samples), 0, 100)
-        data[f'{subject}_participation'] = np.clip(attendance * 0.3 + interest * 2 + np.random.normal(0, 3, n_samples), 0, 100)
+        data[f'{subject}_assignments'] = np.clip(marks * 0.8 + rng.normal(0, 5, n_samples), 0, 100)
+        data[f'{subject}_quizzes'] = np.clip(marks * 0.7 + rng.normal(0, 5, n_samples), 0, 100)
+        data[f'{subject}_participation'] = np.clip(attendance * 0.3 + interest * 2 + rng.normal(0, 3, n_samples), 0, 100)
         
         # Calculate performance score (0-100)
         data[f'{subject}_performance'] = (
@@ -140,5 +152,105 @@ def generate_sample_data(n_samples: int = 1000) -> None:
     print(f"Generated {n_samples} samples")
     print("Data saved in data/raw/academic_records.csv")
 
+def generate_chunk(chunk_index: int, n_rows: int, chunk_size: int, seed: int,
+                   output_dir: str, file_format: str) -> str:
+    """
+    Generate one chunk of a large dataset and write it as its own part file.
+    
+    Each chunk draws from an independent stream derived from the root seed
+    and the chunk index, so its content does not depend on which process
+    generates it or in what order.
+    
+    Args:
+        chunk_index: Index of the chunk within the dataset
+        n_rows: Total rows in the dataset
+        chunk_size: Rows per chunk
+        seed: Root seed of the dataset
+        output_dir: Directory for the part files
+        file_format: ``parquet`` or ``csv``
+        
+    Returns:
+        str: Path of the written part file
+    """
+    start = chunk_index * chunk_size
+    seed_sequence = np.random.SeedSequence(seed, spawn_key=(chunk_index,))
+    rng = np.random.RandomState(np.random.PCG64(seed_sequence))
+    
+    records = generate_academic_records(min(chunk_size, n_rows - start), rng=rng, start_id=start + 1)
+    
+    path = os.path.join(output_dir, f"part-{chunk_index:05d}.{file_format}")
+    if file_format == 'parquet':
+        records.to_parquet(path, index=False)
+    else:
+        records.to_csv(path, index=False)
+    return path
+
+def generate_large_dataset(n_rows: int, output: str, chunk_size: int = 100_000, seed: int = 42,
+                           workers: int = None, file_format: str = 'parquet') -> List[str]:
+    """
+    Generate a large academic records dataset in parallel, chunk by chunk.
+    
+    Chunks run across a process pool and are written straight to
+    partitioned part files, so memory stays bounded by the chunk size.
+    Output is bit-identical for a given seed and chunk size regardless of
+    the number of workers. If ``output`` ends in ``.csv`` the CSV parts are
+    concatenated into that single file (as read by prepare_data.py).
+    
+    Args:
+        n_rows: Total rows to generate
+        output: Output directory for part files, or a ``.csv`` file path
+        chunk_size: Rows per chunk
+        seed: Root seed
+        workers: Worker processes (defaults to the CPU count)
+        file_format: ``parquet`` or ``csv`` part files
+        
+    Returns:
+        List[str]: Paths of the written files
+    """
+    single_csv = output.endswith('.csv')
+    output_dir = f"{output}.parts" if single_csv else output
+    if single_csv:
+        file_format = 'csv'
+    os.makedirs(output_dir, exist_ok=True)
+    
+    n_chunks = (n_rows + chunk_size - 1) // chunk_size
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        paths = list(executor.map(
+            generate_chunk, range(n_chunks), repeat(n_rows), repeat(chunk_size),
+            repeat(seed), repeat(output_dir), repeat(file_format)
+        ))
+    
+    if not single_csv:
+        return paths
+    
+    # Concatenate the CSV parts in order, keeping only the first header
+    with open(output, 'wb') as out:
+        for i, path in enumerate(paths):
+            with open(path, 'rb') as part:
+                if i > 0:
+                    part.readline()
+                shutil.copyfileobj(part, out)
+            os.remove(path)
+    os.rmdir(output_dir)
+    return [output]
+
 if __name__ == "__main__":
-    generate_sample_data() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate sample academic records")
+    parser.add_argument('--rows', type=int, default=None,
+                        help="Generate this many rows in parallel chunks (default: 1000-row sample)")
+    parser.add_argument('--output', default="data/raw/academic_records_parts",
+                        help="Directory for part files, or a .csv path for a single file")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args()
+    
+    if args.rows is None:
+        generate_sample_data()
+    else:
+        paths = generate_large_dataset(args.rows, args.output, args.chunk_size, args.seed,
+                                       args.workers, args.format)
+        print(f"Generated {args.rows} rows in {len(paths)} file(s) under {args.output}") 
\ No newline at end of file
@@ -6,11 +6,104 @@ import os
 from typing import Tuple, Dict, List
 import logging
 import joblib
+import hashlib
+import json
+import sys
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_preprocessing import schema
+from data_preprocessing.schema import CATEGORICAL_COLUMNS, RAW_DTYPES, FEATURE_DTYPES, TARGET_DTYPES, apply_schema
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model input features, in training column order
+FEATURE_COLUMNS = [
+    'current_cgpa', 'education_level', 'study_style', 'parent_education',
+    'screen_time', 'sleep_time', 'study_efficiency', 'overall_attendance',
+    'overall_interest'
+] + [
+    f'{subject}_{metric}'
+    for subject in ['ads', 'ds', 'am', 'java', 'dbms']
+    for metric in ['marks', 'attendance', 'interest', 'assignments', 'quizzes', 'participation']
+]
+
+PROCESSED_DATASETS = ['X_train', 'X_test', 'y_train', 'y_test']
+
+MINMAX_COLUMNS = [
+    'current_cgpa', 'screen_time', 'sleep_time', 'study_efficiency',
+    'overall_attendance', 'overall_interest'
+]
+
+class ColumnStatistics:
+    def __init__(self, sketch_size: int = 100_000, seed: int = 42):
+        """
+        Bounded-memory statistics collected over a stream of chunks.
+        
+        Medians are approximated from a bottom-k sample: every row gets a
+        uniform random key and only the ``sketch_size`` rows with the smallest
+        keys are kept, which is a uniform sample of the whole stream no matter
+        how it is chunked. Category counts and min/max are exact.
+        
+        Args:
+            sketch_size (int): Rows kept in the median sketch
+            seed (int): Seed for the sampling keys
+        """
+        self.sketch_size = sketch_size
+        self.rng = np.random.default_rng(seed)
+        self.numerical_columns = None
+        self.sample_keys = np.empty(0)
+        self.sample_values = None
+        self.category_counts = {}
+        self.minimum = None
+        self.maximum = None
+        self.n_rows = 0
+    
+    def update(self, df: pd.DataFrame, range_columns: List[str]) -> None:
+        """
+        Fold one chunk into the statistics.
+        
+        Args:
+            df (pd.DataFrame): Chunk of records
+            range_columns (List[str]): Columns whose min/max are tracked
+        """
+        if self.numerical_columns is None:
+            self.numerical_columns = [col for col in df.columns if col not in CATEGORICAL_COLUMNS
+                                      and pd.api.types.is_numeric_dtype(df[col])]
+            self.sample_values = np.empty((0, len(self.numerical_columns)))
+        
+        # Median sketch: keep the rows with the smallest random keys
+        keys = np.concatenate([self.sample_keys, self.rng.random(len(df))])
+        values = np.vstack([self.sample_values, df[self.numerical_columns].to_numpy(dtype=np.float64)])
+        if len(keys) > self.sketch_size:
+            keep = np.argpartition(keys, self.sketch_size)[:self.sketch_size]
+            keys, values = keys[keep], values[keep]
+        self.sample_keys, self.sample_values = keys, values
+        
+        # Category counts (for the mode and the encoder classes)
+        for col in CATEGORICAL_COLUMNS:
+            counts = df[col].value_counts()
+            total = self.category_counts.setdefault(col, pd.Series(dtype=np.int64))
+            self.category_counts[col] = total.add(counts, fill_value=0)
+        
+        # Min/max over observed values
+        chunk_min = df[range_columns].min()
+        chunk_max = df[range_columns].max()
+        self.minimum = chunk_min if self.minimum is None else np.fmin(self.minimum, chunk_min)
+        self.maximum = chunk_max if self.maximum is None else np.fmax(self.maximum, chunk_max)
+        
+        self.n_rows += len(df)
+    
+    def fill_values(self) -> Dict:
+        """Approximate median per numerical column and mode per categorical column."""
+        medians = np.nanmedian(self.sample_values, axis=0)
+        fill_values = dict(zip(self.numerical_columns, medians.tolist()))
+        for col, counts in self.category_counts.items():
+            fill_values[col] = counts.idxmax()
+        return fill_values
+
 class DataPreprocessor:
     def __init__(self, data_path: str):
         """
@@ -33,32 +126,7 @@ class DataPreprocessor:
         """
         try:
             # Load academic records
-            academic_data = pd.read_csv(os.path.join(self.data_path, 'academic_records.csv'))
-            
-            # Calculate subject-wise performance metrics
-            subjects = ['ads', 'ds', 'am', 'java', 'dbms']
-            for subject in subjects:
-                # Calculate performance score (0-100)
-                academic_data[f'{subject}_performance'] = (
-                    academic_data[f'{subject}_marks'] * 0.4 + 
-                    academic_data[f'{subject}_attendance'] * 0.3 + 
-                    academic_data[f'{subject}_interest'] * 3 +  # Interest is 1-10, so multiply by 3
-                    academic_data[f'{subject}_assignments'] * 0.15 +
-                    academic_data[f'{subject}_quizzes'] * 0.15
-                )
-                
-                # Calculate improvement potential
-                academic_data[f'{subject}_improvement'] = 100 - academic_data[f'{subject}_performance']
-                
-                # Calculate confidence score (0-100)
-                academic_data[f'{subject}_confidence'] = (
-                    academic_data[f'{subject}_attendance'] * 0.4 +
-                    academic_data[f'{subject}_interest'] * 3 +  # Interest is 1-10, so multiply by 3
-                    academic_data[f'{subject}_participation'] * 0.3
-                )
-            
-            # Calculate overall performance
-            academic_data['overall_performance'] = academic_data[[f'{s}_performance' for s in subjects]].mean(axis=1)
+            academic_data = self.add_performance_metrics(self.load_raw_data())
             
             logger.info(f"Successfully loaded and processed data. Shape: {academic_data.shape}")
             return academic_data
@@ -67,12 +135,59 @@ class DataPreprocessor:
             logger.error(f"Error loading data: {str(e)}")
             raise
     
-    def handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
+    def load_raw_data(self) -> pd.DataFrame:
+        """
+        Load the raw academic records with the declared dtypes.
+        
+        Returns:
+            pd.DataFrame: Raw academic records
+        """
+        return pd.read_csv(os.path.join(self.data_path, 'academic_records.csv'), dtype=RAW_DTYPES)
+    
+    def add_performance_metrics(self, academic_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate subject-wise performance metrics for raw academic records.
+        
+        Args:
+            academic_data (pd.DataFrame): Raw academic records
+            
+        Returns:
+            pd.DataFrame: Records with performance, improvement and confidence columns
+        """
+        # Calculate subject-wise performance metrics
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        for subject in subjects:
+            # Calculate performance score (0-100)
+            academic_data[f'{subject}_performance'] = (
+                academic_data[f'{subject}_marks'] * 0.4 + 
+                academic_data[f'{subject}_attendance'] * 0.3 + 
+                academic_data[f'{subject}_interest'] * 3 +  # Interest is 1-10, so multiply by 3
+                academic_data[f'{subject}_assignments'] * 0.15 +
+                academic_data[f'{subject}_quizzes'] * 0.15
+            )
+            
+            # Calculate improvement potential
+            academic_data[f'{subject}_improvement'] = 100 - academic_data[f'{subject}_performance']
+            
+            # Calculate confidence score (0-100)
+            academic_data[f'{subject}_confidence'] = (
+                academic_data[f'{subject}_attendance'] * 0.4 +
+                academic_data[f'{subject}_interest'] * 3 +  # Interest is 1-10, so multiply by 3
+                academic_data[f'{subject}_participation'] * 0.3
+            )
+        
+        # Calculate overall performance
+        academic_data['overall_performance'] = academic_data[[f'{s}_performance' for s in subjects]].mean(axis=1)
+        return academic_data
+    
+    def handle_missing_values(self, df: pd.DataFrame, fill_values: Dict = None) -> pd.DataFrame:
         """
         Handle missing values in the dataset.
         
         Args:
             df (pd.DataFrame): Input dataframe
+            fill_values (Dict): Precomputed fill value per column (e.g. from a
+                streaming statistics pass); computed from df if not given
             
         Returns:
             pd.DataFrame: DataFrame with handled missing values
@@ -80,13 +195,20 @@ class DataPreprocessor:
         # Create a copy to avoid chained assignment warnings
         df = df.copy()
         
+        if fill_values is not None:
+            for col in df.select_dtypes(include='category').columns:
+                df[col] = fill_categorical(df[col], fill_values.get(col))
+            df = df.fillna(fill_values)
+            logger.debug("Handled missing values with precomputed fill values")
+            return df
+        
         # Fill numerical missing values with median
         numerical_columns = df.select_dtypes(include=[np.number]).columns
         for col in numerical_columns:
             df[col] = df[col].fillna(df[col].median())
         
         # Fill categorical missing values with mode
-        categorical_columns = df.select_dtypes(include=['object']).columns
+        categorical_columns = df.select_dtypes(exclude=[np.number]).columns
         for col in categorical_columns:
             df[col] = df[col].fillna(df[col].mode()[0])
             
@@ -106,9 +228,7 @@ class DataPreprocessor:
         # Create a copy to avoid chained assignment warnings
         df = df.copy()
         
-        categorical_columns = ['education_level', 'study_style', 'parent_education']
-        
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             if col in df.columns:
                 if col not in self.label_encoders:
                     self.label_encoders[col] = LabelEncoder()
@@ -138,12 +258,14 @@ class DataPreprocessor:
         logger.info("Encoded categorical features successfully")
         return df
     
-    def scale_numerical_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def scale_numerical_features(self, df: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
         """
         Scale numerical features using appropriate scalers.
         
         Args:
             df (pd.DataFrame): Input dataframe
+            fit (bool): Fit the min-max scaler on this data; pass False at
+                serving time to reuse the scaler fitted during training
             
         Returns:
             pd.DataFrame: DataFrame with scaled numerical features
@@ -152,10 +274,7 @@ class DataPreprocessor:
         df = df.copy()
         
         # Define columns that should be scaled to 0-100 range
-        minmax_columns = [
-            'current_cgpa', 'screen_time', 'sleep_time', 'study_efficiency',
-            'overall_attendance', 'overall_interest'
-        ]
+        minmax_columns = MINMAX_COLUMNS
         
         # Ensure all minmax columns are present
         missing_columns = [col for col in minmax_columns if col not in df.columns]
@@ -171,7 +290,10 @@ class DataPreprocessor:
         # Scale other features to 0-100 range
         other_columns = [col for col in minmax_columns if col != 'current_cgpa']
         if other_columns:
-            df_minmax[other_columns] = self.minmax_scaler.fit_transform(df_minmax[other_columns]) * 100
+            if fit:
+                df_minmax[other_columns] = self.minmax_scaler.fit_transform(df_minmax[other_columns]) * 100
+            else:
+                df_minmax[other_columns] = self.minmax_scaler.transform(df_minmax[other_columns]) * 100
         
         # Update the original DataFrame with scaled values
         df[minmax_columns] = df_minmax
@@ -238,38 +360,8 @@ class DataPreprocessor:
             - y_train: Training labels (DataFrame with subject-wise targets)
             - y_test: Testing labels (DataFrame with subject-wise targets)
         """
-        # Load and preprocess data
-        df = self.load_data()
-        df = self.handle_missing_values(df)
-        df = self.create_features(df)
-        df = self.encode_categorical_features(df)
-        df = self.scale_numerical_features(df)
-        
-        # Prepare features
-        feature_columns = [
-            'current_cgpa', 'education_level', 'study_style', 'parent_education',
-            'screen_time', 'sleep_time', 'study_efficiency', 'overall_attendance',
-            'overall_interest'
-        ]
-        
-        # Add subject-specific features
-        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
-        for subject in subjects:
-            feature_columns.extend([
-                f'{subject}_marks',
-                f'{subject}_attendance',
-                f'{subject}_interest',
-                f'{subject}_assignments',
-                f'{subject}_quizzes',
-                f'{subject}_participation'
-            ])
-        
-        # Prepare targets
-        target_columns = [f'{subject}_performance' for subject in subjects]
-        
-        # Split features and targets
-        X = df[feature_columns]
-        y = df[target_columns]
+        # Load and preprocess data in one fused pass
+        X, y = self.transform_fused(self.load_raw_data(), fit=True)
         
         # Split into train and test sets
         X_train, X_test, y_train, y_test = train_test_split(
@@ -279,6 +371,246 @@ class DataPreprocessor:
         logger.info("Data preparation completed successfully")
         return X_train, X_test, y_train, y_test
     
+    def prepare_data_streaming(self, output_dir: str, chunksize: int = 100_000,
+                               test_size: float = 0.2, random_state: int = 42,
+                               sketch_size: int = 100_000) -> Dict[str, int]:
+        """
+        Prepare data out of core, in fixed-size chunks of the raw file.
+        
+        The first pass collects statistics (approximate medians, category
+        sets, min/max of the scaled columns) and counts the train/test rows.
+        The second pass imputes, derives, encodes and scales each chunk with
+        those fitted statistics and writes it straight into the processed
+        store (pre-sized ``.npy`` memmaps plus Parquet row groups), so peak
+        memory depends on the chunk size rather than the input size.
+        
+        Rows are assigned to the test set by a per-chunk seeded draw, so the
+        split is reproducible but differs from train_test_split.
+        
+        Args:
+            output_dir (str): Directory for the processed datasets
+            chunksize (int): Raw rows per chunk
+            test_size (float): Fraction of rows assigned to the test set
+            random_state (int): Seed for the split and the median sketch
+            sketch_size (int): Rows kept in the median sketch
+            
+        Returns:
+            Dict[str, int]: Number of rows written per dataset
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        raw_path = os.path.join(self.data_path, 'academic_records.csv')
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        target_columns = [f'{subject}_performance' for subject in subjects]
+        range_columns = [col for col in MINMAX_COLUMNS if col != 'current_cgpa']
+        
+        def read_chunks():
+            reader = pd.read_csv(raw_path, chunksize=chunksize, dtype=RAW_DTYPES)
+            for chunk_index, chunk in enumerate(reader):
+                is_test = np.random.default_rng([random_state, chunk_index]).random(len(chunk)) < test_size
+                yield self.add_performance_metrics(chunk), is_test
+        
+        # Pass 1: statistics and split sizes
+        stats = ColumnStatistics(sketch_size=sketch_size, seed=random_state)
+        n_test = 0
+        for chunk, is_test in read_chunks():
+            stats.update(self.create_features(chunk), range_columns)
+            n_test += int(is_test.sum())
+        n_rows = {'X_train': stats.n_rows - n_test, 'X_test': n_test,
+                  'y_train': stats.n_rows - n_test, 'y_test': n_test}
+        logger.info(f"Collected statistics over {stats.n_rows} rows")
+        
+        # Fit the preprocessors from the statistics
+        fill_values = stats.fill_values()
+        for col, counts in stats.category_counts.items():
+            self.label_encoders[col] = LabelEncoder()
+            self.label_encoders[col].classes_ = np.array(sorted(counts.index))
+        self.minmax_scaler.fit(pd.DataFrame([stats.minimum, stats.maximum], columns=range_columns))
+        
+        # Pass 2: transform each chunk and append it to the processed store
+        os.makedirs(output_dir, exist_ok=True)
+        columns = {'X_train': FEATURE_COLUMNS, 'X_test': FEATURE_COLUMNS,
+                   'y_train': target_columns, 'y_test': target_columns}
+        matrices = {
+            name: np.lib.format.open_memmap(os.path.join(output_dir, f"{name}.npy"), mode='w+',
+                                            dtype=np.float32, shape=(n_rows[name], len(columns[name])))
+            for name in PROCESSED_DATASETS
+        }
+        writers = {}
+        offsets = dict.fromkeys(PROCESSED_DATASETS, 0)
+        
+        try:
+            for chunk, is_test in read_chunks():
+                # Declared dtypes keep Parquet schemas identical across chunks
+                X_chunk, y_chunk = self.transform_fused(chunk, fill_values=fill_values)
+                
+                parts = {
+                    'X_train': X_chunk[~is_test], 'X_test': X_chunk[is_test],
+                    'y_train': y_chunk[~is_test], 'y_test': y_chunk[is_test]
+                }
+                for name, part in parts.items():
+                    matrices[name][offsets[name]:offsets[name] + len(part)] = part.to_numpy(dtype=np.float32)
+                    offsets[name] += len(part)
+                    
+                    table = pa.Table.from_pandas(part, preserve_index=False)
+                    if name not in writers:
+                        writers[name] = pq.ParquetWriter(os.path.join(output_dir, f"{name}.parquet"), table.schema)
+                    writers[name].write_table(table)
+        finally:
+            for writer in writers.values():
+                writer.close()
+            for matrix in matrices.values():
+                matrix.flush()
+        
+        for name in PROCESSED_DATASETS:
+            with open(os.path.join(output_dir, f"{name}.columns.json"), 'w') as f:
+                json.dump(columns[name], f)
+        
+        logger.info(f"Streaming data preparation completed: {n_rows}")
+        return n_rows
+    
+    def transform_records(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Transform records with already-fitted preprocessors (no refitting).
+        
+        Used for rows that arrive after the preprocessors were fitted, so
+        they land in the same feature space as the original training data.
+        
+        Args:
+            df (pd.DataFrame): Records as returned by load_data
+            
+        Returns:
+            Tuple of features and subject-wise targets
+        """
+        return self.transform_fused(df, fit=False)
+    
+    def transform_fused(self, df: pd.DataFrame, fit: bool = False,
+                        fill_values: Dict = None, targets: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Impute, derive, encode and scale raw records into one preallocated matrix.
+        
+        Equivalent to handle_missing_values -> create_features ->
+        encode_categorical_features -> scale_numerical_features followed by
+        selecting FEATURE_COLUMNS and the targets, but every feature is
+        written straight into its column of a single float32 output matrix,
+        so no intermediate copies of the whole frame are made.
+        
+        Args:
+            df (pd.DataFrame): Raw records (not modified)
+            fit (bool): Fit the min-max scaler (label encoders are fitted for
+                any column that does not have one yet)
+            fill_values (Dict): Precomputed fill value per column; missing
+                values are otherwise filled with the median/mode of df
+            targets (bool): Also compute the targets (serving only needs
+                the features; the targets are then None)
+            
+        Returns:
+            Tuple of features and subject-wise targets
+        """
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        derived_columns = ['study_efficiency', 'overall_attendance', 'overall_interest']
+        column_index = {col: j for j, col in enumerate(FEATURE_COLUMNS)}
+        fill_values = fill_values or {}
+        
+        # Column-major, so every feature is a contiguous slice; the DataFrame
+        # wrapping it at the end shares this memory
+        X = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32, order='F')
+        
+        def impute(col: str, out: np.ndarray) -> None:
+            missing = np.isnan(out)
+            if missing.any():
+                out[missing] = fill_values.get(col, np.nanmedian(out))
+        
+        # Raw numerical features, imputed in place
+        for col in FEATURE_COLUMNS:
+            if col in CATEGORICAL_COLUMNS or col in derived_columns:
+                continue
+            out = X[:, column_index[col]]
+            out[:] = df[col].to_numpy(dtype=np.float32, na_value=np.nan)
+            impute(col, out)
+        
+        # Categorical features as label codes
+        for col in CATEGORICAL_COLUMNS:
+            values = df[col]
+            if values.isna().any():
+                values = fill_categorical(values, fill_values.get(col, values.mode()[0]))
+            if col not in self.label_encoders:
+                self.label_encoders[col] = LabelEncoder().fit(values)
+            
+            encoder = self.label_encoders[col]
+            codes = pd.Categorical(values, categories=encoder.classes_).codes
+            if (codes < 0).any():
+                unseen_values = set(values.unique()) - set(encoder.classes_)
+                logger.warning(f"Found unseen labels in {col}: {unseen_values}")
+                encoder.classes_ = np.append(encoder.classes_, list(unseen_values))
+                codes = pd.Categorical(values, categories=encoder.classes_).codes
+            X[:, column_index[col]] = codes
+        
+        # Derived features from the imputed columns
+        efficiency = X[:, column_index['study_efficiency']]
+        efficiency[:] = X[:, column_index['screen_time']]
+        efficiency += 1
+        np.divide(X[:, column_index['sleep_time']], efficiency, out=efficiency)
+        efficiency *= 10
+        
+        for col, metric in [('overall_attendance', 'attendance'), ('overall_interest', 'interest')]:
+            out = X[:, column_index[col]]
+            out[:] = X[:, column_index[f'{subjects[0]}_{metric}']]
+            for subject in subjects[1:]:
+                out += X[:, column_index[f'{subject}_{metric}']]
+            out /= len(subjects)
+        
+        # Scaling: CGPA to 0-100, other min-max columns via the scaler
+        X[:, column_index['current_cgpa']] *= 10
+        
+        minmax_columns = [col for col in MINMAX_COLUMNS if col != 'current_cgpa']
+        minmax_index = [column_index[col] for col in minmax_columns]
+        if fit:
+            bounds = [[X[:, j].min() for j in minmax_index], [X[:, j].max() for j in minmax_index]]
+            self.minmax_scaler.fit(pd.DataFrame(bounds, columns=minmax_columns))
+        for k, j in enumerate(minmax_index):
+            out = X[:, j]
+            out *= self.minmax_scaler.scale_[k]
+            out += self.minmax_scaler.min_[k]
+            out *= 100
+        
+        X = apply_schema(pd.DataFrame(X, columns=FEATURE_COLUMNS, copy=False), FEATURE_DTYPES)
+        if not targets:
+            logger.info("Fused preprocessing completed successfully")
+            return X, None
+        
+        # Targets (performance score, imputed like any other numerical column)
+        y = np.empty((len(df), len(subjects)), dtype=np.float32, order='F')
+        for i, subject in enumerate(subjects):
+            out = y[:, i]
+            out[:] = (
+                df[f'{subject}_marks'] * 0.4 +
+                df[f'{subject}_attendance'] * 0.3 +
+                df[f'{subject}_interest'] * 3 +  # Interest is 1-10, so multiply by 3
+                df[f'{subject}_assignments'] * 0.15 +
+                df[f'{subject}_quizzes'] * 0.15
+            ).to_numpy(dtype=np.float32, na_value=np.nan)
+            impute(f'{subject}_performance', out)
+        
+        y = pd.DataFrame(y, columns=[f'{subject}_performance' for subject in subjects], copy=False)
+        
+        logger.info("Fused preprocessing completed successfully")
+        return X, y
+    
+    def load_preprocessors(self, input_dir: str) -> None:
+        """
+        Load preprocessors saved by save_preprocessors.
+        
+        Args:
+            input_dir (str): Directory containing the saved preprocessors
+        """
+        self.scaler = joblib.load(os.path.join(input_dir, "scaler.joblib"))
+        self.minmax_scaler = joblib.load(os.path.join(input_dir, "minmax_scaler.joblib"))
+        self.label_encoders = joblib.load(os.path.join(input_dir, "label_encoders.joblib"))
+        
+        logger.info("Preprocessors loaded successfully")
+    
     def save_preprocessors(self, output_dir: str) -> None:
         """
         Save preprocessors for later use.
@@ -297,19 +629,213 @@ class DataPreprocessor:
         
         logger.info("Preprocessors saved successfully")
 
-if __name__ == "__main__":
-    # Example usage
-    preprocessor = DataPreprocessor("data/raw")
-    X_train, X_test, y_train, y_test = preprocessor.prepare_data()
+def fill_categorical(values: pd.Series, fill_value) -> pd.Series:
+    """
+    Fill missing values of a possibly categorical column.
     
-    # Save processed data
-    processed_data_path = "data/processed"
-    os.makedirs(processed_data_path, exist_ok=True)
+    Columns read with the ``category`` dtype only know the categories
+    present in their own chunk, so a fill value computed over the whole
+    dataset is added to the categories first.
     
-    pd.DataFrame(X_train).to_csv(os.path.join(processed_data_path, "X_train.csv"), index=False)
-    pd.DataFrame(X_test).to_csv(os.path.join(processed_data_path, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(processed_data_path, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(processed_data_path, "y_test.csv"), index=False)
+    Args:
+        values (pd.Series): Column to fill
+        fill_value: Fill value (None leaves the column as is)
+        
+    Returns:
+        pd.Series: Filled column
+    """
+    if fill_value is None:
+        return values
+    if isinstance(values.dtype, pd.CategoricalDtype) and fill_value not in values.cat.categories:
+        values = values.cat.add_categories([fill_value])
+    return values.fillna(fill_value)
+
+def write_processed_files(df: pd.DataFrame, name: str, output_dir: str, csv: bool = False) -> List[Tuple[str, str]]:
+    """
+    Write a processed dataset's files under temporary names.
+    
+    Returns:
+        List[Tuple[str, str]]: (temporary, final) path of every file written
+    """
+    files = []
+    
+    def path(extension: str) -> str:
+        final = os.path.join(output_dir, f"{name}.{extension}")
+        files.append((f"{final}.tmp", final))
+        return files[-1][0]
+    
+    df.to_parquet(path('parquet'), index=False)
+    with open(path('npy'), 'wb') as f:
+        np.save(f, np.ascontiguousarray(df.to_numpy()))
+    with open(path('columns.json'), 'w') as f:
+        json.dump(list(df.columns), f)
+    
+    if csv:
+        df.to_csv(path('csv'), index=False)
+    return files
+
+def save_processed_dataset(df: pd.DataFrame, name: str, output_dir: str, csv: bool = False) -> None:
+    """
+    Save a processed dataset as typed Parquet plus a raw ``.npy`` matrix.
+    
+    The ``.npy`` file holds the values as one C-contiguous matrix (column
+    names go to a ``.columns.json`` sidecar) so it can be memory-mapped;
+    with the declared schema this is float32 (uint8 codes are exact in it).
+    Files are written under temporary names and renamed into place, so
+    existing memory maps of the old files stay valid.
+    
+    Args:
+        df (pd.DataFrame): Dataset to save
+        name (str): Dataset name, e.g. ``X_train``
+        output_dir (str): Directory to save into
+        csv (bool): Also export a CSV copy
+    """
+    for tmp_path, final_path in write_processed_files(df, name, output_dir, csv):
+        os.replace(tmp_path, final_path)
+
+def append_processed_datasets(datasets: Dict[str, pd.DataFrame], data_dir: str = "data/processed") -> None:
+    """
+    Append rows to processed datasets, rewriting them in their stored formats.
+    
+    Every dataset is written in full under temporary names before any is
+    renamed into place, so a failure leaves all of them unchanged (e.g.
+    features and targets stay aligned).
+    
+    Args:
+        datasets (Dict[str, pd.DataFrame]): Rows to append per dataset name,
+            with the dataset's columns
+        data_dir (str): Directory containing the processed datasets
+    """
+    files = []
+    for name, df in datasets.items():
+        existing = load_processed_dataset(name, data_dir)
+        combined = pd.concat([existing, df[existing.columns]], ignore_index=True)
+        combined = apply_schema(combined, {**FEATURE_DTYPES, **TARGET_DTYPES})
+        files += write_processed_files(combined, name, data_dir,
+                                       csv=os.path.exists(os.path.join(data_dir, f"{name}.csv")))
+        logger.info(f"Appending {len(df)} rows to {name} ({len(combined)} rows)")
+    for tmp_path, final_path in files:
+        os.replace(tmp_path, final_path)
+
+def load_processed_dataset(name: str, data_dir: str = "data/processed") -> pd.DataFrame:
+    """
+    Load a processed dataset without parsing text where possible.
+    
+    Prefers the memory-mapped ``.npy`` matrix (zero-copy, read-only), then
+    the memory-mapped Parquet file, and falls back to CSV for directories
+    written before the binary formats existed. Every format returns the
+    declared schema dtypes; for the single-dtype ``.npy`` matrix only the
+    categorical columns are cast, the float columns stay views of the map.
+    
+    Args:
+        name (str): Dataset name, e.g. ``X_train``
+        data_dir (str): Directory containing the processed datasets
+        
+    Returns:
+        pd.DataFrame: The dataset
+    """
+    npy_path = os.path.join(data_dir, f"{name}.npy")
+    columns_path = os.path.join(data_dir, f"{name}.columns.json")
+    if os.path.exists(npy_path) and os.path.exists(columns_path):
+        with open(columns_path, 'r') as f:
+            columns = json.load(f)
+        return apply_schema(pd.DataFrame(np.load(npy_path, mmap_mode='r'), columns=columns, copy=False),
+                            {**FEATURE_DTYPES, **TARGET_DTYPES})
+    
+    parquet_path = os.path.join(data_dir, f"{name}.parquet")
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path, memory_map=True)
+    
+    return pd.read_csv(os.path.join(data_dir, f"{name}.csv"), dtype={**FEATURE_DTYPES, **TARGET_DTYPES})
+
+def preprocessing_cache_key(data_path: str) -> str:
+    """
+    Content hash of everything the processed datasets depend on.
+    
+    Covers the raw records, the feature list and the source of this module
+    and of the dtype schema, so any change to the inputs or the
+    preprocessing code yields a new key.
+    
+    Args:
+        data_path (str): Path to the raw data directory
+        
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(os.path.join(data_path, 'academic_records.csv'), 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    for module in [__file__, schema.__file__]:
+        with open(os.path.abspath(module), 'rb') as f:
+            digest.update(f.read())
+    digest.update(json.dumps(FEATURE_COLUMNS).encode())
+    return digest.hexdigest()[:16]
+
+def prepare_and_save(data_path: str = "data/raw", processed_data_path: str = "data/processed",
+                     model_dir: str = "models", force: bool = False, csv: bool = False,
+                     chunksize: int = None) -> None:
+    """
+    Prepare the processed datasets and preprocessors, skipping unchanged inputs.
+    
+    The cache key of the last successful run is stored in
+    ``manifest.json`` next to the outputs and written only after every
+    output is saved, so an interrupted run is redone on the next call.
+    
+    Args:
+        data_path (str): Path to the raw data directory
+        processed_data_path (str): Directory for the processed datasets
+        model_dir (str): Directory for the fitted preprocessors
+        force (bool): Recompute even if the cache key matches
+        csv (bool): Also export the processed datasets as CSV
+        chunksize (int): Stream the raw file in chunks of this many rows
+            (bounded memory; CSV export is not available in this mode)
+    """
+    if chunksize:
+        csv = False
+    extensions = ['parquet', 'npy'] + (['csv'] if csv else [])
+    outputs = [os.path.join(processed_data_path, f"{name}.{extension}")
+               for name in PROCESSED_DATASETS for extension in extensions]
+    outputs += [os.path.join(model_dir, f"{name}.joblib")
+                for name in ['scaler', 'minmax_scaler', 'label_encoders']]
+    manifest_path = os.path.join(processed_data_path, "manifest.json")
+    
+    manifest = {'cache_key': preprocessing_cache_key(data_path), 'chunksize': chunksize}
+    if not force and os.path.exists(manifest_path) and all(os.path.exists(path) for path in outputs):
+        with open(manifest_path, 'r') as f:
+            if json.load(f) == manifest:
+                logger.info(f"Processed data is up to date (cache key {manifest['cache_key']}), skipping")
+                return
+    
+    preprocessor = DataPreprocessor(data_path)
+    if chunksize:
+        preprocessor.prepare_data_streaming(processed_data_path, chunksize=chunksize)
+    else:
+        X_train, X_test, y_train, y_test = preprocessor.prepare_data()
+        
+        # Save processed data
+        os.makedirs(processed_data_path, exist_ok=True)
+        
+        datasets = dict(zip(PROCESSED_DATASETS, [X_train, X_test, y_train, y_test]))
+        for name, df in datasets.items():
+            save_processed_dataset(df.reset_index(drop=True), name, processed_data_path, csv=csv)
     
     # Save preprocessors
-    preprocessor.save_preprocessors("models") 
\ No newline at end of file
+    preprocessor.save_preprocessors(model_dir)
+    
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Prepare processed datasets")
+    parser.add_argument('--force', action='store_true',
+                        help="Recompute even if the raw data and code are unchanged")
+    parser.add_argument('--csv', action='store_true',
+                        help="Also export the processed datasets as CSV")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Process the raw file out of core in chunks of this many rows")
+    args = parser.parse_args()
+    
+    prepare_and_save(force=args.force, csv=args.csv, chunksize=args.chunksize)
@@ -0,0 +1,54 @@
+"""
+Declared column dtypes shared by preprocessing, training and serving.
+
+Raw numeric columns and model features are float32: scores, attendance and
+interest are bounded (0-100, 1-10) and may be fractional or missing, so
+float32 keeps them exact enough at half the size of float64. Categorical
+columns are read as pandas ``category`` and stored as uint8 label codes
+once encoded (four levels each).
+"""
+import pandas as pd
+from typing import Dict
+
+SUBJECTS = ['ads', 'ds', 'am', 'java', 'dbms']
+
+SUBJECT_METRICS = ['marks', 'attendance', 'interest', 'assignments', 'quizzes', 'participation']
+
+CATEGORICAL_COLUMNS = ['education_level', 'study_style', 'parent_education']
+
+# Dtypes for reading raw academic records
+RAW_DTYPES = {
+    'student_id': 'int64',
+    'current_cgpa': 'float32',
+    'screen_time': 'float32',
+    'sleep_time': 'float32',
+    'study_efficiency': 'float32',
+    'overall_attendance': 'float32',
+    'overall_interest': 'float32',
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    **{f'{subject}_{metric}': 'float32'
+       for subject in SUBJECTS for metric in SUBJECT_METRICS + ['performance']}
+}
+
+# Dtypes of processed model features and targets
+FEATURE_DTYPES = {
+    **{col: 'float32' for col in RAW_DTYPES if col != 'student_id'},
+    **{col: 'uint8' for col in CATEGORICAL_COLUMNS}
+}
+
+TARGET_DTYPES = {f'{subject}_performance': 'float32' for subject in SUBJECTS}
+
+def apply_schema(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    Cast the columns of ``df`` that the schema declares and that differ.
+    
+    Args:
+        df (pd.DataFrame): Input dataframe
+        dtypes (Dict[str, str]): Declared dtype per column
+        
+    Returns:
+        pd.DataFrame: DataFrame with compact dtypes
+    """
+    casts = {col: dtype for col, dtype in dtypes.items()
+             if col in df.columns and df[col].dtype != dtype}
+    return df.astype(casts) if casts else df
@@ -0,0 +1,286 @@
+"""
+Cascaded early-exit inference for the subject ensembles.
+
+Each subject's models are evaluated from the cheapest to the most expensive.
+Once two or more have answered, rows whose predictions agree to within the
+calibrated threshold (spread = max - min) exit with the mean of the models
+evaluated so far; only the remaining rows are passed to the next model.
+Rows that reach the last model get the full ensemble mean.
+
+Model costs and thresholds are calibrated offline on ``X_test``: for each exit
+point the largest threshold is chosen whose test RMSE stays within
+``--tolerance`` of the full ensemble's. The calibration is written to
+``<model_dir>/cascade.json`` together with a report of the early-exit
+fraction, latency saved and accuracy impact per subject.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/cascade.py --tolerance 0.01
+"""
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.schema import SUBJECTS
+from models.evaluation import model_input
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CASCADE_FILE = "cascade.json"
+
+# Single-row predictions timed per model (and per row when reporting latency)
+LATENCY_ROWS = 50
+
+def cascade_predict(models: List, thresholds: List[float], X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Predict with a cost-ordered cascade of models.
+
+    Args:
+        models: Fitted models, cheapest first
+        thresholds: Exit threshold after the 2nd, 3rd, ... model; the last
+            model answers every remaining row, so there are two fewer
+            thresholds than models
+        X: Model features
+
+    Returns:
+        Tuple of (predictions, number of models evaluated per row)
+    """
+    n_rows = len(X)
+    total = np.asarray(models[0].predict(model_input(models[0], X)), dtype=np.float64)
+    low, high = total.copy(), total.copy()
+    evaluated = np.ones(n_rows, dtype=np.int64)
+    predictions = np.empty(n_rows, dtype=np.float64)
+    active = np.arange(n_rows)
+
+    for k, model in enumerate(models[1:], start=2):
+        rows = X.iloc[active] if len(active) < n_rows else X
+        prediction = np.asarray(model.predict(model_input(model, rows)), dtype=np.float64)
+        total += prediction
+        np.minimum(low, prediction, out=low)
+        np.maximum(high, prediction, out=high)
+        evaluated[active] = k
+        if k == len(models):
+            break
+        done = high - low <= thresholds[k - 2]
+        predictions[active[done]] = total[done] / k
+        keep = ~done
+        active, total, low, high = active[keep], total[keep], low[keep], high[keep]
+        if not len(active):
+            return predictions, evaluated
+
+    predictions[active] = total / len(models)
+    return predictions, evaluated
+
+def cascade_subject_predictions(subject_models: Dict, cascade: Dict,
+                                X: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Predict every calibrated subject with its cascade.
+
+    Args:
+        subject_models: Subject models keyed by name (``{subject}_{type}``)
+        cascade: Calibration loaded by ``load_cascade``
+        X: Schema-typed model features
+
+    Returns:
+        Tuple of (predictions per subject, models evaluated per row per subject)
+    """
+    predictions, evaluated = {}, {}
+    for subject, stages in cascade['subjects'].items():
+        models = [subject_models[name] for name in stages['models']]
+        predictions[subject], evaluated[subject] = cascade_predict(models, stages['thresholds'], X)
+    return predictions, evaluated
+
+def load_cascade(model_dir: str, subject_models: Dict) -> Dict:
+    """
+    Load the cascade calibration written by this module.
+
+    Subjects whose calibrated models are not all loaded (or are served by
+    multi-output models) are dropped, so they fall back to the full ensemble.
+
+    Raises:
+        FileNotFoundError: If the cascade has not been calibrated
+    """
+    path = os.path.join(model_dir, CASCADE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Cascade calibration not found: {path}. Please run src/models/cascade.py first.")
+    with open(path, 'r') as f:
+        cascade = json.load(f)
+
+    multi = any(name.startswith('multi_') for name in subject_models)
+    for subject, stages in list(cascade['subjects'].items()):
+        if multi or not all(name in subject_models for name in stages['models']):
+            logger.warning(f"Cascade for {subject} does not match the loaded models; using the full ensemble")
+            del cascade['subjects'][subject]
+        else:
+            stages['thresholds'] = [-np.inf if threshold is None else threshold
+                                    for threshold in stages['thresholds']]
+    return cascade
+
+def single_row_ms(predict, X: pd.DataFrame, rows: int = LATENCY_ROWS) -> float:
+    """Mean milliseconds of ``predict`` over the first ``rows`` rows, one row at a time."""
+    predict(X.iloc[:1])
+    start = time.perf_counter()
+    for i in range(min(rows, len(X))):
+        predict(X.iloc[i:i + 1])
+    return (time.perf_counter() - start) / min(rows, len(X)) * 1000
+
+def rmse(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((y_pred - y_true) ** 2)))
+
+def simulate_cascade(predictions: np.ndarray, thresholds: List[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replay a cascade from every model's precomputed predictions.
+
+    Args:
+        predictions: Predictions of the models cheapest first, shape (models, rows)
+        thresholds: Exit thresholds as in ``cascade_predict``
+
+    Returns:
+        Tuple of (predictions, number of models evaluated per row), identical
+        to ``cascade_predict`` on the same rows
+    """
+    n_models = len(predictions)
+    result = predictions.mean(axis=0)
+    evaluated = np.full(predictions.shape[1], n_models, dtype=np.int64)
+    for k in range(n_models - 1, 1, -1):
+        done = np.ptp(predictions[:k], axis=0) <= thresholds[k - 2]
+        result[done] = predictions[:k, done].mean(axis=0)
+        evaluated[done] = k
+    return result, evaluated
+
+def calibrate_subject(models: Dict, X: pd.DataFrame, y: np.ndarray, tolerance: float) -> Dict:
+    """
+    Order one subject's models by cost and choose its exit thresholds.
+
+    Exit points are calibrated in cascade order, each with the later exits
+    disabled, taking the largest spread threshold that keeps the test RMSE
+    within ``tolerance`` of the full ensemble.
+
+    Args:
+        models: The subject's fitted models keyed by name
+        X: Calibration features (``X_test``)
+        y: Calibration targets
+        tolerance: Allowed RMSE increase over the full ensemble
+
+    Returns:
+        Dict: Model names cheapest first, thresholds (None where no row may
+        exit) and per-model single-row latency in milliseconds
+    """
+    def predictor(model):
+        return lambda rows: model.predict(model_input(model, rows))
+
+    costs = {name: single_row_ms(predictor(model), X) for name, model in models.items()}
+    names = sorted(models, key=costs.get)
+    predictions = np.stack([np.asarray(predictor(models[name])(X), dtype=np.float64) for name in names])
+    full_rmse = rmse(y, predictions.mean(axis=0))
+
+    thresholds = [-np.inf] * (len(names) - 2)
+    for point in range(len(names) - 2):
+        for candidate in np.unique(np.ptp(predictions[:point + 2], axis=0))[::-1]:
+            thresholds[point] = float(candidate)
+            if rmse(y, simulate_cascade(predictions, thresholds)[0]) <= full_rmse + tolerance:
+                break
+        else:
+            thresholds[point] = -np.inf
+
+    return {
+        'models': names,
+        'thresholds': [threshold if np.isfinite(threshold) else None for threshold in thresholds],
+        'single_row_ms': costs
+    }
+
+def report_subject(models: List, thresholds: List[float], X: pd.DataFrame, y: np.ndarray) -> Dict:
+    """Early-exit fraction, latency and RMSE of a cascade against its full ensemble."""
+    def full_predict(rows):
+        return np.mean([model.predict(model_input(model, rows)) for model in models], axis=0)
+
+    full = full_predict(X)
+    predictions, evaluated = cascade_predict(models, thresholds, X)
+
+    def cascaded(rows):
+        return cascade_predict(models, thresholds, rows)
+
+    return {
+        'early_exit_fraction': float(np.mean(evaluated < len(models))),
+        'mean_models_evaluated': float(np.mean(evaluated)),
+        'full_single_row_ms': single_row_ms(full_predict, X),
+        'cascade_single_row_ms': single_row_ms(cascaded, X),
+        'full_rmse': rmse(y, full),
+        'cascade_rmse': rmse(y, predictions),
+        'max_abs_deviation': float(np.max(np.abs(predictions - full)))
+    }
+
+def calibrate(model_dir: str = "models", data_dir: str = "data/processed", tolerance: float = 0.01) -> Dict:
+    """
+    Calibrate every subject's cascade on the test set and save it.
+
+    Subjects with fewer than three models have no exit point and are left to
+    the full ensemble, as are all subjects when multi-output models are in use.
+
+    Args:
+        model_dir: Directory holding the trained subject models
+        data_dir: Directory holding the processed datasets
+        tolerance: Allowed test RMSE increase per subject over the full ensemble
+
+    Returns:
+        Dict: The saved calibration, with a ``report`` per subject
+    """
+    from data_preprocessing.prepare_data import load_processed_dataset
+    from models.train_model import StudentPerformanceModel
+
+    X_test = load_processed_dataset("X_test", data_dir)
+    y_test = load_processed_dataset("y_test", data_dir)
+    trainer = StudentPerformanceModel(model_dir)
+    trainer.load_trained_models()
+    if any(name.startswith('multi_') for name in trainer.subject_models):
+        raise ValueError("Cascades need per-subject models; multi-output models answer every subject at once")
+
+    cascade = {'tolerance': tolerance, 'subjects': {}, 'report': {}}
+    for subject in SUBJECTS:
+        models = {name: model for name, model in trainer.subject_models.items()
+                  if name.startswith(f"{subject}_")}
+        if len(models) < 3:
+            logger.info(f"{subject}: {len(models)} models, no exit point to calibrate")
+            continue
+        y = y_test[f'{subject}_performance'].to_numpy(dtype=np.float64)
+        stages = calibrate_subject(models, X_test, y, tolerance)
+        thresholds = [-np.inf if threshold is None else threshold for threshold in stages['thresholds']]
+        cascade['subjects'][subject] = stages
+        cascade['report'][subject] = report_subject(
+            [models[name] for name in stages['models']], thresholds, X_test, y
+        )
+        logger.info(f"{subject}: order {' -> '.join(stages['models'])}, thresholds {stages['thresholds']}")
+
+    with open(os.path.join(model_dir, CASCADE_FILE), 'w') as f:
+        json.dump(cascade, f, indent=2)
+    logger.info(f"Cascade calibration written to {os.path.join(model_dir, CASCADE_FILE)}")
+    return cascade
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Calibrate cascaded early-exit ensembles on the test set")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Allowed test RMSE increase over the full ensemble, per subject")
+    args = parser.parse_args()
+
+    report = calibrate(args.model_dir, args.data_dir, args.tolerance)['report']
+
+    print(f"\n{'subject':<10}{'early exits':>13}{'models/row':>12}{'1-row ms':>20}{'RMSE':>22}{'max |dev|':>11}")
+    for subject, entry in report.items():
+        print(f"{subject:<10}{entry['early_exit_fraction']:>12.1%}{entry['mean_models_evaluated']:>12.2f}"
+              f"{entry['full_single_row_ms']:>9.2f} -> {entry['cascade_single_row_ms']:<7.2f}"
+              f"{entry['full_rmse']:>10.4f} -> {entry['cascade_rmse']:<8.4f}"
+              f"{entry['max_abs_deviation']:>11.4f}")
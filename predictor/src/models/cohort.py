@@ -0,0 +1,222 @@
+"""
+Percentile index over the training population for cohort analytics.
+
+Built once from the processed datasets and the trained models' predictions:
+each indexed column is stored sorted in one ``.npy`` matrix, so a student's
+percentile rank is a binary search instead of a scan. Binned histograms and
+per-education-level aggregates (means and quantiles per subject) are
+precomputed alongside.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/cohort.py --bins 50
+"""
+import json
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.schema import SUBJECTS, CATEGORICAL_COLUMNS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Quantiles reported in cohort aggregates
+AGGREGATE_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+# Columns aggregated per subject; raw units, unlike the scaled overall features
+AGGREGATE_COLUMNS = [
+    f'{subject}_{metric}'
+    for subject in SUBJECTS
+    for metric in ['marks', 'attendance', 'performance', 'predicted']
+]
+
+class CohortIndex:
+    def __init__(self, columns: List[str], sorted_values: np.ndarray,
+                 histograms: Optional[np.ndarray] = None, bin_edges: Optional[np.ndarray] = None,
+                 aggregates: Optional[Dict] = None):
+        """
+        Initialize the cohort index.
+
+        Args:
+            columns: Indexed column names
+            sorted_values: Array of shape (columns, population), each row sorted
+            histograms: Optional counts per column, shape (columns, bins)
+            bin_edges: Bin edges per column, shape (columns, bins + 1)
+            aggregates: Precomputed statistics keyed by group, then column
+        """
+        self.columns = columns
+        self.column_index = {col: i for i, col in enumerate(columns)}
+        self.sorted_values = sorted_values
+        self.histograms = histograms
+        self.bin_edges = bin_edges
+        self.aggregates = aggregates or {}
+
+    @classmethod
+    def build(cls, population: pd.DataFrame, groups: pd.Series, bins: int = 50) -> 'CohortIndex':
+        """
+        Build the index from a population frame.
+
+        Args:
+            population: One row per student; every non-categorical column is indexed
+            groups: Education level of each row, for the grouped aggregates
+            bins: Histogram bins per column (0 disables histograms)
+
+        Returns:
+            CohortIndex: Index over ``population``
+        """
+        columns = [col for col in population.columns if col not in CATEGORICAL_COLUMNS]
+        values = population[columns].to_numpy(dtype=np.float32).T
+        sorted_values = np.sort(values, axis=1)
+
+        histograms = bin_edges = None
+        if bins > 0:
+            binned = [
+                np.histogram(row, bins=bins, range=(row.min(), max(row.max(), row.min() + 1)))
+                for row in sorted_values
+            ]
+            histograms = np.stack([counts for counts, _ in binned])
+            bin_edges = np.stack([edges for _, edges in binned])
+
+        aggregate_columns = [col for col in AGGREGATE_COLUMNS if col in population.columns]
+        grouped = [('all', population)] + [
+            (str(group), frame) for group, frame in population.groupby(groups.to_numpy(), observed=True)
+        ]
+        aggregates = {}
+        for group, frame in grouped:
+            quantiles = frame[aggregate_columns].quantile(AGGREGATE_QUANTILES)
+            aggregates[group] = {
+                col: {
+                    'count': int(frame[col].count()),
+                    'mean': float(frame[col].mean()),
+                    **{f'p{int(q * 100)}': float(quantiles.loc[q, col]) for q in AGGREGATE_QUANTILES}
+                }
+                for col in aggregate_columns
+            }
+
+        logger.info(f"Built cohort index over {len(population)} students and {len(columns)} columns")
+        return cls(columns, sorted_values, histograms, bin_edges, aggregates)
+
+    def save(self, index_dir: str) -> None:
+        """Write the index to ``index_dir`` as ``.npy`` arrays plus JSON metadata."""
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "sorted_values.npy"), self.sorted_values)
+        if self.histograms is not None:
+            np.save(os.path.join(index_dir, "histograms.npy"), self.histograms)
+            np.save(os.path.join(index_dir, "bin_edges.npy"), self.bin_edges)
+        with open(os.path.join(index_dir, "cohort.json"), 'w') as f:
+            json.dump({'columns': self.columns, 'aggregates': self.aggregates}, f)
+        logger.info(f"Cohort index saved to {index_dir}")
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'CohortIndex':
+        """Load an index saved by ``save``, memory-mapping the sorted values."""
+        with open(os.path.join(index_dir, "cohort.json"), 'r') as f:
+            metadata = json.load(f)
+        sorted_values = np.load(os.path.join(index_dir, "sorted_values.npy"), mmap_mode='r')
+        histograms = bin_edges = None
+        if os.path.exists(os.path.join(index_dir, "histograms.npy")):
+            histograms = np.load(os.path.join(index_dir, "histograms.npy"))
+            bin_edges = np.load(os.path.join(index_dir, "bin_edges.npy"))
+        return cls(metadata['columns'], sorted_values, histograms, bin_edges, metadata['aggregates'])
+
+    def percentiles(self, frame: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Percentile rank of each row against the population, per column.
+
+        The rank is the share of the population at or below the row's value,
+        so 85 means "top 15%".
+
+        Args:
+            frame: Rows to rank, with values in the same units as the index
+            columns: Columns to rank (defaults to every indexed column in ``frame``)
+
+        Returns:
+            Dict[str, np.ndarray]: Percentile ranks (0-100) per column
+        """
+        columns = columns or [col for col in self.columns if col in frame.columns]
+        population = self.sorted_values.shape[1]
+        ranks = {}
+        for col in columns:
+            sorted_column = self.sorted_values[self.column_index[col]]
+            values = frame[col].to_numpy(dtype=np.float32)
+            ranks[col] = np.searchsorted(sorted_column, values, side='right') * (100.0 / population)
+        return ranks
+
+    def histogram(self, column: str) -> Dict[str, List[float]]:
+        """Return the precomputed histogram of ``column`` as counts and bin edges."""
+        if self.histograms is None:
+            raise ValueError("Cohort index was built without histograms")
+        i = self.column_index[column]
+        return {'counts': self.histograms[i].tolist(), 'bin_edges': self.bin_edges[i].tolist()}
+
+def build_population(data_dir: str = "data/processed", model_dir: str = "models") -> pd.DataFrame:
+    """
+    Assemble the training population: features, targets and model predictions.
+
+    Args:
+        data_dir: Directory holding the processed datasets
+        model_dir: Directory holding the trained subject models
+
+    Returns:
+        pd.DataFrame: One row per student, with ``{subject}_predicted`` columns
+    """
+    from data_preprocessing.prepare_data import load_processed_dataset
+    from models.train_model import StudentPerformanceModel
+    from models.recommendations import ensemble_subject_predictions
+
+    X = pd.concat([load_processed_dataset("X_train", data_dir),
+                   load_processed_dataset("X_test", data_dir)], ignore_index=True)
+    y = pd.concat([load_processed_dataset("y_train", data_dir),
+                   load_processed_dataset("y_test", data_dir)], ignore_index=True)
+
+    trainer = StudentPerformanceModel(model_dir)
+    trainer.load_trained_models()
+    predictions = ensemble_subject_predictions(trainer.subject_models, X)
+
+    population = pd.concat([X, y], axis=1)
+    for subject, values in predictions.items():
+        population[f'{subject}_predicted'] = values
+    return population
+
+def build_index(data_dir: str = "data/processed", model_dir: str = "models", bins: int = 50) -> CohortIndex:
+    """
+    Build the cohort index for the models in ``model_dir`` and save it to
+    ``<model_dir>/cohort``.
+
+    Args:
+        data_dir: Directory holding the processed datasets
+        model_dir: Directory holding the trained models and label encoders
+        bins: Histogram bins per column (0 disables histograms)
+
+    Returns:
+        CohortIndex: The saved index
+    """
+    population = build_population(data_dir, model_dir)
+    label_encoders = joblib.load(os.path.join(model_dir, "label_encoders.joblib"))
+    groups = pd.Series(label_encoders['education_level'].inverse_transform(
+        population['education_level'].astype(int)
+    ))
+
+    index = CohortIndex.build(population, groups, bins)
+    index.save(os.path.join(model_dir, "cohort"))
+    return index
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the cohort percentile index")
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--bins', type=int, default=50, help="Histogram bins per column (0 disables them)")
+    args = parser.parse_args()
+
+    build_index(args.data_dir, args.model_dir, args.bins)
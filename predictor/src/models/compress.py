@@ -0,0 +1,333 @@
+"""
+Compress trained models after training.
+
+Random forests are pruned post hoc: trees are optionally truncated to a
+maximum depth, then a subset of trees is chosen greedily by out-of-bag error.
+Optionally, each subject's RF/XGBoost/LightGBM ensemble is distilled into one
+small LightGBM student. Every compressed model is reported with its size,
+single-row and batch latency and test-set RMSE against the model it replaces.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/compress.py --n-trees 25 50 100 --max-depth 8 --distill
+"""
+import copy
+import io
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree._tree import Tree
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.evaluation import model_input
+from models.train_model import StudentPerformanceModel, LGB_DATASET_PARAMS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hyperparameters of the distilled student model
+STUDENT_PARAMS = {'n_estimators': 200, 'num_leaves': 15, 'learning_rate': 0.05, **LGB_DATASET_PARAMS}
+
+# Rows used to score candidate trees during selection
+SELECTION_ROWS = 5000
+
+def model_size(model) -> int:
+    """Return the serialized size of a model in bytes."""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+def truncate_tree(estimator, max_depth: int):
+    """
+    Return a copy of a fitted decision tree cut off at ``max_depth``.
+
+    Nodes at the cut become leaves predicting their stored node value, and
+    unreachable nodes are dropped so the copy is smaller as well as shallower.
+
+    Args:
+        estimator: Fitted DecisionTreeRegressor
+        max_depth: Maximum depth to keep
+
+    Returns:
+        DecisionTreeRegressor: Truncated copy
+    """
+    state = estimator.tree_.__getstate__()
+    if state['max_depth'] <= max_depth:
+        return estimator
+    nodes, values = state['nodes'], state['values']
+
+    # Breadth-first walk keeping nodes down to max_depth
+    keep, depths = [0], [0]
+    position = 0
+    while position < len(keep):
+        node, depth = keep[position], depths[position]
+        if depth < max_depth and nodes['left_child'][node] != -1:
+            keep += [nodes['left_child'][node], nodes['right_child'][node]]
+            depths += [depth + 1, depth + 1]
+        position += 1
+    keep = np.array(keep)
+    remap = np.full(len(nodes), -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+
+    new_nodes = nodes[keep].copy()
+    is_leaf = (np.array(depths) == max_depth) | (new_nodes['left_child'] == -1)
+    for field in ['left_child', 'right_child']:
+        new_nodes[field] = np.where(is_leaf, -1, remap[new_nodes[field]])
+    new_nodes['feature'][is_leaf] = -2
+    new_nodes['threshold'][is_leaf] = -2.0
+
+    tree = Tree(estimator.n_features_in_, np.ones(estimator.n_outputs_, dtype=np.intp),
+                estimator.n_outputs_)
+    tree.__setstate__({'max_depth': max_depth, 'node_count': len(keep),
+                       'nodes': new_nodes, 'values': values[keep].copy()})
+    truncated = copy.copy(estimator)
+    truncated.tree_ = tree
+    truncated.max_depth = max_depth
+    return truncated
+
+def oob_mask(forest: RandomForestRegressor, estimator, n_samples: int) -> np.ndarray:
+    """
+    Return a boolean mask of the training rows a tree did not see.
+
+    Regenerates the bootstrap sample the forest drew from the tree's seed,
+    which only holds for trees fit on ``X_train`` itself (not for trees
+    added by incremental training). Without bootstrapping every row was
+    seen, so all rows are used instead.
+    """
+    if not forest.bootstrap:
+        return np.ones(n_samples, dtype=bool)
+    max_samples = forest.max_samples
+    if max_samples is None:
+        n_bootstrap = n_samples
+    elif isinstance(max_samples, float):
+        n_bootstrap = max(round(n_samples * max_samples), 1)
+    else:
+        n_bootstrap = max_samples
+    sampled = np.random.RandomState(estimator.random_state).randint(0, n_samples, n_bootstrap)
+    return np.bincount(sampled, minlength=n_samples) == 0
+
+def select_trees(forest: RandomForestRegressor, X_train: pd.DataFrame, y_train,
+                 n_trees: List[int], max_depth: Optional[int] = None,
+                 seed: int = 42) -> Dict[int, RandomForestRegressor]:
+    """
+    Prune a fitted random forest to its most useful trees.
+
+    Trees are added greedily, each time picking the tree that most lowers the
+    out-of-bag MSE of the trees picked so far, so a single ordering yields
+    every requested size.
+
+    Args:
+        forest: Fitted random forest
+        X_train: Rows the forest was trained on
+        y_train: Targets the forest was trained on
+        n_trees: Forest sizes to return
+        max_depth: Truncate every tree to this depth first
+        seed: Random seed for subsampling the scoring rows
+
+    Returns:
+        Dict[int, RandomForestRegressor]: Pruned forest per requested size
+    """
+    estimators = forest.estimators_
+    if max_depth is not None:
+        estimators = [truncate_tree(estimator, max_depth) for estimator in estimators]
+
+    n_samples = len(X_train)
+    masks = np.stack([oob_mask(forest, estimator, n_samples) for estimator in estimators])
+    rows = np.arange(n_samples)
+    if n_samples > SELECTION_ROWS:
+        rows = np.sort(np.random.default_rng(seed).choice(n_samples, SELECTION_ROWS, replace=False))
+    X = X_train.iloc[rows].to_numpy(dtype=np.float32)
+    y = np.asarray(y_train, dtype=np.float64)[rows].reshape(len(rows), -1)
+    masks = masks[:, rows].astype(np.float64)
+
+    # Per-tree predictions, shape (trees, rows, outputs), zeroed where in-bag
+    predictions = np.stack([estimator.predict(X).reshape(len(rows), -1) for estimator in estimators])
+    predictions *= masks[:, :, None]
+
+    total = np.zeros_like(y)
+    counts = np.zeros(len(rows))
+    order, remaining = [], np.ones(len(estimators), dtype=bool)
+    for _ in range(min(max(n_trees), len(estimators))):
+        # Out-of-bag ensemble prediction for every candidate tree at once
+        candidate_counts = counts + masks
+        with np.errstate(divide='ignore', invalid='ignore'):
+            candidate = (total + predictions) / candidate_counts[:, :, None]
+        sq_err = np.where(candidate_counts[:, :, None] > 0, (candidate - y) ** 2, 0.0)
+        mse = sq_err.sum(axis=(1, 2)) / np.maximum(candidate_counts.sum(axis=1), 1)
+        mse[~remaining] = np.inf
+        best = int(np.argmin(mse))
+        order.append(best)
+        remaining[best] = False
+        total += predictions[best]
+        counts += masks[best]
+
+    pruned = {}
+    for size in n_trees:
+        model = copy.copy(forest)
+        model.estimators_ = [estimators[i] for i in order[:size]]
+        model.n_estimators = len(model.estimators_)
+        if max_depth is not None:
+            model.max_depth = max_depth
+        pruned[size] = model
+    return pruned
+
+class EnsembleAverage:
+    """Unweighted average of several fitted regressors."""
+
+    def __init__(self, models: List):
+        self.models = models
+
+    def predict(self, X) -> np.ndarray:
+        return np.mean([model.predict(model_input(model, X)) for model in self.models], axis=0)
+
+def distill(teacher, X_train: pd.DataFrame) -> lgb.LGBMRegressor:
+    """
+    Fit a small LightGBM student to a teacher's predictions.
+
+    Args:
+        teacher: Fitted model (or EnsembleAverage) to imitate
+        X_train: Training features
+
+    Returns:
+        lgb.LGBMRegressor: Fitted student model
+    """
+    student = lgb.LGBMRegressor(**STUDENT_PARAMS, random_state=42)
+    student.fit(X_train, teacher.predict(X_train))
+    return student
+
+def measure(model, X_test: pd.DataFrame, y_test, repeats: int = 50) -> Dict:
+    """
+    Measure a model's size, latency and test-set RMSE.
+
+    Args:
+        model: Fitted model
+        X_test: Test features
+        y_test: Test targets the model predicts
+        repeats: Single-row predictions to time
+
+    Returns:
+        Dict: size_bytes, single_row_ms, batch_ms and rmse
+    """
+    X_test = model_input(model, X_test)
+    row = X_test.iloc[[0]]
+    model.predict(row)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    batch = time.perf_counter() - start
+
+    y_true = np.asarray(y_test, dtype=np.float64)
+    return {
+        'size_bytes': model_size(model.models if isinstance(model, EnsembleAverage) else model),
+        'single_row_ms': float(np.median(timings) * 1000),
+        'batch_ms': batch * 1000,
+        'rmse': float(np.sqrt(np.mean((np.reshape(y_pred, y_true.shape) - y_true) ** 2)))
+    }
+
+def compress_models(model_dir: str = "models", n_trees: List[int] = (50,),
+                    max_depth: Optional[int] = None, distill_subjects: bool = False) -> Dict:
+    """
+    Compress the saved models and report each compressed variant.
+
+    Compressed models are written to ``<model_dir>/compressed``; the originals
+    are left untouched. Random forests are not pruned after incremental
+    training (see ``oob_mask``).
+
+    Args:
+        model_dir: Directory holding the trained models
+        n_trees: Forest sizes to prune every random forest to
+        max_depth: Optional depth cap applied to every tree
+        distill_subjects: Also distill each subject's ensemble into one student
+
+    Returns:
+        Dict: Report per compressed model, with original and compressed
+        measurements and the test RMSE delta
+    """
+    trainer = StudentPerformanceModel(model_dir)
+    X_train, X_test, y_train, y_test = trainer.load_data()
+    trainer.load_trained_models()
+    all_models = {**trainer.models, **trainer.subject_models}
+
+    # Trees grown by incremental training were fit on other rows, so their
+    # out-of-bag masks cannot be regenerated from X_train
+    incremental_rounds = trainer.load_training_state(len(X_train) + len(X_test)).get('incremental_rounds', 0)
+    if incremental_rounds:
+        logger.warning(f"Skipping tree selection: the forests had {incremental_rounds} incremental "
+                       f"training round(s); retrain them fully with train_model.py to prune them")
+
+    output_dir = os.path.join(model_dir, "compressed")
+    os.makedirs(output_dir, exist_ok=True)
+
+    report = {}
+
+    def record(name: str, original, compressed, target) -> None:
+        before = measure(original, X_test, target)
+        after = measure(compressed, X_test, target)
+        report[name] = {'original': before, 'compressed': after,
+                        'rmse_delta': after['rmse'] - before['rmse']}
+        joblib.dump(compressed, os.path.join(output_dir, f"{name}.joblib"))
+        logger.info(f"{name}: {before['size_bytes'] / 1e6:.2f} MB -> {after['size_bytes'] / 1e6:.2f} MB, "
+                    f"RMSE delta {after['rmse'] - before['rmse']:+.4f}")
+
+    for name, model in all_models.items():
+        if not isinstance(model, RandomForestRegressor) or incremental_rounds:
+            continue
+        suffix = f"_d{max_depth}" if max_depth is not None else ""
+        pruned = select_trees(model, model_input(model, X_train), trainer._training_target(name, y_train),
+                              list(n_trees), max_depth)
+        for size, compressed in pruned.items():
+            record(f"{name}_t{size}{suffix}", model, compressed, trainer._training_target(name, y_test))
+
+    if distill_subjects:
+        for subject in ['ads', 'ds', 'am', 'java', 'dbms']:
+            members = [trainer.subject_models[f"{subject}_{model_type}"]
+                       for model_type in ['rf', 'xgb', 'lgb']
+                       if f"{subject}_{model_type}" in trainer.subject_models]
+            if not members:
+                continue
+            teacher = EnsembleAverage(members)
+            record(f"{subject}_distilled", teacher, distill(teacher, X_train),
+                   y_test[f'{subject}_performance'])
+
+    with open(os.path.join(output_dir, "compression_report.json"), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compress trained student performance models")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--n-trees', type=int, nargs='+', default=[50],
+                        help="Forest sizes to prune each random forest to")
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="Truncate every random forest tree to this depth")
+    parser.add_argument('--distill', action='store_true',
+                        help="Distill each subject's RF/XGBoost/LightGBM ensemble into one LightGBM model")
+    args = parser.parse_args()
+
+    report = compress_models(args.model_dir, args.n_trees, args.max_depth, args.distill)
+
+    print(f"\n{'model':<28}{'size MB':>16}{'1-row ms':>18}{'batch ms':>18}{'RMSE delta':>12}")
+    for name, entry in report.items():
+        before, after = entry['original'], entry['compressed']
+        print(f"{name:<28}"
+              f"{before['size_bytes'] / 1e6:>7.2f} -> {after['size_bytes'] / 1e6:<6.2f}"
+              f"{before['single_row_ms']:>8.2f} -> {after['single_row_ms']:<7.2f}"
+              f"{before['batch_ms']:>8.2f} -> {after['batch_ms']:<7.2f}"
+              f"{entry['rmse_delta']:>+12.4f}")
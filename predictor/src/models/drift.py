@@ -0,0 +1,335 @@
+"""
+Streaming drift monitor for the prediction traffic.
+
+At training time every feature of ``X_train`` gets ``DRIFT_BINS`` equal-width
+bins spanning its training range, plus an underflow and an overflow bin. The
+reference histograms, means and standard deviations are saved to
+``<model_dir>/drift_reference.json``.
+
+While serving, the features of each ``/api/predict`` request are binned
+against the same edges. The features come from the training transform
+(``preprocess_data``), so they are in the reference's units. The bin counts
+and the running sums and sums of squares of every feature are then
+incremented in place. That costs O(features). Binning and updating reuse
+preallocated buffers and allocate nothing. Reading the rows out of the
+pandas frame is one small copy per request: pandas has no allocation-free
+path to a mixed-dtype row, and per-column access is about ten times slower
+than that copy. The state lives in a file-backed shared mapping
+(``DRIFT_STATE_DIR``, default ``/dev/shm``) keyed by the reference.
+Every worker process serving the same models therefore updates one set of
+counts, under an exclusive file lock. The counts outlive worker restarts
+until they are reset.
+
+``report`` compares the live histograms with the reference. It gives the
+population stability index (PSI) and the Kolmogorov-Smirnov statistic of
+the binned CDFs per feature. The binned KS statistic is a lower bound on the
+exact one.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/drift.py --build-reference
+    python src/models/drift.py --report
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DRIFT_REFERENCE_FILE = "drift_reference.json"
+
+# Equal-width bins per feature over its training range (plus underflow/overflow);
+# more bins make the PSI of a few hundred rows noisy
+DRIFT_BINS = 10
+
+# Conventional PSI bands: below 0.1 stable, above 0.25 a significant shift
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+# Floor on bin proportions so empty bins keep the PSI finite
+PSI_EPSILON = 1e-4
+
+# Family-wise significance of the per-feature two-sample KS tests
+KS_ALPHA = 0.05
+
+# Live rows needed before features are flagged
+DRIFT_MIN_OBSERVATIONS = 200
+
+def build_reference(X: pd.DataFrame, bins: int = DRIFT_BINS) -> Dict:
+    """
+    Bin edges, histograms and moments of the training features.
+
+    Args:
+        X: Training features
+        bins: Equal-width bins per feature between its minimum and maximum
+
+    Returns:
+        Dict: The reference, as saved by ``save_reference``
+    """
+    values = X.to_numpy(dtype=np.float64)
+    low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    # Widened slightly so the maximum falls in the last bin, not the overflow bin
+    span = (high - low) * (1 + 1e-9)
+    inv_width = np.where(span > 0, bins / np.where(span > 0, span, 1.0), 1.0)
+
+    slots = np.clip(np.floor((values - low) * inv_width) + 1, 0, bins + 1).astype(np.intp)
+    counts = np.zeros((X.shape[1], bins + 2), dtype=np.int64)
+    for j in range(X.shape[1]):
+        column = slots[~np.isnan(values[:, j]), j]
+        counts[j] = np.bincount(column, minlength=bins + 2)
+
+    return {
+        'bins': bins,
+        'observations': int(len(X)),
+        'features': list(X.columns),
+        'low': low.tolist(),
+        'inv_width': inv_width.tolist(),
+        'mean': np.nanmean(values, axis=0).tolist(),
+        'std': np.nanstd(values, axis=0).tolist(),
+        'counts': counts.tolist()
+    }
+
+def save_reference(X: pd.DataFrame, model_dir: str, bins: int = DRIFT_BINS) -> str:
+    """Build the drift reference from the training features and save it next to the models."""
+    path = os.path.join(model_dir, DRIFT_REFERENCE_FILE)
+    with open(path, 'w') as f:
+        json.dump(build_reference(X, bins), f)
+    logger.info(f"Drift reference written to {path}")
+    return path
+
+def load_reference(model_dir: str) -> Dict:
+    """
+    Load the drift reference saved at training time.
+
+    Raises:
+        FileNotFoundError: If no reference has been saved
+    """
+    path = os.path.join(model_dir, DRIFT_REFERENCE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Drift reference not found: {path}. Please run train_model.py "
+                                f"or src/models/drift.py --build-reference first.")
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class FileLock:
+    """Reusable exclusive ``flock`` on an open file; excludes other processes, not other threads."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+def default_state_dir() -> str:
+    """Directory of the shared drift state: ``DRIFT_STATE_DIR``, else /dev/shm, else the temp dir."""
+    state_dir = os.getenv('DRIFT_STATE_DIR')
+    if state_dir:
+        return state_dir
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+class DriftMonitor:
+    """Per-feature histograms and moments of live rows, shared by every process serving a reference."""
+
+    def __init__(self, reference: Dict, state_dir: str = None):
+        """
+        Attach to the shared state for ``reference``, creating it if needed.
+
+        Args:
+            reference: Output of ``build_reference`` / ``load_reference``
+            state_dir: Directory of the state file (default: ``default_state_dir()``)
+        """
+        self.reference = reference
+        self.features = reference['features']
+        self.bins = reference['bins']
+        n_features, n_slots = len(self.features), self.bins + 2
+
+        self.low = np.asarray(reference['low'], dtype=np.float64)
+        self.inv_width = np.asarray(reference['inv_width'], dtype=np.float64)
+        self.reference_counts = np.asarray(reference['counts'], dtype=np.float64)
+
+        # Layout: observations, sums, sums of squares, bin counts (float64 counts are exact to 2**53)
+        size = 1 + 2 * n_features + n_features * n_slots
+        digest = hashlib.sha256(json.dumps(reference, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(state_dir or default_state_dir(), f"predictor-drift-{digest}.bin")
+        self._file = open(self.path, 'a+b')
+        self._file_lock = FileLock(self._file)
+        with self._file_lock:
+            if os.fstat(self._file.fileno()).st_size != size * 8:
+                os.ftruncate(self._file.fileno(), 0)
+                os.ftruncate(self._file.fileno(), size * 8)
+        self._state = np.memmap(self.path, dtype=np.float64, mode='r+', shape=(size,))
+        self._observations = self._state[0:1]
+        self._sums = self._state[1:1 + n_features]
+        self._squares = self._state[1 + n_features:1 + 2 * n_features]
+        self._counts = self._state[1 + 2 * n_features:]
+
+        # Scratch buffers reused by every update, under the thread lock
+        self._lock = threading.Lock()
+        self._row = np.empty(n_features, dtype=np.float64)
+        self._scratch = np.empty(n_features, dtype=np.float64)
+        self._slots = np.empty(n_features, dtype=np.intp)
+        self._offsets = np.arange(n_features, dtype=np.intp) * n_slots
+        self._columns, self._positions = None, None
+
+    def observe(self, frame: pd.DataFrame) -> None:
+        """
+        Add every row of ``frame`` to the live histograms and moments.
+
+        The frame's values are copied out once (a ``rows x columns``
+        array); each row is then gathered into a preallocated buffer and
+        added by ``_update`` without further allocation.
+
+        Args:
+            frame: Preprocessed features with (at least) the reference's columns
+
+        Raises:
+            KeyError: If a reference feature is missing from ``frame``
+        """
+        with self._lock:
+            if self._columns is None or not frame.columns.equals(self._columns):
+                positions = frame.columns.get_indexer(self.features)
+                if (positions < 0).any():
+                    missing = [f for f, p in zip(self.features, positions) if p < 0]
+                    raise KeyError(f"Drift features missing from the input: {', '.join(missing)}")
+                self._columns, self._positions = frame.columns, positions
+            values = frame.to_numpy(dtype=np.float64)
+            for i in range(len(values)):
+                np.take(values[i], self._positions, out=self._row)
+                self._update(self._row)
+
+    def _update(self, row: np.ndarray) -> None:
+        """Bin one feature row and add it to the shared state in place (caller holds ``self._lock``)."""
+        if not np.isfinite(row.sum()):
+            return
+        scratch, slots = self._scratch, self._slots
+        np.subtract(row, self.low, out=scratch)
+        np.multiply(scratch, self.inv_width, out=scratch)
+        np.floor(scratch, out=scratch)
+        np.add(scratch, 1, out=scratch)
+        np.clip(scratch, 0, self.bins + 1, out=scratch)
+        np.copyto(slots, scratch, casting='unsafe')
+        np.add(slots, self._offsets, out=slots)
+        np.multiply(row, row, out=scratch)
+
+        with self._file_lock:
+            self._observations += 1
+            np.add(self._sums, row, out=self._sums)
+            np.add(self._squares, scratch, out=self._squares)
+            np.add.at(self._counts, slots, 1.0)
+
+    def snapshot(self) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """Consistent copy of the shared state: (observations, sums, sums of squares, counts per feature)."""
+        with self._lock, self._file_lock:
+            return (int(self._observations[0]), self._sums.copy(), self._squares.copy(),
+                    self._counts.reshape(len(self.features), self.bins + 2).copy())
+
+    def reset(self) -> None:
+        """Zero the shared state, e.g. after acting on a drift alert."""
+        with self._lock, self._file_lock:
+            self._state[:] = 0
+
+    def report(self, min_observations: int = DRIFT_MIN_OBSERVATIONS) -> Dict:
+        """
+        Compare the live traffic with the training reference.
+
+        A feature is flagged when its PSI exceeds ``PSI_ALERT`` or its binned
+        KS statistic exceeds the two-sample critical value at ``KS_ALPHA``,
+        Bonferroni-corrected for the number of features. Features are only
+        flagged once ``min_observations`` rows have been seen.
+
+        Returns:
+            Dict: Observation counts, the KS critical value, the flagged
+            features (largest PSI first) and per-feature PSI, KS, means and
+            standard deviations
+        """
+        n, sums, squares, counts = self.snapshot()
+        n_reference = self.reference['observations']
+        if n == 0:
+            return {'status': 'no_traffic', 'observations': 0, 'reference_observations': n_reference,
+                    'drifted_features': [], 'features': {}}
+
+        live = counts / n
+        expected = self.reference_counts / self.reference_counts.sum(axis=1, keepdims=True)
+        live_p, expected_p = np.maximum(live, PSI_EPSILON), np.maximum(expected, PSI_EPSILON)
+        psi = np.sum((live_p - expected_p) * np.log(live_p / expected_p), axis=1)
+        ks = np.max(np.abs(np.cumsum(live, axis=1) - np.cumsum(expected, axis=1)), axis=1)
+        coefficient = np.sqrt(-0.5 * np.log(KS_ALPHA / (2 * len(self.features))))
+        critical = coefficient * np.sqrt((n + n_reference) / (n * n_reference))
+        mean = sums / n
+        std = np.sqrt(np.maximum(squares / n - mean ** 2, 0))
+
+        features = {}
+        for j, name in enumerate(self.features):
+            if psi[j] > PSI_ALERT or ks[j] > critical:
+                status = 'drift'
+            elif psi[j] > PSI_WARNING:
+                status = 'warning'
+            else:
+                status = 'stable'
+            features[name] = {
+                'status': status,
+                'psi': float(psi[j]),
+                'ks': float(ks[j]),
+                'mean': float(mean[j]),
+                'reference_mean': self.reference['mean'][j],
+                'std': float(std[j]),
+                'reference_std': self.reference['std'][j],
+                'out_of_range_fraction': float(live[j, 0] + live[j, -1])
+            }
+
+        enough = n >= min_observations
+        drifted = sorted((name for name, entry in features.items() if entry['status'] == 'drift'),
+                         key=lambda name: -features[name]['psi']) if enough else []
+        return {
+            'status': ('drift' if drifted else 'stable') if enough else 'insufficient_data',
+            'observations': n,
+            'reference_observations': n_reference,
+            'ks_critical_value': float(critical),
+            'drifted_features': drifted,
+            'features': features
+        }
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    # Add the parent directory to Python path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from data_preprocessing.prepare_data import load_processed_dataset
+
+    parser = argparse.ArgumentParser(description="Build the drift reference or report drift of the prediction traffic")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--build-reference', action='store_true',
+                        help="Save the reference histograms of X_train next to the models")
+    parser.add_argument('--bins', type=int, default=DRIFT_BINS)
+    parser.add_argument('--report', action='store_true', help="Print the drift of the traffic seen so far")
+    parser.add_argument('--reset', action='store_true', help="Zero the live histograms and moments")
+    args = parser.parse_args()
+
+    if args.build_reference:
+        save_reference(load_processed_dataset("X_train", args.data_dir), args.model_dir, args.bins)
+    monitor = DriftMonitor(load_reference(args.model_dir))
+    if args.report:
+        report = monitor.report()
+        print(f"{report['observations']} rows observed, status {report['status']}, "
+              f"KS critical value {report.get('ks_critical_value', float('nan')):.4f}")
+        print(f"{'feature':<22}{'status':>9}{'PSI':>9}{'KS':>8}{'mean':>10}{'ref mean':>10}{'out of range':>14}")
+        for name, entry in sorted(report['features'].items(), key=lambda item: -item[1]['psi']):
+            print(f"{name:<22}{entry['status']:>9}{entry['psi']:>9.4f}{entry['ks']:>8.4f}{entry['mean']:>10.2f}"
+                  f"{entry['reference_mean']:>10.2f}{entry['out_of_range_fraction']:>14.1%}")
+    if args.reset:
+        monitor.reset()
+        logger.info(f"Drift state reset: {monitor.path}")
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Metrics reported for every evaluated (model, target) column
+METRICS = ['mse', 'rmse', 'mae', 'r2']
+
+# Upper bound on resample-by-row matrix elements held at once while bootstrapping
+BOOTSTRAP_BATCH_ELEMENTS = 2 ** 24
+
+def model_input(model, X: pd.DataFrame) -> pd.DataFrame:
+    """
+    The columns of ``X`` a model was trained on.
+
+    Models refit on a selected feature subset (``feature_selection.py``)
+    take fewer columns than the full feature frame; others get ``X`` as is.
+    """
+    if getattr(model, 'n_features_in_', X.shape[1]) == X.shape[1]:
+        return X
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        names = model.feature_name_  # LightGBM
+    return X[list(names)]
+
+def predict_models(models: Dict, X: pd.DataFrame, n_jobs: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Predict the same test set with several models concurrently.
+
+    Threads are enough here: XGBoost, LightGBM and scikit-learn forests
+    release the GIL while predicting, and the models need not be pickled.
+
+    Args:
+        models: Fitted models keyed by name
+        X: Test features
+        n_jobs: Worker threads (defaults to one per model)
+
+    Returns:
+        Dict[str, np.ndarray]: Predictions keyed by model name
+    """
+    if not models:
+        return {}
+    with ThreadPoolExecutor(max_workers=n_jobs or len(models)) as executor:
+        futures = {name: executor.submit(model.predict, model_input(model, X)) for name, model in models.items()}
+        return {name: np.asarray(future.result(), dtype=np.float64) for name, future in futures.items()}
+
+def regression_metrics(Y: np.ndarray, P: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute regression metrics for every column of a stacked predictions matrix.
+
+    Args:
+        Y: Targets, shape (n_samples, n_columns)
+        P: Predictions aligned with ``Y``
+
+    Returns:
+        Dict[str, np.ndarray]: One array of length n_columns per metric
+    """
+    err = P - Y
+    mse = np.mean(err ** 2, axis=0)
+    sst = np.sum((Y - Y.mean(axis=0)) ** 2, axis=0)
+    return {
+        'mse': mse,
+        'rmse': np.sqrt(mse),
+        'mae': np.mean(np.abs(err), axis=0),
+        'r2': 1.0 - mse * len(Y) / sst
+    }
+
+def bootstrap_intervals(Y: np.ndarray, P: np.ndarray, n_resamples: int = 1000,
+                        confidence: float = 0.95, seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Percentile bootstrap confidence intervals for every metric and column.
+
+    Resampled row indices are turned into per-resample row counts, so each
+    metric over a whole batch of resamples is a single matrix product with
+    the per-row errors rather than a Python loop.
+
+    Args:
+        Y: Targets, shape (n_samples, n_columns)
+        P: Predictions aligned with ``Y``
+        n_resamples: Number of bootstrap resamples
+        confidence: Two-sided confidence level
+        seed: Random seed for the resample indices
+
+    Returns:
+        Dict[str, np.ndarray]: Array of shape (2, n_columns) with the lower
+        and upper bound per metric
+    """
+    n = len(Y)
+    rng = np.random.default_rng(seed)
+    err = P - Y
+    sq_err, abs_err = err ** 2, np.abs(err)
+    Y_sq = Y ** 2
+
+    batch = max(1, min(n_resamples, BOOTSTRAP_BATCH_ELEMENTS // n))
+    samples = {metric: [] for metric in METRICS}
+    for start in range(0, n_resamples, batch):
+        size = min(batch, n_resamples - start)
+        idx = rng.integers(0, n, size=(size, n))
+        offsets = np.arange(size)[:, None] * n
+        counts = np.bincount((idx + offsets).ravel(), minlength=size * n).reshape(size, n).astype(np.float64)
+
+        mse = counts @ sq_err / n
+        sst = counts @ Y_sq - (counts @ Y) ** 2 / n
+        samples['mse'].append(mse)
+        samples['rmse'].append(np.sqrt(mse))
+        samples['mae'].append(counts @ abs_err / n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            samples['r2'].append(1.0 - mse * n / sst)
+
+    alpha = (1.0 - confidence) / 2
+    return {
+        metric: np.nanpercentile(np.concatenate(values), [100 * alpha, 100 * (1 - alpha)], axis=0)
+        for metric, values in samples.items()
+    }
+
+def evaluate_predictions(columns: List[str], Y: np.ndarray, P: np.ndarray, n_bootstrap: int = 0,
+                         confidence: float = 0.95, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """
+    Evaluate stacked predictions, optionally with bootstrap confidence intervals.
+
+    Args:
+        columns: Name of each column of ``Y``/``P``
+        Y: Targets, shape (n_samples, n_columns)
+        P: Predictions aligned with ``Y``
+        n_bootstrap: Bootstrap resamples (0 disables confidence intervals)
+        confidence: Two-sided confidence level
+        seed: Random seed for the resample indices
+
+    Returns:
+        Dict: Metrics per column name; with bootstrapping, ``rmse_ci_low``,
+        ``rmse_ci_high`` and so on for RMSE, MAE and R²
+    """
+    point = regression_metrics(Y, P)
+    metrics = {
+        name: {metric: float(point[metric][i]) for metric in METRICS}
+        for i, name in enumerate(columns)
+    }
+
+    if n_bootstrap > 0:
+        intervals = bootstrap_intervals(Y, P, n_bootstrap, confidence, seed)
+        for i, name in enumerate(columns):
+            for metric in ['rmse', 'mae', 'r2']:
+                metrics[name][f'{metric}_ci_low'] = float(intervals[metric][0, i])
+                metrics[name][f'{metric}_ci_high'] = float(intervals[metric][1, i])
+
+    return metrics
+
+def save_metrics(metrics: Dict, path: str, n_bootstrap: int = 0, confidence: float = 0.95) -> None:
+    """
+    Write evaluation metrics to a JSON file.
+
+    Args:
+        metrics: Metrics per model, as returned by ``evaluate_predictions``
+        path: Output JSON path
+        n_bootstrap: Bootstrap resamples behind the confidence intervals
+        confidence: Confidence level of the intervals
+    """
+    with open(path, 'w') as f:
+        json.dump({'n_bootstrap': n_bootstrap, 'confidence': confidence, 'models': metrics}, f, indent=2)
+    logger.info(f"Evaluation metrics written to {path}")
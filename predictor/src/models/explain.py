@@ -0,0 +1,214 @@
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import lightgbm as lgb
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+from typing import Optional, Tuple
+
+def forest_leaf_matrix(forest: RandomForestRegressor) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Build the sparse matrix that turns a forest's leaf indices into contributions.
+
+    Every leaf is mapped to the changes in node value along its path from
+    the root, each credited to the feature its parent split on (the tree
+    path decomposition) and divided by the number of trees, so a row's
+    contributions are the sum of the rows for the leaves it lands in.
+
+    Args:
+        forest: Fitted random forest
+
+    Returns:
+        Tuple of (matrix of shape (total nodes, outputs * features), bias per
+        output, first matrix row of each tree)
+    """
+    n_features, n_outputs = forest.n_features_in_, forest.n_outputs_
+    n_trees = len(forest.estimators_)
+    rows, cols, data, bias = [], [], [], np.zeros(n_outputs)
+    offsets = []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        values = tree.value[:, :, 0] / n_trees
+        bias += values[0]
+        stack = [(0, [])]
+        while stack:
+            node, path = stack.pop()
+            left, right = tree.children_left[node], tree.children_right[node]
+            if left == -1:
+                for feature, delta in path:
+                    for output in range(n_outputs):
+                        rows.append(offset + node)
+                        cols.append(output * n_features + feature)
+                        data.append(delta[output])
+                continue
+            for child in (left, right):
+                stack.append((child, path + [(tree.feature[node], values[child] - values[node])]))
+        offsets.append(offset)
+        offset += tree.node_count
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(offset, n_outputs * n_features))
+    return matrix, bias, np.array(offsets)
+
+def booster_leaf_matrix(model: lgb.LGBMModel) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Build the sparse matrix that turns LightGBM leaf indices into contributions.
+
+    Every leaf of every tree is mapped to the changes in node value along its
+    path from the root, each credited to the feature split on, so a row's
+    contributions are the sum of the rows for the leaves it lands in.
+
+    Args:
+        model: Fitted LightGBM regressor
+
+    Returns:
+        Tuple of (matrix of shape (total leaves, features), bias, first matrix
+        row of each tree)
+    """
+    rows, cols, data, bias = [], [], [], 0.0
+    offsets = []
+    offset = 0
+    for tree in model.booster_.dump_model()['tree_info']:
+        root = tree['tree_structure']
+        bias += root.get('internal_value', root.get('leaf_value', 0.0))
+        stack = [(root, [])]
+        while stack:
+            node, path = stack.pop()
+            if 'leaf_index' in node:
+                for feature, delta in path:
+                    rows.append(offset + node['leaf_index'])
+                    cols.append(feature)
+                    data.append(delta)
+                continue
+            for child in (node['left_child'], node['right_child']):
+                child_value = child.get('internal_value', child.get('leaf_value'))
+                stack.append((child, path + [(node['split_feature'], child_value - node['internal_value'])]))
+        offsets.append(offset)
+        offset += tree['num_leaves']
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(offset, model.n_features_in_))
+    return matrix, np.array([bias]), np.array(offsets)
+
+def single_target_boosters(model: xgb.XGBModel) -> Tuple[xgb.Booster, ...]:
+    """
+    Split an XGBoost model with multi-target trees into one booster per target.
+
+    Multi-target trees store a vector of weights per node; each copy keeps
+    the tree structure and hessians with one target's weights, so it
+    predicts exactly that target and supports ``pred_contribs``, which
+    multi-target trees do not.
+
+    Args:
+        model: XGBoost model trained with ``multi_strategy='multi_output_tree'``
+
+    Returns:
+        Tuple of boosters, one per target in output order
+    """
+    raw = json.loads(model.get_booster().save_raw('json'))
+    params = raw['learner']['learner_model_param']
+    n_targets = int(params['num_target'])
+    base_score = json.loads(params['base_score'].replace('E', 'e'))
+    
+    boosters = []
+    for target in range(n_targets):
+        single = copy.deepcopy(raw)
+        single_params = single['learner']['learner_model_param']
+        single_params['num_target'] = '1'
+        if isinstance(base_score, list):
+            single_params['base_score'] = f'[{base_score[target]:E}]'
+        for tree in single['learner']['gradient_booster']['model']['trees']:
+            weights = tree['base_weights'][target::n_targets]
+            is_leaf = [child == -1 for child in tree['left_children']]
+            # Single-target trees keep leaf values in split_conditions and
+            # mark leaves with -1 children and the root with an invalid parent
+            tree['base_weights'] = weights
+            tree['split_conditions'] = [weight if leaf else condition for weight, leaf, condition
+                                        in zip(weights, is_leaf, tree['split_conditions'])]
+            tree['right_children'] = [-1 if leaf else child for leaf, child in zip(is_leaf, tree['right_children'])]
+            tree['parents'] = [2147483647 if parent == -1 else parent for parent in tree['parents']]
+            tree['tree_param']['size_leaf_vector'] = '1'
+            tree.pop('leaf_weights', None)
+        booster = xgb.Booster()
+        booster.load_model(bytearray(json.dumps(single).encode()))
+        boosters.append(booster)
+    return tuple(boosters)
+
+def contribution_table(model) -> Optional[Tuple]:
+    """Return the precomputed lookup ``model_contributions`` uses for a model, or None."""
+    if isinstance(model, xgb.XGBModel) and model.get_params().get('multi_strategy') == 'multi_output_tree':
+        return single_target_boosters(model)
+    if isinstance(model, RandomForestRegressor):
+        return forest_leaf_matrix(model)
+    if isinstance(model, lgb.LGBMModel):
+        return booster_leaf_matrix(model)
+    return None
+
+def model_contributions(model, X: pd.DataFrame, table: Optional[Tuple] = None,
+                        exact: bool = False) -> np.ndarray:
+    """
+    Per-feature contributions of a tree model's predictions for a batch.
+
+    By default every model family uses the tree path decomposition, which
+    costs about as much as prediction: XGBoost's native ``approx_contribs``,
+    and LightGBM ``pred_leaf`` or random forest ``apply`` leaf indices mapped
+    through a precomputed leaf matrix. With
+    ``exact``, boosted models return SHAP values from XGBoost
+    ``pred_contribs``/LightGBM ``pred_contrib`` instead, whose cost grows
+    with the square of tree depth. XGBoost multi-target trees are explained
+    through their single-target copies (``single_target_boosters``).
+
+    Args:
+        model: Fitted XGBoost, LightGBM or random forest regressor
+        X: Features, one row per student
+        table: Precomputed ``contribution_table`` output for the model
+        exact: Compute SHAP values for boosted models
+
+    Returns:
+        np.ndarray: Shape (rows, outputs, features + 1); the last column is the
+        bias, and each row sums to the model's prediction
+
+    Raises:
+        NotImplementedError: If the model cannot produce contributions
+    """
+    from models.evaluation import model_input
+
+    inputs = model_input(model, X)
+    if inputs is not X:
+        # Refit on a selected feature subset: the other features contribute nothing
+        values = model_contributions(model, inputs, table, exact)
+        expanded = np.zeros((len(X), values.shape[1], X.shape[1] + 1))
+        expanded[:, :, X.columns.get_indexer(inputs.columns)] = values[:, :, :-1]
+        expanded[:, :, -1] = values[:, :, -1]
+        return expanded
+
+    n_features = X.shape[1]
+    if isinstance(model, xgb.XGBModel):
+        inputs = xgb.DMatrix(X)
+        if model.get_params().get('multi_strategy') == 'multi_output_tree':
+            boosters = table if table is not None else single_target_boosters(model)
+            return np.stack([
+                booster.predict(inputs, pred_contribs=True, approx_contribs=not exact)
+                for booster in boosters
+            ], axis=1)
+        contributions = model.get_booster().predict(inputs, pred_contribs=True,
+                                                    approx_contribs=not exact)
+        return contributions.reshape(len(X), -1, n_features + 1)
+    if isinstance(model, lgb.LGBMModel) and exact:
+        return model.predict(X, pred_contrib=True).reshape(len(X), 1, n_features + 1)
+    if not isinstance(model, (lgb.LGBMModel, RandomForestRegressor)):
+        raise NotImplementedError(f"No contributions for {type(model).__name__}")
+
+    matrix, bias, offsets = table if table is not None else contribution_table(model)
+    if isinstance(model, lgb.LGBMModel):
+        leaves = model.predict(X, pred_leaf=True).reshape(len(X), -1)
+    else:
+        leaves = model.apply(X)
+    leaves = leaves + offsets[:leaves.shape[1]]
+    indicator = sparse.csr_matrix(
+        (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, leaves.shape[1])),
+        shape=(len(X), matrix.shape[0])
+    )
+    feature_part = (indicator @ matrix).toarray().reshape(len(X), len(bias), n_features)
+    bias_part = np.broadcast_to(bias, (len(X), len(bias)))[:, :, None]
+    return np.concatenate([feature_part, bias_part], axis=2)
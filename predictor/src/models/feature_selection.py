@@ -0,0 +1,308 @@
+"""
+Importance-driven feature selection for the subject models.
+
+Features are ranked per subject by the importance of that subject's models.
+The ranking is either aggregated gain of the trained models (random forest
+impurity decrease, XGBoost total gain, LightGBM split gain), or permutation
+importance on the validation folds of a 5-fold CV over ``X_train``, computed
+in parallel. The top ``k`` features are then tried for growing ``k``. For
+each set, every model is refit with its saved hyperparameters on each CV
+fold. The smallest set whose out-of-fold ensemble RMSE stays within
+``--tolerance`` of the full-feature ensemble's is kept, and the models are
+refit on all of ``X_train`` with it. ``X_test`` plays no part in the choice.
+It is only used to report the result.
+
+Refit models and ``selected_features.json`` go to ``<model_dir>/selected``.
+``selection_report.json`` next to them gives the CV RMSE and, on the test
+set, the size, single-row and batch latency and RMSE before and after.
+``--apply`` also installs the models in ``<model_dir>``, after which serving
+feeds each model only its columns. It then refreshes their entries in
+``subject_feature_importance.json`` and recalibrates ``cascade.json`` if
+cascades were calibrated. The full-feature models stay in
+``models/checkpoints/``.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/feature_selection.py --ranking permutation --step 5 --tolerance 0.01
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cascade import CASCADE_FILE
+from models.compress import EnsembleAverage, measure
+from models.train_model import CVFolds, StudentPerformanceModel
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SELECTED_FEATURES_FILE = "selected_features.json"
+
+def gain_importance(model, features: List[str]) -> np.ndarray:
+    """
+    Normalized gain importance of a fitted tree model, aligned with ``features``.
+
+    Args:
+        model: Fitted RandomForestRegressor, XGBRegressor or LGBMRegressor
+        features: Columns the model was trained on
+
+    Returns:
+        np.ndarray: Importance per feature, summing to 1
+    """
+    import lightgbm as lgb
+
+    if isinstance(model, RandomForestRegressor):
+        values = model.feature_importances_
+    elif isinstance(model, lgb.LGBMModel):
+        values = model.booster_.feature_importance(importance_type='gain')
+    else:
+        scores = model.get_booster().get_score(importance_type='total_gain')
+        values = [scores.get(feature, 0.0) for feature in features]
+    values = np.asarray(values, dtype=np.float64)
+    return values / values.sum() if values.sum() > 0 else values
+
+def permutation_importance_scores(model, X: np.ndarray, y: np.ndarray, n_repeats: int = 5,
+                                  n_jobs: Optional[int] = None) -> np.ndarray:
+    """
+    Normalized permutation importance (MSE increase) of a fitted model.
+
+    Columns are permuted in parallel worker processes.
+
+    Returns:
+        np.ndarray: Importance per column of ``X``, clipped at zero and summing to 1
+    """
+    from sklearn.inspection import permutation_importance
+
+    result = permutation_importance(model, X, y, scoring='neg_mean_squared_error', n_repeats=n_repeats,
+                                    random_state=42, n_jobs=n_jobs)
+    values = np.clip(result.importances_mean, 0, None)
+    return values / values.sum() if values.sum() > 0 else values
+
+def rank_features(models: Dict, folds: CVFolds, method: str = 'gain',
+                  n_jobs: Optional[int] = None) -> pd.Series:
+    """
+    Rank features for one target by the mean normalized importance of its models.
+
+    Args:
+        models: The target's models keyed by name, fitted on all training rows
+        folds: CV folds over the training features and the target
+        method: ``gain`` (of the fitted models) or ``permutation`` (of each
+            model refit per fold, on the fold's validation rows)
+        n_jobs: Worker processes for permutation importance
+
+    Returns:
+        pd.Series: Importance per feature, most important first
+    """
+    if method == 'gain':
+        importances = [gain_importance(model, folds.feature_names) for model in models.values()]
+    elif method == 'permutation':
+        importances = [
+            permutation_importance_scores(clone(model).fit(X_tr, y_tr), X_va, y_va, n_jobs=n_jobs)
+            for X_tr, y_tr, X_va, y_va in folds.arrays
+            for model in models.values()
+        ]
+    else:
+        raise ValueError(f"Unknown ranking method: {method}")
+    return pd.Series(np.mean(importances, axis=0), index=folds.feature_names).sort_values(ascending=False)
+
+def cv_ensemble_rmse(models: Dict, folds: CVFolds, features: List[str]) -> float:
+    """Out-of-fold RMSE of the models' average, each refit per fold on ``features``."""
+    columns = [folds.feature_names.index(feature) for feature in features]
+    predictions = np.empty(len(folds.y), dtype=np.float64)
+    for (_, valid_idx), (X_tr, y_tr, X_va, _) in zip(folds.indices, folds.arrays):
+        predictions[valid_idx] = np.mean([
+            clone(model).fit(X_tr[:, columns], y_tr).predict(X_va[:, columns]) for model in models.values()
+        ], axis=0)
+    return float(np.sqrt(np.mean((predictions - folds.y) ** 2)))
+
+def select_subject_features(models: Dict, X_train: pd.DataFrame, y_train, folds: CVFolds,
+                            ranking: pd.Series, step: int = 5,
+                            tolerance: float = 0.01) -> Tuple[List[str], Dict, Dict]:
+    """
+    Find the smallest top-ranked feature set that keeps a subject's ensemble accurate.
+
+    Candidate sets are the top ``step``, ``2 * step``, ... features, tried
+    smallest first. Each is scored by the ensemble's out-of-fold CV RMSE,
+    with every model refit per fold with its own hyperparameters. The first
+    set within ``tolerance`` (relative) of the full-feature ensemble's CV
+    RMSE is kept. The test set is never used.
+
+    Args:
+        models: The subject's fitted full-feature models keyed by name
+        X_train: Training features
+        y_train: Training targets for the subject
+        folds: CV folds over ``X_train`` and ``y_train``
+        ranking: Output of rank_features
+        step: Features added per candidate set
+        tolerance: Allowed relative CV RMSE increase over the full-feature ensemble
+
+    Returns:
+        Tuple of (selected features in feature order, models refit on all
+        training rows keyed by name, CV RMSE of the full and selected
+        ensembles); all features and the original models if no smaller set
+        qualifies
+    """
+    baseline = cv_ensemble_rmse(models, folds, folds.feature_names)
+    for size in range(step, len(ranking), step):
+        selected = set(ranking.index[:size])
+        features = [column for column in X_train.columns if column in selected]
+        candidate = cv_ensemble_rmse(models, folds, features)
+        logger.info(f"{size} features: CV RMSE {candidate:.4f} (full-feature ensemble {baseline:.4f})")
+        if candidate <= baseline * (1 + tolerance):
+            refit = {name: clone(model).fit(X_train[features], y_train) for name, model in models.items()}
+            return features, refit, {'full_cv_rmse': baseline, 'selected_cv_rmse': candidate}
+    return list(X_train.columns), models, {'full_cv_rmse': baseline, 'selected_cv_rmse': baseline}
+
+def select_features(model_dir: str = "models", method: str = 'gain', step: int = 5,
+                    tolerance: float = 0.01, n_jobs: Optional[int] = None, apply: bool = False) -> Dict:
+    """
+    Select features for every subject and save the refit models.
+
+    Multi-output models answer every subject from one feature set and are
+    left untouched; the per-subject models next to them are still reduced.
+
+    Args:
+        model_dir: Directory holding the trained models
+        method: Feature ranking, ``gain`` or ``permutation``
+        step: Features added per candidate set
+        tolerance: Allowed relative CV RMSE increase per subject
+        n_jobs: Worker processes for permutation importance
+        apply: Also install the refit models and feature lists in ``model_dir``,
+            refresh their feature importance and recalibrate the cascades
+
+    Returns:
+        Dict: Report per subject with the selected features, the CV RMSE
+        the choice was made on and the full-feature and selected ensembles'
+        test-set measurements
+    """
+    trainer = StudentPerformanceModel(model_dir)
+    X_train, X_test, y_train, y_test = trainer.load_data()
+    trainer.load_trained_models()
+
+    output_dir = os.path.join(model_dir, "selected")
+    os.makedirs(output_dir, exist_ok=True)
+
+    report, selected_features = {}, {}
+    for subject in ['ads', 'ds', 'am', 'java', 'dbms']:
+        models = {f"{subject}_{model_type}": trainer.subject_models[f"{subject}_{model_type}"]
+                  for model_type in ['rf', 'xgb', 'lgb']
+                  if f"{subject}_{model_type}" in trainer.subject_models}
+        if not models:
+            continue
+        target = f'{subject}_performance'
+        folds = CVFolds(X_train, y_train[target])
+
+        ranking = rank_features(models, folds, method, n_jobs)
+        features, refit, cv = select_subject_features(models, X_train, y_train[target], folds,
+                                                      ranking, step, tolerance)
+
+        # Held-out report only; the test set played no part in the choice
+        y_test_subject = y_test[target].to_numpy(dtype=np.float64)
+        before = measure(EnsembleAverage(list(models.values())), X_test, y_test_subject)
+        after = measure(EnsembleAverage(list(refit.values())), X_test, y_test_subject)
+        report[subject] = {
+            'n_features': len(features), 'features': features, **cv, 'full': before, 'selected': after,
+            'rmse_delta': after['rmse'] - before['rmse']
+        }
+        trainer.subject_models.update(refit)
+        selected_features[subject] = features
+        for name, model in refit.items():
+            joblib.dump(model, os.path.join(output_dir, f"{name}.joblib"))
+        logger.info(f"{subject}: {len(features)} of {X_train.shape[1]} features, "
+                    f"test RMSE delta {after['rmse'] - before['rmse']:+.4f}")
+
+    with open(os.path.join(output_dir, SELECTED_FEATURES_FILE), 'w') as f:
+        json.dump(selected_features, f, indent=2)
+    with open(os.path.join(output_dir, "selection_report.json"), 'w') as f:
+        json.dump({'method': method, 'step': step, 'tolerance': tolerance, 'subjects': report}, f, indent=2)
+
+    if apply:
+        for subject in selected_features:
+            for model_type in ['rf', 'xgb', 'lgb']:
+                path = os.path.join(output_dir, f"{subject}_{model_type}.joblib")
+                if os.path.exists(path):
+                    shutil.copyfile(path, os.path.join(model_dir, f"{subject}_{model_type}.joblib"))
+        shutil.copyfile(os.path.join(output_dir, SELECTED_FEATURES_FILE),
+                        os.path.join(model_dir, SELECTED_FEATURES_FILE))
+        logger.info(f"Installed the selected-feature models in {model_dir}")
+        refresh_dependents(model_dir, trainer.subject_models, selected_features)
+    return report
+
+def refresh_dependents(model_dir: str, subject_models: Dict, selected_features: Dict[str, List[str]]) -> None:
+    """
+    Bring the artifacts derived from the installed subject models up to date.
+
+    The reduced models' entries in ``subject_feature_importance.json`` are
+    replaced, ``cascade.json``, if present, is recalibrated with its
+    previous tolerance (its thresholds and costs were measured on the
+    full-feature models), and the cohort index, if present, is rebuilt with
+    its previous histogram bins (its ``{subject}_predicted`` columns came
+    from the full-feature models).
+    """
+    importance_path = os.path.join(model_dir, "subject_feature_importance.json")
+    importance = {}
+    if os.path.exists(importance_path):
+        with open(importance_path, 'r') as f:
+            importance = json.load(f)
+    for subject, features in selected_features.items():
+        for name, model in subject_models.items():
+            if name.startswith(f"{subject}_") and hasattr(model, 'feature_importances_'):
+                importance[name] = {feature: float(value)
+                                    for feature, value in zip(features, model.feature_importances_)}
+    with open(importance_path, 'w') as f:
+        json.dump(importance, f)
+
+    cascade_path = os.path.join(model_dir, CASCADE_FILE)
+    if os.path.exists(cascade_path):
+        from models.cascade import calibrate
+
+        with open(cascade_path, 'r') as f:
+            tolerance = json.load(f)['tolerance']
+        calibrate(model_dir, tolerance=tolerance)
+        logger.info("Recalibrated the cascades for the selected-feature models")
+
+    cohort_dir = os.path.join(model_dir, "cohort")
+    if os.path.exists(os.path.join(cohort_dir, "cohort.json")):
+        from models.cohort import CohortIndex, build_index
+
+        histograms = CohortIndex.load(cohort_dir).histograms
+        build_index(model_dir=model_dir, bins=0 if histograms is None else histograms.shape[1])
+        logger.info("Rebuilt the cohort index for the selected-feature models")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Select features per subject and refit the subject models")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--ranking', choices=['gain', 'permutation'], default='gain')
+    parser.add_argument('--step', type=int, default=5, help="Features added per candidate set")
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Allowed relative CV RMSE increase over the full-feature ensemble")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Processes for permutation importance")
+    parser.add_argument('--apply', action='store_true', help="Install the refit models in --model-dir")
+    args = parser.parse_args()
+
+    report = select_features(args.model_dir, args.ranking, args.step, args.tolerance, args.n_jobs, args.apply)
+
+    print(f"\n{'subject':<10}{'features':>10}{'size MB':>18}{'1-row ms':>18}{'batch ms':>18}"
+          f"{'CV RMSE':>20}{'test RMSE':>20}")
+    for subject, entry in report.items():
+        before, after = entry['full'], entry['selected']
+        print(f"{subject:<10}{entry['n_features']:>10}"
+              f"{before['size_bytes'] / 1e6:>8.2f} -> {after['size_bytes'] / 1e6:<6.2f}"
+              f"{before['single_row_ms']:>8.2f} -> {after['single_row_ms']:<7.2f}"
+              f"{before['batch_ms']:>8.2f} -> {after['batch_ms']:<7.2f}"
+              f"{entry['full_cv_rmse']:>8.4f} -> {entry['selected_cv_rmse']:<8.4f}"
+              f"{before['rmse']:>8.4f} -> {after['rmse']:<8.4f}")
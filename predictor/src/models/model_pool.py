@@ -0,0 +1,142 @@
+"""
+Memory-bounded pool of per-tenant model bundles.
+
+Each tenant (a college) has its own bundle directory under the tenants
+directory, laid out like ``models/``: subject models, scalers, label
+encoders, feature importance and the cohort and neighbor indexes. Bundles
+are loaded on first request into a ``RecommendationEngine`` and kept in
+least-recently-used order. When the
+measured artifact size of the resident bundles exceeds the budget, the least
+recently used bundles are evicted. Concurrent requests for a bundle that is
+still loading wait for that load instead of starting their own.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict
+
+from models.recommendations import RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+TENANT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+class UnknownTenant(LookupError):
+    """Raised when no model bundle exists for a tenant id."""
+
+# Bundle subdirectories the engine loads (checkpoints and the like are not)
+INDEX_DIRS = ['cohort', 'neighbors']
+
+def bundle_size(bundle_dir: str) -> int:
+    """Bytes of the artifacts a bundle loads: top-level files plus its cohort and neighbor indexes."""
+    return sum(
+        entry.stat().st_size
+        for directory in [bundle_dir] + [os.path.join(bundle_dir, name) for name in INDEX_DIRS]
+        if os.path.isdir(directory)
+        for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.endswith(('.joblib', '.json', '.npy'))
+    )
+
+class ModelBundlePool:
+    def __init__(self, tenants_dir: str = "models/tenants", max_bytes: int = 512 * 2 ** 20,
+                 offline: bool = False, cascade: bool = False):
+        """
+        Initialize an empty pool.
+
+        Args:
+            tenants_dir: Directory holding one bundle directory per tenant id
+            max_bytes: Budget for the artifact size of resident bundles; the
+                most recently used bundle is kept even if it alone exceeds it
+            offline: Build the engines without Gemini
+            cascade: Build the engines with early-exit cascades
+        """
+        self.tenants_dir = tenants_dir
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.cascade = cascade
+        self.bundles = OrderedDict()
+        self.loading = {}
+        self.resident_bytes = 0
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _tenant_metrics(self, tenant_id: str) -> Dict:
+        return self.metrics.setdefault(tenant_id, {'hits': 0, 'loads': 0, 'evictions': 0, 'bytes': 0})
+
+    def get(self, tenant_id: str) -> RecommendationEngine:
+        """
+        Return the engine for a tenant, loading its bundle if it is not resident.
+
+        Args:
+            tenant_id: Tenant identifier (letters, digits, ``-`` and ``_``)
+
+        Returns:
+            RecommendationEngine: Engine serving the tenant's bundle
+
+        Raises:
+            UnknownTenant: If the tenant id is malformed or has no bundle directory
+        """
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise UnknownTenant("Tenant id must be 1-64 letters, digits, '-' or '_'")
+
+        with self.lock:
+            if tenant_id in self.bundles:
+                self.bundles.move_to_end(tenant_id)
+                self._tenant_metrics(tenant_id)['hits'] += 1
+                return self.bundles[tenant_id][0]
+            future = self.loading.get(tenant_id)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.loading[tenant_id] = future
+        if not leader:
+            return future.result()
+
+        try:
+            engine, size = self._load(tenant_id)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[tenant_id]
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.loading[tenant_id]
+            self.bundles[tenant_id] = (engine, size)
+            self.resident_bytes += size
+            metrics = self._tenant_metrics(tenant_id)
+            metrics['loads'] += 1
+            metrics['bytes'] = size
+            self._evict()
+        future.set_result(engine)
+        return engine
+
+    def _load(self, tenant_id: str):
+        bundle_dir = os.path.join(self.tenants_dir, tenant_id)
+        if not os.path.isdir(bundle_dir):
+            raise UnknownTenant(f"No model bundle for tenant '{tenant_id}'")
+        engine = RecommendationEngine(bundle_dir, offline=self.offline, cascade=self.cascade)
+        size = bundle_size(bundle_dir)
+        logger.info(f"Loaded model bundle for tenant '{tenant_id}' ({size / 2 ** 20:.1f} MB)")
+        return engine, size
+
+    def _evict(self) -> None:
+        """Drop least recently used bundles until the pool fits its budget (lock held)."""
+        while self.resident_bytes > self.max_bytes and len(self.bundles) > 1:
+            tenant_id, (_, size) = self.bundles.popitem(last=False)
+            self.resident_bytes -= size
+            self._tenant_metrics(tenant_id)['evictions'] += 1
+            logger.info(f"Evicted model bundle for tenant '{tenant_id}' ({size / 2 ** 20:.1f} MB)")
+
+    def stats(self) -> Dict:
+        """Pool occupancy and per-tenant hit/load/eviction counts."""
+        with self.lock:
+            return {
+                'resident_tenants': list(self.bundles),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'tenants': {tenant_id: dict(metrics) for tenant_id, metrics in self.metrics.items()}
+            }
@@ -0,0 +1,231 @@
+"""
+Nearest-neighbour index of historical students over the processed feature space.
+
+Features are standardized per column so marks (0-100) do not drown out the
+min-max scaled features. Queries use a KD-tree or ball tree, or a vectorized
+brute-force search. Following scikit-learn's own ``auto`` rule, brute force is
+the default above 15 features, where trees stop pruning well. Everything is
+saved as ``.npy`` arrays that are memory-mapped when the index is loaded.
+
+Usage (from the predictor directory, after prepare_data.py):
+    python src/models/neighbors.py --algorithm auto
+"""
+import json
+import logging
+import os
+import pickle
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree, KDTree
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.schema import SUBJECTS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TREES = {'kd_tree': KDTree, 'ball_tree': BallTree}
+
+# Upper bound on query-by-population distance matrix elements held at once
+BRUTE_BATCH_ELEMENTS = 2 ** 24
+
+class SimilarStudentIndex:
+    def __init__(self, columns: List[str], mean: np.ndarray, scale: np.ndarray, data: np.ndarray,
+                 outcomes: np.ndarray, algorithm: str = 'brute', tree=None):
+        """
+        Initialize the index.
+
+        Args:
+            columns: Feature columns, in index order
+            mean: Per-column mean used for standardization
+            scale: Per-column standard deviation used for standardization
+            data: Standardized training features, shape (students, features)
+            outcomes: Subject performance of each training student, shape (students, subjects)
+            algorithm: 'brute', 'kd_tree' or 'ball_tree'
+            tree: Fitted KDTree/BallTree over ``data`` for the tree algorithms
+        """
+        self.columns = columns
+        self.mean = mean
+        self.scale = scale
+        self.data = data
+        self.outcomes = outcomes
+        self.algorithm = algorithm
+        self.tree = tree
+        self.squared_norms = np.einsum('ij,ij->i', data, data) if algorithm == 'brute' else None
+
+    @classmethod
+    def build(cls, X: pd.DataFrame, y: pd.DataFrame, algorithm: str = 'auto',
+              leaf_size: int = 40) -> 'SimilarStudentIndex':
+        """
+        Build the index over training features.
+
+        Args:
+            X: Processed training features
+            y: Subject performance targets aligned with ``X``
+            algorithm: 'auto', 'brute', 'kd_tree' or 'ball_tree'
+            leaf_size: Leaf size for the tree algorithms
+
+        Returns:
+            SimilarStudentIndex: Index over ``X``
+        """
+        columns = list(X.columns)
+        values = X.to_numpy(dtype=np.float64)
+        mean = values.mean(axis=0)
+        scale = values.std(axis=0)
+        scale[scale == 0] = 1.0
+        standardized = (values - mean) / scale
+
+        if algorithm == 'auto':
+            algorithm = 'brute' if len(columns) > 15 else 'kd_tree'
+        tree = None
+        if algorithm == 'brute':
+            data = standardized.astype(np.float32)
+        else:
+            data = standardized
+            tree = TREES[algorithm](data, leaf_size=leaf_size)
+
+        outcomes = y[[f'{subject}_performance' for subject in SUBJECTS]].to_numpy(dtype=np.float32)
+        logger.info(f"Built {algorithm} index over {len(X)} students")
+        return cls(columns, mean, scale, data, outcomes, algorithm, tree)
+
+    def save(self, index_dir: str) -> None:
+        """Write the index to ``index_dir`` as ``.npy`` arrays plus metadata."""
+        os.makedirs(index_dir, exist_ok=True)
+        for name in ['mean', 'scale', 'outcomes']:
+            np.save(os.path.join(index_dir, f"{name}.npy"), getattr(self, name))
+
+        if self.tree is None:
+            np.save(os.path.join(index_dir, "data.npy"), self.data)
+        else:
+            # Tree arrays go to .npy files; the small remainder of the state is pickled
+            state = list(self.tree.__getstate__())
+            arrays = []
+            for i, item in enumerate(state):
+                if isinstance(item, np.ndarray):
+                    name = "data" if i == 0 else f"tree_{i}"
+                    np.save(os.path.join(index_dir, f"{name}.npy"), item)
+                    arrays.append((i, name))
+                    state[i] = None
+            with open(os.path.join(index_dir, "tree_state.pkl"), 'wb') as f:
+                pickle.dump({'state': state, 'arrays': arrays}, f)
+
+        with open(os.path.join(index_dir, "neighbors.json"), 'w') as f:
+            json.dump({'columns': self.columns, 'algorithm': self.algorithm, 'subjects': SUBJECTS}, f)
+        logger.info(f"Similar-student index saved to {index_dir}")
+
+    @classmethod
+    def load(cls, index_dir: str) -> 'SimilarStudentIndex':
+        """Load an index saved by ``save``, memory-mapping the feature and tree arrays."""
+        with open(os.path.join(index_dir, "neighbors.json"), 'r') as f:
+            metadata = json.load(f)
+        mean, scale = (np.load(os.path.join(index_dir, f"{name}.npy")) for name in ['mean', 'scale'])
+        outcomes = np.load(os.path.join(index_dir, "outcomes.npy"), mmap_mode='r')
+        data = np.load(os.path.join(index_dir, "data.npy"), mmap_mode='r')
+
+        tree = None
+        algorithm = metadata['algorithm']
+        if algorithm != 'brute':
+            try:
+                with open(os.path.join(index_dir, "tree_state.pkl"), 'rb') as f:
+                    saved = pickle.load(f)
+                state = saved['state']
+                for i, name in saved['arrays']:
+                    state[i] = np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r')
+                tree = TREES[algorithm].__new__(TREES[algorithm])
+                tree.__setstate__(tuple(state))
+            except Exception as e:
+                # Tree state layout is private to scikit-learn; rebuild if it changed
+                logger.warning(f"Rebuilding {algorithm} from saved data: {str(e)}")
+                tree = TREES[algorithm](np.asarray(data))
+        return cls(metadata['columns'], mean, scale, data, outcomes, algorithm, tree)
+
+    def query(self, X: pd.DataFrame, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the ``k`` nearest training students for each query row.
+
+        Args:
+            X: Processed features of the query students
+            k: Number of neighbours per query
+
+        Returns:
+            Tuple of (distances, indices), each of shape (queries, k), nearest first
+
+        Raises:
+            ValueError: If ``k`` is less than 1
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        k = min(k, len(self.data))
+        queries = (X[self.columns].to_numpy(dtype=np.float64) - self.mean) / self.scale
+        if self.tree is not None:
+            return self.tree.query(queries, k=k)
+
+        queries = queries.astype(np.float32)
+        batch = max(1, BRUTE_BATCH_ELEMENTS // len(self.data))
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for start in range(0, len(queries), batch):
+            chunk = queries[start:start + batch]
+            # Squared distance minus the query's own norm, which does not change the ranking
+            partial = self.squared_norms[None, :] - 2 * (chunk @ self.data.T)
+            nearest = np.argpartition(partial, k - 1, axis=1)[:, :k]
+            nearest_partial = np.take_along_axis(partial, nearest, axis=1)
+            order = np.argsort(nearest_partial, axis=1)
+            indices[start:start + batch] = np.take_along_axis(nearest, order, axis=1)
+            squared = np.take_along_axis(nearest_partial, order, axis=1) + np.einsum('ij,ij->i', chunk, chunk)[:, None]
+            distances[start:start + batch] = np.sqrt(np.maximum(squared, 0))
+        return distances, indices
+
+    def similar_students(self, X: pd.DataFrame, k: int = 5) -> List[Dict]:
+        """
+        Describe each query's nearest training students and their outcomes.
+
+        Args:
+            X: Processed features of the query students
+            k: Number of neighbours per query
+
+        Returns:
+            List[Dict]: Per query, the neighbours (training row, distance and
+            subject performance) and their mean performance per subject
+
+        Raises:
+            ValueError: If ``k`` is less than 1
+        """
+        distances, indices = self.query(X, k)
+        outcomes = self.outcomes[indices]
+        results = []
+        for row_distances, row_indices, row_outcomes in zip(distances, indices, outcomes):
+            results.append({
+                'neighbours': [
+                    {
+                        'training_row': int(index),
+                        'distance': float(distance),
+                        'performance': dict(zip(SUBJECTS, map(float, outcome)))
+                    }
+                    for index, distance, outcome in zip(row_indices, row_distances, row_outcomes)
+                ],
+                'mean_performance': dict(zip(SUBJECTS, map(float, row_outcomes.mean(axis=0))))
+            })
+        return results
+
+if __name__ == "__main__":
+    import argparse
+    from data_preprocessing.prepare_data import load_processed_dataset
+
+    parser = argparse.ArgumentParser(description="Build the similar-students index")
+    parser.add_argument('--data-dir', default="data/processed")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--algorithm', default='auto', choices=['auto', 'brute', 'kd_tree', 'ball_tree'])
+    parser.add_argument('--leaf-size', type=int, default=40)
+    args = parser.parse_args()
+
+    X_train = load_processed_dataset("X_train", args.data_dir)
+    y_train = load_processed_dataset("y_train", args.data_dir)
+    index = SimilarStudentIndex.build(X_train, y_train, args.algorithm, args.leaf_size)
+    index.save(os.path.join(args.model_dir, "neighbors"))
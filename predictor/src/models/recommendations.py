@@ -3,12 +3,22 @@ import numpy as np
 import joblib
 import json
 import os
+import sys
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Dict, List, Tuple, Any
 import logging
 from sklearn.preprocessing import StandardScaler, LabelEncoder, MinMaxScaler
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.evaluation import model_input
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,13 +26,105 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
+# Number of per-student explanations kept in memory
+EXPLANATION_CACHE_SIZE = 4096
+
+def ensemble_subject_predictions(subject_models: Dict, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Average the subject models' predictions for each subject.
+    
+    Multi-output models answer all five subjects in a single predict
+    call and take precedence over per-subject models of the same type.
+    
+    Args:
+        subject_models: Subject models keyed by name (``{subject}_{type}`` or ``multi_{type}``)
+        X: Schema-typed model features
+        
+    Returns:
+        Dict mapping subject code to the mean ensemble prediction per row
+    """
+    subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+    subject_predictions = {subject: [] for subject in subjects}
+    
+    for model_type in ['rf', 'xgb', 'lgb']:
+        multi_model = subject_models.get(f"multi_{model_type}")
+        if multi_model is not None:
+            y_pred = multi_model.predict(X)
+            for i, subject in enumerate(subjects):
+                subject_predictions[subject].append(y_pred[:, i])
+            continue
+        
+        for subject in subjects:
+            model = subject_models.get(f"{subject}_{model_type}")
+            if model is not None:
+                subject_predictions[subject].append(model.predict(model_input(model, X)))
+    
+    return {
+        subject: np.mean(predictions, axis=0)
+        for subject, predictions in subject_predictions.items()
+        if predictions
+    }
+
+def trajectory_scores(student_data: pd.DataFrame, subject: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Predict a subject's score from its current trajectory, for every row.
+    
+    Args:
+        student_data: Raw student records with the subject's marks,
+            attendance, interest, assignments, quizzes and participation
+        subject: Subject code
+        
+    Returns:
+        Tuple of (predicted score, confidence percentage) per row
+    """
+    def column(metric: str) -> np.ndarray:
+        return student_data[f'{subject}_{metric}'].to_numpy(dtype=np.float64)
+    
+    current_score = column('marks')
+    
+    # Weighted trend score (0-1) from the trend indicators
+    trend_score = (
+        column('attendance') / 100 * 0.25 +      # Attendance is crucial
+        column('interest') / 10 * 0.25 +         # Interest drives engagement
+        column('assignments') / 100 * 0.2 +      # Assignments show consistency
+        column('quizzes') / 100 * 0.2 +          # Quizzes show understanding
+        column('participation') / 100 * 0.1      # Participation is supplementary
+    )
+    
+    # Confidence based on data consistency and trend strength
+    confidence = np.minimum(100, np.trunc(trend_score * 100)).astype(np.int64)
+    
+    # Strong positive trajectory (above 0.7): significant improvement possible
+    # Strong negative trajectory (below 0.3): significant decline possible
+    # Neutral trajectory (0.3-0.7): minor changes, none when exactly 0.5
+    predicted_score = np.select(
+        [trend_score > 0.7, trend_score < 0.3, trend_score > 0.5, trend_score < 0.5],
+        [
+            np.minimum(100, current_score * (1 + (trend_score - 0.7) * 3)),  # Max 0.9
+            np.maximum(0, current_score * (1 - (0.3 - trend_score) * 3)),  # Max 0.9
+            np.minimum(100, current_score * 1.05),
+            np.maximum(0, current_score * 0.95)
+        ],
+        default=current_score
+    )
+    return predicted_score, confidence
+
+def prompt_key(prompt: str) -> str:
+    """Key identical prompts by their text with whitespace collapsed."""
+    return hashlib.sha256(' '.join(prompt.split()).encode()).hexdigest()
+
 class RecommendationEngine:
-    def __init__(self, model_dir: str = "models"):
+    def __init__(self, model_dir: str = "models", offline: bool = False, cascade: bool = False):
         """
         Initialize the recommendation engine.
         
         Args:
             model_dir (str): Directory containing trained models
+            offline (bool): Serve without Gemini (no API key or client library
+                needed); recommendations come from the rule-based fallback
+            cascade (bool): Predict subject scores with the calibrated
+                early-exit cascades (``src/models/cascade.py``) instead of
+                always averaging every model
         """
         self.model_dir = model_dir
         self.models = {}
@@ -32,22 +134,45 @@ class RecommendationEngine:
         self.scaler = StandardScaler()
         self.minmax_scaler = MinMaxScaler()
         self.label_encoders = {}
+        self.contribution_tables = {}
+        self.contribution_lock = threading.Lock()
+        self.explanation_cache = OrderedDict()
+        self.explanation_lock = threading.Lock()
+        
+        # Gemini calls in flight, keyed by prompt, shared by identical concurrent prompts
+        self.inflight_prompts = {}
+        self.inflight_lock = threading.Lock()
+        self.llm_stats = {'llm_calls': 0, 'coalesced_calls': 0}
+        
+        # Early-exit cascades, and how often rows left them early
+        self.use_cascade = cascade
+        self.cascade = None
+        self.cascade_lock = threading.Lock()
+        self.cascade_stats = {'rows': 0, 'early_exits': 0, 'model_calls_saved': 0, 'estimated_ms_saved': 0.0}
         
         # Initialize Gemini
-        self.gemini_api_key = os.getenv('GEMINI_API_KEY')
-        if not self.gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not found in .env file. Please add it to your .env file.")
-        genai.configure(api_key=self.gemini_api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+        self.offline = offline
+        self.gemini_model = None
+        if not offline:
+            self.gemini_api_key = os.getenv('GEMINI_API_KEY')
+            if not self.gemini_api_key:
+                raise ValueError("GEMINI_API_KEY not found in .env file. Please add it to your .env file.")
+            # Imported here: the client library is slow to import and unused offline
+            import google.generativeai as genai
+            genai.configure(api_key=self.gemini_api_key)
+            self.gemini_model = genai.GenerativeModel('gemini-1.5-flash')
         
         # Initialize data preprocessor
-        import sys
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from data_preprocessing.prepare_data import DataPreprocessor
+        from data_preprocessing.prepare_data import DataPreprocessor, FEATURE_COLUMNS
         self.data_preprocessor = DataPreprocessor("data/raw")
+        self.feature_columns = FEATURE_COLUMNS
         
         self.load_models()
         self.load_preprocessors()
+        self.load_similar_index()
+        self.load_cohort_index()
+        self.load_cascade()
+        self.load_drift_monitor()
         
     def load_models(self) -> None:
         """Load trained models and feature importance data."""
@@ -69,6 +194,19 @@ class RecommendationEngine:
                     if os.path.exists(model_path):
                         self.subject_models[f"{subject}_{model_type}"] = joblib.load(model_path)
             
+            # Load multi-output models (predict every subject in one call)
+            for model_type in ['rf', 'xgb']:
+                model_path = os.path.join(self.model_dir, f"multi_{model_type}.joblib")
+                if os.path.exists(model_path):
+                    self.subject_models[f"multi_{model_type}"] = joblib.load(model_path)
+            
+            # Feature columns the subject models consume (fewer after feature selection)
+            empty = pd.DataFrame(columns=self.feature_columns)
+            used = set()
+            for model in self.subject_models.values():
+                used.update(model_input(model, empty).columns)
+            self.model_columns = [column for column in self.feature_columns if column in used]
+            
             # Load feature importance
             importance_path = os.path.join(self.model_dir, "feature_importance.json")
             if os.path.exists(importance_path):
@@ -103,12 +241,132 @@ class RecommendationEngine:
             if os.path.exists(encoders_path):
                 self.label_encoders = joblib.load(encoders_path)
             
+            # Serve with the fitted training preprocessors
+            self.data_preprocessor.scaler = self.scaler
+            self.data_preprocessor.minmax_scaler = self.minmax_scaler
+            self.data_preprocessor.label_encoders = self.label_encoders
+            
             logger.info("Preprocessors loaded successfully")
             
         except Exception as e:
             logger.error(f"Error loading preprocessors: {str(e)}")
             raise
     
+    def load_similar_index(self) -> None:
+        """Memory-map the similar-students index if it has been built."""
+        from models.neighbors import SimilarStudentIndex
+        
+        self.similar_index = None
+        index_dir = os.path.join(self.model_dir, "neighbors")
+        if os.path.exists(os.path.join(index_dir, "neighbors.json")):
+            self.similar_index = SimilarStudentIndex.load(index_dir)
+            logger.info("Similar-student index loaded successfully")
+    
+    def load_cohort_index(self) -> None:
+        """Load the cohort percentile index if it has been built."""
+        from models.cohort import CohortIndex
+        
+        self.cohort_index = None
+        index_dir = os.path.join(self.model_dir, "cohort")
+        if os.path.exists(os.path.join(index_dir, "cohort.json")):
+            self.cohort_index = CohortIndex.load(index_dir)
+            logger.info("Cohort index loaded successfully")
+    
+    def load_cascade(self) -> None:
+        """Load the early-exit cascades if cascade mode is on and they are calibrated."""
+        from models.cascade import load_cascade
+        
+        if not self.use_cascade:
+            return
+        try:
+            self.cascade = load_cascade(self.model_dir, self.subject_models)
+            logger.info(f"Cascades loaded for {', '.join(self.cascade['subjects']) or 'no subjects'}")
+        except FileNotFoundError as e:
+            logger.warning(f"{str(e)} Using the full ensemble.")
+    
+    def load_drift_monitor(self) -> None:
+        """Attach to the shared traffic drift monitor if a drift reference was saved with the models."""
+        from models.drift import DriftMonitor, load_reference
+        
+        self.drift_monitor = None
+        try:
+            self.drift_monitor = DriftMonitor(load_reference(self.model_dir))
+            logger.info(f"Drift monitor attached to {self.drift_monitor.path}")
+        except OSError as e:
+            logger.warning(f"{str(e)} Drift monitoring is off.")
+    
+    def ensemble_predictions(self, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Predict every subject from model features, through the cascades when loaded.
+        
+        Args:
+            X: Schema-typed model features
+            
+        Returns:
+            Dict mapping subject code to the predicted score per row
+        """
+        if self.cascade is None or not self.cascade['subjects']:
+            return ensemble_subject_predictions(self.subject_models, X)
+        from models.cascade import cascade_subject_predictions
+        
+        cascaded = self.cascade['subjects']
+        remaining = {name: model for name, model in self.subject_models.items()
+                     if name.split('_')[0] not in cascaded}
+        predictions = ensemble_subject_predictions(remaining, X)
+        cascade_predictions, evaluated = cascade_subject_predictions(self.subject_models, self.cascade, X)
+        predictions.update(cascade_predictions)
+        
+        with self.cascade_lock:
+            for subject, counts in evaluated.items():
+                models = cascaded[subject]['models']
+                costs = cascaded[subject]['single_row_ms']
+                self.cascade_stats['rows'] += len(counts)
+                self.cascade_stats['early_exits'] += int(np.sum(counts < len(models)))
+                self.cascade_stats['model_calls_saved'] += int(np.sum(len(models) - counts))
+                # Skipped models are the most expensive ones, at their calibrated single-row cost
+                skipped_ms = np.cumsum([costs[name] for name in models[::-1]])
+                saved = counts < len(models)
+                self.cascade_stats['estimated_ms_saved'] += float(
+                    skipped_ms[len(models) - counts[saved] - 1].sum()
+                )
+        return predictions
+    
+    def ensemble_stats(self) -> Dict:
+        """Ensemble mode; in cascade mode also early exits, estimated time saved and calibrated RMSE."""
+        if self.cascade is None:
+            return {'mode': 'full'}
+        with self.cascade_lock:
+            stats = dict(self.cascade_stats)
+        stats['early_exit_fraction'] = stats['early_exits'] / stats['rows'] if stats['rows'] else 0.0
+        return {
+            'mode': 'cascade',
+            **stats,
+            'calibration': {
+                subject: {metric: report[metric] for metric in ['early_exit_fraction', 'full_rmse', 'cascade_rmse']}
+                for subject, report in self.cascade['report'].items()
+                if subject in self.cascade['subjects']
+            }
+        }
+    
+    def find_similar_students(self, processed_data: pd.DataFrame, k: int = 5) -> List[Dict]:
+        """
+        Find the most similar historical students for each profile.
+        
+        Args:
+            processed_data: Output of preprocess_data (one row per student)
+            k: Number of similar students per profile
+            
+        Returns:
+            List[Dict]: Per profile, the nearest training students with their
+            subject performance, and the mean performance per subject
+            
+        Raises:
+            FileNotFoundError: If the index has not been built
+        """
+        if self.similar_index is None:
+            raise FileNotFoundError("Similar-student index not found. Please run src/models/neighbors.py first.")
+        return self.similar_index.similar_students(processed_data, k)
+    
     def preprocess_data(self, student_data: Dict) -> pd.DataFrame:
         """
         Preprocess student data for prediction.
@@ -117,11 +375,12 @@ class RecommendationEngine:
             student_data (Dict): Student data dictionary
             
         Returns:
-            pd.DataFrame: Preprocessed data
+            pd.DataFrame: Model features (FEATURE_COLUMNS), derived and
+            scaled like the training data
         """
         # Convert to DataFrame with proper structure
         if isinstance(student_data, pd.DataFrame):
-            df = student_data.copy()
+            df = student_data
         else:
             # Flatten nested dictionary if present
             if 'profile' in student_data:
@@ -152,55 +411,156 @@ class RecommendationEngine:
             # Create DataFrame from flattened data
             df = pd.DataFrame([flat_data])
         
-        # Ensure all required features are present
+        # Raw fields the training transform needs (derived features are recomputed from them)
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
         required_features = [
             'current_cgpa', 'education_level', 'study_style', 'parent_education',
-            'screen_time', 'sleep_time', 'study_efficiency', 'overall_attendance',
-            'overall_interest', 'overall_performance'
+            'screen_time', 'sleep_time'
+        ] + [
+            f'{subject}_{metric}'
+            for subject in subjects
+            for metric in ['marks', 'attendance', 'interest', 'assignments', 'quizzes', 'participation']
         ]
         
-        # Add subject-specific features
-        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
-        for subject in subjects:
-            required_features.extend([
-                f'{subject}_marks', f'{subject}_attendance', f'{subject}_interest',
-                f'{subject}_assignments', f'{subject}_quizzes', f'{subject}_participation'
-            ])
+        # Check for missing features
+        missing_features = [f for f in required_features if f not in df.columns]
+        if missing_features:
+            raise ValueError(f"Missing required features: {', '.join(missing_features)}")
+        
+        # Derive, encode and scale exactly as the training data was
+        # (reusing the training scaler when available)
+        df, _ = self.data_preprocessor.transform_fused(
+            df, fit=not hasattr(self.minmax_scaler, 'n_features_in_'), targets=False
+        )
+        
+        logger.info("Data preprocessing completed successfully")
+        return df
+    
+    def predict_model_scores(self, processed_data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Predict each subject's performance with the trained ensemble.
         
-        # Calculate derived features if not present
-        if 'study_efficiency' not in df.columns:
-            df['study_efficiency'] = df['sleep_time'] / (df['screen_time'] + 1)
+        Args:
+            processed_data: Output of preprocess_data (one row per student)
+            
+        Returns:
+            Dict mapping subject code to the mean ensemble prediction per row
+        """
+        from data_preprocessing.schema import FEATURE_DTYPES, apply_schema
         
-        if 'overall_attendance' not in df.columns:
-            df['overall_attendance'] = df[[f'{s}_attendance' for s in subjects]].mean(axis=1)
+        X = apply_schema(processed_data[self.model_columns], FEATURE_DTYPES)
+        return self.ensemble_predictions(X)
+    
+    def explain_predictions(self, processed_data: pd.DataFrame, top: int = 10,
+                            exact: bool = False) -> List[Dict]:
+        """
+        Explain each student's subject predictions with feature contributions.
         
-        if 'overall_interest' not in df.columns:
-            df['overall_interest'] = df[[f'{s}_interest' for s in subjects]].mean(axis=1)
+        Contributions are computed for the whole batch at once (see
+        models.explain.model_contributions) and averaged over the same
+        ensemble members as predict_model_scores. Explanations are cached
+        per feature row, so repeated students cost a dictionary lookup.
         
-        if 'overall_performance' not in df.columns:
-            df['overall_performance'] = df[[f'{s}_marks' for s in subjects]].mean(axis=1)
+        Args:
+            processed_data: Output of preprocess_data (one row per student)
+            top: Number of largest contributions to return per subject
+            exact: Use SHAP values (XGBoost ``pred_contribs``, LightGBM
+                ``pred_contrib``) for boosted models instead of the faster
+                tree path decomposition
+            
+        Returns:
+            List[Dict]: Per student, a mapping of subject to its prediction,
+            base value and top feature contributions
+        """
+        from data_preprocessing.schema import FEATURE_DTYPES, apply_schema
         
-        # Check for missing features
-        missing_features = [f for f in required_features if f not in df.columns]
-        if missing_features:
-            raise ValueError(f"Missing required features: {', '.join(missing_features)}")
+        X = apply_schema(processed_data[self.feature_columns], FEATURE_DTYPES)
+        keys = [
+            hashlib.blake2b(row.tobytes() + bytes([exact]), digest_size=16).hexdigest()
+            for row in X.to_numpy(dtype=np.float32)
+        ]
+        
+        explanations = {}
+        with self.explanation_lock:
+            for key in keys:
+                if key in self.explanation_cache:
+                    self.explanation_cache.move_to_end(key)
+                    explanations[key] = self.explanation_cache[key]
         
-        # Scale numerical features
-        df = self.data_preprocessor.scale_numerical_features(df)
+        missing = [i for i, key in enumerate(keys) if key not in explanations]
+        if missing:
+            computed = self._compute_explanations(X.iloc[missing], exact)
+            with self.explanation_lock:
+                for i, explanation in zip(missing, computed):
+                    explanations[keys[i]] = explanation
+                    self.explanation_cache[keys[i]] = explanation
+                while len(self.explanation_cache) > EXPLANATION_CACHE_SIZE:
+                    self.explanation_cache.popitem(last=False)
         
-        # One-hot encode categorical features
-        df = self.data_preprocessor.encode_categorical_features(df)
+        results = []
+        for key in keys:
+            student = {}
+            for subject, explanation in explanations[key].items():
+                order = np.argsort(-np.abs(explanation['contributions']))[:top]
+                student[subject] = {
+                    'prediction': explanation['prediction'],
+                    'base_value': explanation['base_value'],
+                    'models': explanation['models'],
+                    'contributions': [
+                        {'feature': self.feature_columns[i],
+                         'value': float(explanation['contributions'][i])}
+                        for i in order
+                    ]
+                }
+            results.append(student)
+        return results
+    
+    def _compute_explanations(self, X: pd.DataFrame, exact: bool = False) -> List[Dict]:
+        """Compute uncached explanations for a batch of schema-typed rows."""
+        from models.explain import contribution_table, model_contributions
         
-        # Ensure all required features are present after preprocessing
-        for feature in required_features:
-            if feature not in df.columns:
-                # If feature was transformed during encoding, find its new name
-                encoded_features = [col for col in df.columns if col.startswith(feature)]
-                if not encoded_features:
-                    raise ValueError(f"Feature {feature} is missing after preprocessing")
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        subject_contributions = {subject: [] for subject in subjects}
+        subject_members = {subject: [] for subject in subjects}
         
-        logger.info("Data preprocessing completed successfully")
-        return df
+        def contributions(name: str, model) -> np.ndarray:
+            # Built once per model; concurrent requests wait instead of rebuilding it
+            with self.contribution_lock:
+                if name not in self.contribution_tables:
+                    self.contribution_tables[name] = contribution_table(model)
+                table = self.contribution_tables[name]
+            return model_contributions(model, X, table, exact)
+        
+        for model_type in ['rf', 'xgb', 'lgb']:
+            multi_name = f"multi_{model_type}"
+            if multi_name in self.subject_models:
+                # Same members as ensemble_subject_predictions, so the
+                # contributions add up to the served prediction
+                values = contributions(multi_name, self.subject_models[multi_name])
+                for i, subject in enumerate(subjects):
+                    subject_contributions[subject].append(values[:, i])
+                    subject_members[subject].append(multi_name)
+                continue
+            
+            for subject in subjects:
+                name = f"{subject}_{model_type}"
+                if name in self.subject_models:
+                    subject_contributions[subject].append(contributions(name, self.subject_models[name])[:, 0])
+                    subject_members[subject].append(name)
+        
+        explanations = [{} for _ in range(len(X))]
+        for subject, values in subject_contributions.items():
+            if not values:
+                continue
+            mean_values = np.mean(values, axis=0)
+            for row, explanation in zip(mean_values, explanations):
+                explanation[subject] = {
+                    'prediction': float(row.sum()),
+                    'base_value': float(row[-1]),
+                    'contributions': row[:-1],
+                    'models': subject_members[subject]
+                }
+        return explanations
     
     def format_recommendations_html(self, recommendations: str) -> str:
         """
@@ -269,7 +629,7 @@ class RecommendationEngine:
             # Return basic HTML if formatting fails
             return f'<div class="text-gray-700">{recommendations}</div>'
 
-    def generate_subject_recommendations(
+    def build_recommendation_prompt(
         self,
         subject: str,
         current_score: float,
@@ -281,7 +641,7 @@ class RecommendationEngine:
         participation: float
     ) -> str:
         """
-        Generate personalized recommendations based on current performance and predicted trajectory.
+        Build the Gemini prompt for one subject's recommendations.
         
         Args:
             subject: Subject code
@@ -294,55 +654,169 @@ class RecommendationEngine:
             participation: Participation score
             
         Returns:
-            str: Formatted HTML recommendations
+            str: Prompt text
         """
-        try:
-            # Calculate performance indicators
-            trend = predicted_score - current_score
-            is_improving = trend > 0
-            needs_improvement = current_score < 70
-            
-            # Build the prompt based on current status and trajectory
-            prompt = f"""
-            Generate personalized study recommendations for a student with the following {subject.upper()} performance metrics:
-            
-            Current Score: {current_score}%
-            Predicted Score: {predicted_score}%
-            Attendance: {attendance}%
-            Interest Level: {interest}/10
-            Assignment Score: {assignments}%
-            Quiz Score: {quizzes}%
-            Participation: {participation}%
-            
-            The student is currently {'improving' if is_improving else 'declining'} in performance.
-            {'Significant improvement is needed' if needs_improvement else 'Performance is satisfactory but can be enhanced'}.
-            
-            Provide specific, actionable recommendations in the following format:
-            
-            **Current Status Analysis:**
-            [Brief analysis of current performance and trajectory]
-            
-            **Key Areas to Focus:**
-            [2-3 specific areas that need attention]
-            
-            **Study Strategy Recommendations:**
-            [3-4 specific study techniques tailored to the student's current status]
+        # Calculate performance indicators
+        trend = predicted_score - current_score
+        is_improving = trend > 0
+        needs_improvement = current_score < 70
+        
+        # Build the prompt based on current status and trajectory
+        prompt = f"""
+        Generate personalized study recommendations for a student with the following {subject.upper()} performance metrics:
+        
+        Current Score: {current_score}%
+        Predicted Score: {predicted_score}%
+        Attendance: {attendance}%
+        Interest Level: {interest}/10
+        Assignment Score: {assignments}%
+        Quiz Score: {quizzes}%
+        Participation: {participation}%
+        
+        The student is currently {'improving' if is_improving else 'declining'} in performance.
+        {'Significant improvement is needed' if needs_improvement else 'Performance is satisfactory but can be enhanced'}.
+        
+        Provide specific, actionable recommendations in the following format:
+        
+        **Current Status Analysis:**
+        [Brief analysis of current performance and trajectory]
+        
+        **Key Areas to Focus:**
+        [2-3 specific areas that need attention]
+        
+        **Study Strategy Recommendations:**
+        [3-4 specific study techniques tailored to the student's current status]
+        
+        **Attendance and Engagement:**
+        [Recommendations for improving attendance and class participation]
+        
+        **Performance Enhancement:**
+        [Specific steps to improve performance based on current trajectory]
+        
+        **Confidence Building:**
+        [Strategies to build confidence and maintain motivation]
+        
+        Format the response with clear sections and bullet points where appropriate.
+        """
+        return prompt
+    
+    def _join_prompt(self, prompt: str) -> Tuple[str, Future, bool]:
+        """
+        Register a prompt as in flight, or join the identical one already running.
+        
+        Args:
+            prompt: Prompt text
             
-            **Attendance and Engagement:**
-            [Recommendations for improving attendance and class participation]
+        Returns:
+            Tuple of (prompt key, future holding the response text, whether
+            this caller leads and must make the Gemini call)
+        """
+        key = prompt_key(prompt)
+        with self.inflight_lock:
+            future = self.inflight_prompts.get(key)
+            if future is not None:
+                self.llm_stats['coalesced_calls'] += 1
+                return key, future, False
+            future = Future()
+            self.inflight_prompts[key] = future
+            self.llm_stats['llm_calls'] += 1
+            return key, future, True
+    
+    def _settle_prompt(self, key: str, future: Future, text: str = None, error: Exception = None) -> None:
+        """Publish the leader's result to waiting duplicates and retire the prompt."""
+        with self.inflight_lock:
+            del self.inflight_prompts[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(text)
+    
+    def generate_content(self, prompt: str) -> str:
+        """
+        Call Gemini, sharing one call between identical concurrent prompts.
+        
+        Args:
+            prompt: Prompt text
             
-            **Performance Enhancement:**
-            [Specific steps to improve performance based on current trajectory]
+        Returns:
+            str: Response text
+        """
+        if self.offline:
+            raise RuntimeError("Gemini is disabled in offline mode")
+        key, future, leader = self._join_prompt(prompt)
+        if not leader:
+            return future.result()
+        try:
+            text = self.gemini_model.generate_content(prompt).text
+        except BaseException as e:
+            self._settle_prompt(key, future, error=e)
+            raise
+        self._settle_prompt(key, future, text)
+        return text
+    
+    async def agenerate_content(self, prompt: str) -> str:
+        """
+        Async variant of generate_content; joins calls made by either variant.
+        
+        Args:
+            prompt: Prompt text
             
-            **Confidence Building:**
-            [Strategies to build confidence and maintain motivation]
+        Returns:
+            str: Response text
+        """
+        if self.offline:
+            raise RuntimeError("Gemini is disabled in offline mode")
+        key, future, leader = self._join_prompt(prompt)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            text = (await self.gemini_model.generate_content_async(prompt)).text
+        except BaseException as e:
+            self._settle_prompt(key, future, error=e)
+            raise
+        self._settle_prompt(key, future, text)
+        return text
+    
+    def generate_subject_recommendations(
+        self,
+        subject: str,
+        current_score: float,
+        predicted_score: float,
+        attendance: float,
+        interest: float,
+        assignments: float,
+        quizzes: float,
+        participation: float
+    ) -> str:
+        """
+        Generate personalized recommendations based on current performance and predicted trajectory.
+        
+        Args:
+            subject: Subject code
+            current_score: Current marks
+            predicted_score: Predicted future marks
+            attendance: Attendance percentage
+            interest: Interest level (1-10)
+            assignments: Assignment score
+            quizzes: Quiz score
+            participation: Participation score
             
-            Format the response with clear sections and bullet points where appropriate.
-            """
+        Returns:
+            str: Formatted HTML recommendations
+        """
+        if self.offline:
+            return self._generate_fallback_recommendations(
+                subject, current_score, attendance, interest, predicted_score
+            )
+        
+        try:
+            prompt = self.build_recommendation_prompt(
+                subject, current_score, predicted_score, attendance,
+                interest, assignments, quizzes, participation
+            )
             
             # Generate recommendations using Gemini
-            response = self.gemini_model.generate_content(prompt)
-            recommendations = response.text
+            recommendations = self.generate_content(prompt)
             
             # Format the recommendations into HTML
             return self.format_recommendations_html(recommendations)
@@ -350,11 +824,60 @@ class RecommendationEngine:
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             return self._generate_fallback_recommendations(
-                current_score, predicted_score, attendance, interest
+                subject, current_score, attendance, interest, predicted_score
             )
-
+    
+    async def agenerate_subject_recommendations(
+        self,
+        subject: str,
+        current_score: float,
+        predicted_score: float,
+        attendance: float,
+        interest: float,
+        assignments: float,
+        quizzes: float,
+        participation: float
+    ) -> str:
+        """
+        Async variant of generate_subject_recommendations.
+        
+        Awaits the Gemini call instead of blocking a thread on it.
+        
+        Args:
+            subject: Subject code
+            current_score: Current marks
+            predicted_score: Predicted future marks
+            attendance: Attendance percentage
+            interest: Interest level (1-10)
+            assignments: Assignment score
+            quizzes: Quiz score
+            participation: Participation score
+            
+        Returns:
+            str: Formatted HTML recommendations
+        """
+        if self.offline:
+            return self._generate_fallback_recommendations(
+                subject, current_score, attendance, interest, predicted_score
+            )
+        
+        try:
+            prompt = self.build_recommendation_prompt(
+                subject, current_score, predicted_score, attendance,
+                interest, assignments, quizzes, participation
+            )
+            recommendations = await self.agenerate_content(prompt)
+            return self.format_recommendations_html(recommendations)
+            
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {str(e)}")
+            return self._generate_fallback_recommendations(
+                subject, current_score, attendance, interest, predicted_score
+            )
+    
     def _generate_fallback_recommendations(self, subject: str, marks: float, attendance: float,
-                                         interest: float, predicted_score: float, confidence: float) -> str:
+                                         interest: float, predicted_score: float,
+                                         confidence: float = None) -> str:
         """
         Generate basic recommendations if Gemini fails.
         
@@ -411,19 +934,30 @@ class RecommendationEngine:
         
         return html
     
-    def predict_subject_performance(self, student_data: Dict) -> List[Dict]:
+    def subject_trajectories(self, student_data: Dict, monitor: bool = True) -> List[Dict]:
         """
-        Predict performance for each subject based on current trajectory.
+        Predict each subject's score from its current trajectory.
+        
+        This is the CPU-bound half of predict_subject_performance; the
+        returned ``recommendation_inputs`` feed the LLM recommendations.
         
         Args:
             student_data: Dictionary containing student's current data
+            monitor: Add the preprocessed features to the drift monitor
+                (off for synthetic traffic such as health checks)
             
         Returns:
-            List of dictionaries containing predictions for each subject
+            List of dictionaries containing predictions for each subject,
+            without recommendations
         """
         try:
             # Preprocess the input data
             processed_data = self.preprocess_data(student_data)
+            if monitor and self.drift_monitor is not None:
+                try:
+                    self.drift_monitor.observe(processed_data)
+                except KeyError as e:
+                    logger.warning(f"Drift monitor skipped a request: {str(e)}")
             
             predictions = []
             subjects = ['ads', 'ds', 'am', 'java', 'dbms']
@@ -439,111 +973,142 @@ class RecommendationEngine:
                 # Convert Series to float using the recommended method
                 current_score = float(student_data[f'{subject}_marks'].iloc[0])
                 
-                # Calculate trend indicators with more granular weights
-                attendance_trend = float(student_data[f'{subject}_attendance'].iloc[0]) / 100
-                interest_trend = float(student_data[f'{subject}_interest'].iloc[0]) / 10
-                assignment_trend = float(student_data[f'{subject}_assignments'].iloc[0]) / 100
-                quiz_trend = float(student_data[f'{subject}_quizzes'].iloc[0]) / 100
-                participation_trend = float(student_data[f'{subject}_participation'].iloc[0]) / 100
-                
-                # Calculate weighted trend score (0-1) with adjusted weights
-                trend_score = float(
-                    attendance_trend * 0.25 +      # Attendance is crucial
-                    interest_trend * 0.25 +        # Interest drives engagement
-                    assignment_trend * 0.2 +       # Assignments show consistency
-                    quiz_trend * 0.2 +            # Quizzes show understanding
-                    participation_trend * 0.1      # Participation is supplementary
-                )
-                
-                # Calculate confidence based on data consistency and trend strength
-                confidence = min(100, int(trend_score * 100))
-                
-                # Calculate predicted score based on current trajectory
-                # If trend is positive (above 0.7), score may increase significantly
-                # If trend is negative (below 0.3), score may decrease significantly
-                # If trend is neutral (0.3-0.7), score stays similar
-                if trend_score > 0.7:
-                    # Strong positive trajectory: significant improvement possible
-                    improvement_factor = (trend_score - 0.7) * 3  # Max 0.9
-                    predicted_score = min(100, current_score * (1 + improvement_factor))
-                elif trend_score < 0.3:
-                    # Strong negative trajectory: significant decline possible
-                    decline_factor = (0.3 - trend_score) * 3  # Max 0.9
-                    predicted_score = max(0, current_score * (1 - decline_factor))
-                else:
-                    # Neutral trajectory: minor changes possible
-                    if trend_score > 0.5:
-                        # Slightly positive: small improvement
-                        predicted_score = min(100, current_score * 1.05)
-                    elif trend_score < 0.5:
-                        # Slightly negative: small decline
-                        predicted_score = max(0, current_score * 0.95)
-                    else:
-                        # Exactly neutral: no change
-                        predicted_score = current_score
+                # Predicted score and confidence from the current trajectory
+                predicted, confidences = trajectory_scores(student_data.iloc[:1], subject)
+                predicted_score = float(predicted[0])
+                confidence = int(confidences[0])
                 
                 # Calculate improvement percentage
                 improvement = int(predicted_score - current_score)
                 improvement_str = f"{'+' if improvement > 0 else ''}{improvement}"
                 
-                # Generate recommendations based on current status and predicted trajectory
-                recommendations = self.generate_subject_recommendations(
-                    subject=subject,
-                    current_score=current_score,
-                    predicted_score=predicted_score,
-                    attendance=float(student_data[f'{subject}_attendance'].iloc[0]),
-                    interest=float(student_data[f'{subject}_interest'].iloc[0]),
-                    assignments=float(student_data[f'{subject}_assignments'].iloc[0]),
-                    quizzes=float(student_data[f'{subject}_quizzes'].iloc[0]),
-                    participation=float(student_data[f'{subject}_participation'].iloc[0])
-                )
-                
                 predictions.append({
                     'subject': subject_names[subject],
                     'currentScore': current_score,
                     'predictedScore': round(predicted_score, 2),
                     'improvement': improvement_str,
                     'confidence': f"{confidence}%",
-                    'recommendations': recommendations
+                    # Inputs for recommendations based on current status and predicted trajectory
+                    'recommendation_inputs': {
+                        'subject': subject,
+                        'current_score': current_score,
+                        'predicted_score': predicted_score,
+                        'attendance': float(student_data[f'{subject}_attendance'].iloc[0]),
+                        'interest': float(student_data[f'{subject}_interest'].iloc[0]),
+                        'assignments': float(student_data[f'{subject}_assignments'].iloc[0]),
+                        'quizzes': float(student_data[f'{subject}_quizzes'].iloc[0]),
+                        'participation': float(student_data[f'{subject}_participation'].iloc[0])
+                    }
                 })
             
-            logger.info("Subject predictions generated successfully")
             return predictions
             
         except Exception as e:
             logger.error(f"Error generating predictions: {str(e)}")
             raise
     
-    def generate_predictions(self, student_data: pd.DataFrame) -> List[Dict]:
+    def predict_subject_performance(self, student_data: Dict, monitor: bool = True) -> List[Dict]:
+        """
+        Predict performance for each subject based on current trajectory.
+        
+        Args:
+            student_data: Dictionary containing student's current data
+            monitor: Add the request to the drift monitor
+            
+        Returns:
+            List of dictionaries containing predictions for each subject
+        """
+        predictions = self.subject_trajectories(student_data, monitor)
+        for prediction in predictions:
+            prediction['recommendations'] = self.generate_subject_recommendations(
+                **prediction.pop('recommendation_inputs')
+            )
+        
+        logger.info("Subject predictions generated successfully")
+        return predictions
+    
+    async def apredict_subject_performance(self, student_data: Dict, executor=None,
+                                           monitor: bool = True) -> List[Dict]:
+        """
+        Async variant of predict_subject_performance.
+        
+        The trajectory computation runs in ``executor`` so it never blocks
+        the event loop, and the five subjects' Gemini calls are awaited
+        concurrently.
+        
+        Args:
+            student_data: Dictionary containing student's current data
+            executor: Executor for the CPU-bound work (default: the loop's)
+            monitor: Add the request to the drift monitor
+            
+        Returns:
+            List of dictionaries containing predictions for each subject
+        """
+        loop = asyncio.get_running_loop()
+        predictions = await loop.run_in_executor(executor, self.subject_trajectories, student_data, monitor)
+        recommendations = await asyncio.gather(*(
+            self.agenerate_subject_recommendations(**prediction.pop('recommendation_inputs'))
+            for prediction in predictions
+        ))
+        for prediction, text in zip(predictions, recommendations):
+            prediction['recommendations'] = text
+        
+        logger.info("Subject predictions generated successfully")
+        return predictions
+    
+    def generate_predictions(self, student_data: pd.DataFrame, monitor: bool = True) -> List[Dict]:
         """
         Generate comprehensive predictions and recommendations.
         
         Args:
             student_data: Student features
+            monitor: Add the request to the drift monitor
             
         Returns:
             List[Dict]: Complete predictions and recommendations
         """
         # Get subject-wise predictions
-        subject_predictions = self.predict_subject_performance(student_data)
+        subject_predictions = self.predict_subject_performance(student_data, monitor)
         print("Subject predictions generated successfully")
         
         # Format predictions for frontend
-        predictions = []
-        for pred in subject_predictions:
-            predictions.append({
+        predictions = self.format_predictions(subject_predictions)
+
+        print("Predictions generated successfully")
+        print(predictions)
+        
+        return predictions
+    
+    async def agenerate_predictions(self, student_data: pd.DataFrame, executor=None,
+                                    monitor: bool = True) -> List[Dict]:
+        """
+        Async variant of generate_predictions.
+        
+        Args:
+            student_data: Student features
+            executor: Executor for the CPU-bound work (default: the loop's)
+            monitor: Add the request to the drift monitor
+            
+        Returns:
+            List[Dict]: Complete predictions and recommendations
+        """
+        subject_predictions = await self.apredict_subject_performance(student_data, executor, monitor)
+        return self.format_predictions(subject_predictions)
+    
+    @staticmethod
+    def format_predictions(subject_predictions: List[Dict]) -> List[Dict]:
+        """Select the prediction fields the frontend expects."""
+        return [
+            {
                 'subject': pred['subject'],
                 'currentScore': pred['currentScore'],
                 'predictedScore': pred['predictedScore'],
                 'improvement': pred['improvement'],
                 'confidence': pred['confidence'],
                 'recommendations': pred['recommendations']
-            })
-
-        print("Predictions generated successfully")
-        print(predictions)
-        
-        return predictions
+            }
+            for pred in subject_predictions
+        ]
     
     def get_subject_full_name(self, subject: str) -> str:
         """Get full name of subject."""
@@ -0,0 +1,261 @@
+"""
+Bulk offline scoring of a student roster.
+
+Reads a CSV or Parquet file of raw student profiles (the columns of
+``academic_records.csv``) in chunks and scores each chunk in a worker process
+with the serving engine's preprocessors and models: fused preprocessing, the
+subject ensemble and the trajectory rule, vectorized over the whole chunk.
+Every chunk is written as its own ``part-NNNNN.parquet`` file under the output
+directory, and ``_progress.json`` records the finished chunks, so a killed run
+started again with the same arguments resumes where it stopped.
+
+Recommendations are off by default. ``cached`` fills them only from prompts
+already in the recommendation cache; ``live`` also calls Gemini for the rest
+and caches the answers.
+
+Usage (from the predictor directory, after train_model.py):
+    python src/models/score.py data/raw/academic_records.csv --output data/scores
+"""
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_preprocessing.schema import SUBJECTS, RAW_DTYPES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROGRESS_FILE = "_progress.json"
+
+# Worker process state, set up once by init_worker
+worker_engine = None
+worker_cache = None
+worker_recommendations = 'none'
+
+class PromptCache:
+    def __init__(self, path: str):
+        """
+        Persistent cache of Gemini answers keyed by prompt, shared by processes.
+
+        Args:
+            path: SQLite database file
+        """
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS prompts (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT text FROM prompts WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO prompts (key, text) VALUES (?, ?)", (key, text))
+
+def init_worker(model_dir: str, recommendations: str, cache_path: str, cascade: bool = False) -> None:
+    """Load the engine (and open the prompt cache) once per worker process."""
+    global worker_engine, worker_cache, worker_recommendations
+    from models.recommendations import RecommendationEngine
+
+    logging.getLogger().setLevel(logging.WARNING)
+    worker_engine = RecommendationEngine(model_dir, offline=recommendations != 'live', cascade=cascade)
+    worker_recommendations = recommendations
+    if recommendations != 'none':
+        worker_cache = PromptCache(cache_path)
+
+def recommend(subject: str, current_score: float, predicted_score: float, row: pd.Series) -> Optional[str]:
+    """One subject's HTML recommendations from the cache, or from Gemini in live mode."""
+    from models.recommendations import prompt_key
+
+    inputs = {metric: float(row[f'{subject}_{metric}'])
+              for metric in ['attendance', 'interest', 'assignments', 'quizzes', 'participation']}
+    prompt = worker_engine.build_recommendation_prompt(subject, current_score, predicted_score, **inputs)
+    key = prompt_key(prompt)
+    text = worker_cache.get(key)
+    if text is None:
+        if worker_recommendations != 'live':
+            return None
+        try:
+            text = worker_engine.generate_content(prompt)
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {str(e)}")
+            return worker_engine._generate_fallback_recommendations(
+                subject, current_score, inputs['attendance'], inputs['interest'], predicted_score
+            )
+        worker_cache.put(key, text)
+    return worker_engine.format_recommendations_html(text)
+
+def score_chunk(chunk_index: int, records: pd.DataFrame, output_dir: str,
+                id_column: Optional[str]) -> Tuple[int, int]:
+    """
+    Score one chunk of raw records and write it as a part file.
+
+    Args:
+        chunk_index: Index of the chunk within the input
+        records: Raw student records
+        output_dir: Directory for the part files
+        id_column: Column copied through to identify each student, if present
+
+    Returns:
+        Tuple of (chunk index, rows written)
+    """
+    from models.recommendations import trajectory_scores
+
+    X, _ = worker_engine.data_preprocessor.transform_fused(records, fit=False)
+    model_scores = worker_engine.ensemble_predictions(X)
+
+    scores = {}
+    if id_column in records.columns:
+        scores[id_column] = records[id_column].to_numpy()
+    for subject in SUBJECTS:
+        predicted, confidence = trajectory_scores(records, subject)
+        if subject in model_scores:
+            scores[f'{subject}_predicted'] = model_scores[subject].astype(np.float32)
+        scores[f'{subject}_trajectory'] = predicted.astype(np.float32)
+        scores[f'{subject}_confidence'] = confidence.astype(np.uint8)
+        if worker_recommendations != 'none':
+            current = records[f'{subject}_marks'].to_numpy(dtype=np.float64)
+            scores[f'{subject}_recommendations'] = [
+                recommend(subject, float(current[i]), float(predicted[i]), row)
+                for i, (_, row) in enumerate(records.iterrows())
+            ]
+
+    # Written under a temporary name first, so a part file is always complete
+    path = os.path.join(output_dir, f"part-{chunk_index:05d}.parquet")
+    pd.DataFrame(scores).to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+    return chunk_index, len(records)
+
+def read_chunks(input_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield raw records from a CSV or Parquet file, ``chunk_size`` rows at a time."""
+    if input_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size, dtype=RAW_DTYPES)
+
+def load_progress(output_dir: str, run: Dict) -> Dict[str, int]:
+    """
+    Read the chunks already finished by an earlier run with the same settings.
+
+    Raises:
+        ValueError: If the output directory holds a run with other settings
+    """
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        progress = json.load(f)
+    if progress['run'] != run:
+        raise ValueError(f"{output_dir} holds a run with different settings or input; "
+                         f"pass --restart to discard it")
+    return progress['completed']
+
+def save_progress(output_dir: str, run: Dict, completed: Dict[str, int]) -> None:
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump({'run': run, 'completed': completed}, f)
+    os.replace(f"{path}.tmp", path)
+
+def score_file(input_path: str, output_dir: str, model_dir: str = "models", chunk_size: int = 50_000,
+               workers: int = None, recommendations: str = 'none',
+               cache_path: str = "data/recommendation_cache.sqlite", id_column: str = 'student_id',
+               restart: bool = False, cascade: bool = False) -> int:
+    """
+    Score every student in ``input_path`` into partitioned Parquet files.
+
+    Args:
+        input_path: CSV or Parquet file of raw student records
+        output_dir: Directory for the part files and progress checkpoint
+        model_dir: Directory holding the trained models and preprocessors
+        chunk_size: Rows per chunk (and per part file)
+        workers: Worker processes (defaults to the CPU count)
+        recommendations: ``none``, ``cached`` or ``live``
+        cache_path: SQLite prompt cache used by ``cached`` and ``live``
+        id_column: Column copied through to identify each student, if present
+        restart: Discard the progress of an earlier run
+        cascade: Predict with the calibrated early-exit cascades
+
+    Returns:
+        int: Rows scored by this call (chunks finished earlier are skipped)
+    """
+    stat = os.stat(input_path)
+    run = {
+        'input': os.path.abspath(input_path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+        'chunk_size': chunk_size, 'recommendations': recommendations, 'model_dir': os.path.abspath(model_dir)
+    }
+    if cascade:
+        run['cascade'] = True
+    os.makedirs(output_dir, exist_ok=True)
+    if restart and os.path.exists(os.path.join(output_dir, PROGRESS_FILE)):
+        os.remove(os.path.join(output_dir, PROGRESS_FILE))
+    completed = load_progress(output_dir, run)
+    if completed:
+        logger.info(f"Resuming: {len(completed)} chunks ({sum(completed.values())} rows) already scored")
+
+    workers = workers or os.cpu_count()
+    scored = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_dir, recommendations, cache_path, cascade)) as executor:
+        pending = set()
+
+        def collect(block: bool) -> None:
+            nonlocal pending, scored
+            done, pending = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_index, rows = future.result()
+                completed[str(chunk_index)] = rows
+                scored += rows
+            if done:
+                save_progress(output_dir, run, completed)
+                logger.info(f"{len(completed)} chunks scored, "
+                            f"{scored / (time.perf_counter() - start) * 60:,.0f} students/minute")
+
+        for chunk_index, records in enumerate(read_chunks(input_path, chunk_size)):
+            if str(chunk_index) in completed:
+                continue
+            # Bound the chunks held in memory while workers catch up
+            while len(pending) >= 2 * workers:
+                collect(block=True)
+            pending.add(executor.submit(score_chunk, chunk_index, records, output_dir, id_column))
+            collect(block=False)
+        while pending:
+            collect(block=True)
+
+    logger.info(f"Scored {scored} students into {output_dir}")
+    return scored
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score a roster of students into partitioned Parquet")
+    parser.add_argument('input', help="CSV or Parquet file of raw student records")
+    parser.add_argument('--output', default="data/scores", help="Directory for part files")
+    parser.add_argument('--model-dir', default="models")
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--recommendations', choices=['none', 'cached', 'live'], default='none',
+                        help="Add recommendations from the prompt cache only, or also from Gemini")
+    parser.add_argument('--recommendation-cache', default="data/recommendation_cache.sqlite")
+    parser.add_argument('--id-column', default='student_id')
+    parser.add_argument('--restart', action='store_true', help="Discard progress from an earlier run")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Predict with the early-exit cascades calibrated by src/models/cascade.py")
+    args = parser.parse_args()
+
+    score_file(args.input, args.output, args.model_dir, args.chunk_size, args.workers,
+               args.recommendations, args.recommendation_cache, args.id_column, args.restart, args.cascade)
@@ -1,35 +1,426 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import xgboost as xgb
-import lightgbm as lgb
-from sklearn.model_selection import cross_val_score, KFold
-import optuna
+from sklearn.metrics import mean_squared_error
 import joblib
 import os
+import sys
+import time
 import logging
-from typing import Dict, Tuple, List
+from typing import Callable, Dict, Tuple, List, Optional, TYPE_CHECKING
 import json
+import hashlib
+from functools import cached_property
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.evaluation import model_input, predict_models, evaluate_predictions, save_metrics
+from models.drift import save_reference
+
+# Optuna, XGBoost and LightGBM are imported where they are used, so loading
+# saved models for inference does not pay for the training-only libraries
+if TYPE_CHECKING:
+    import lightgbm as lgb
+    import optuna
+    import xgboost as xgb
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Dataset-level LightGBM parameters; must stay identical between dataset
+# construction and training, since a constructed Dataset cannot change them.
+LGB_DATASET_PARAMS = {'verbosity': -1}
+
+# Joint XGBoost model: one tree per round predicts every subject target
+MULTI_OUTPUT_XGB_PARAMS = {'tree_method': 'hist', 'multi_strategy': 'multi_output_tree'}
+
+# Hyperparameter search spaces: name -> (type, low, high)
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': ('int', 100, 1000),
+        'max_depth': ('int', 3, 20),
+        'min_samples_split': ('int', 2, 10),
+        'min_samples_leaf': ('int', 1, 5),
+        'max_features': ('float', 0.1, 1.0)
+    },
+    'xgboost': {
+        'max_depth': ('int', 3, 10),
+        'learning_rate': ('float', 0.01, 0.3),
+        'n_estimators': ('int', 100, 1000),
+        'min_child_weight': ('int', 1, 7),
+        'subsample': ('float', 0.6, 0.9),
+        'colsample_bytree': ('float', 0.6, 0.9),
+        'gamma': ('float', 0, 5)
+    },
+    'lightgbm': {
+        'max_depth': ('int', 3, 10),
+        'learning_rate': ('float', 0.01, 0.3),
+        'n_estimators': ('int', 100, 1000),
+        'num_leaves': ('int', 20, 100),
+        'feature_fraction': ('float', 0.6, 0.9),
+        'bagging_fraction': ('float', 0.6, 0.9),
+        'lambda_l1': ('float', 0, 5),
+        'lambda_l2': ('float', 0, 5)
+    }
+}
+
+# Every subject model file a model directory can hold: per-subject models and
+# the multi-output models that replace the per-subject RF/XGBoost models
+SUBJECT_MODEL_NAMES = [
+    f"{subject}_{model_type}"
+    for subject in ['ads', 'ds', 'am', 'java', 'dbms']
+    for model_type in ['rf', 'xgb', 'lgb']
+] + ['multi_rf', 'multi_xgb']
+
+# A warm-started run has caught up once a trial is within this fraction of
+# the previous run's best CV MSE
+WARM_START_TOLERANCE = 0.01
+
+# Default successive-halving rungs: (fraction of training rows, fraction of
+# trees/boosting rounds); the last rung is the full-fidelity objective
+HALVING_SCHEDULE = [(0.25, 0.5), (0.5, 0.5), (1.0, 1.0)]
+
+def suggest_params(trial: 'optuna.Trial', search_space: Dict) -> Dict:
+    """
+    Sample one parameter set from a search space.
+    
+    Args:
+        trial: Optuna trial
+        search_space: Entry of SEARCH_SPACES
+        
+    Returns:
+        Dict: Sampled hyperparameters
+    """
+    return {
+        name: getattr(trial, f'suggest_{kind}')(name, low, high)
+        for name, (kind, low, high) in search_space.items()
+    }
+
+class CVFolds:
+    def __init__(self, X: pd.DataFrame, y: pd.Series, n_splits: int = 5):
+        """
+        Fold indices and native training structures for one target.
+        
+        Built once per target and shared by every Optuna trial, so the
+        DataFrame is converted and the XGBoost/LightGBM histogram bins are
+        computed once per fold instead of once per fold per trial. The
+        per-library structures are built on first use.
+        
+        Args:
+            X: Training features
+            y: Training labels for one target, or a DataFrame of targets
+               for multi-output models (no LightGBM folds)
+            n_splits: Number of folds (unshuffled, as cross_val_score(cv=5))
+        """
+        from sklearn.model_selection import KFold
+        
+        self.feature_names = list(X.columns)
+        self.X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+        self.y = np.asarray(y, dtype=np.float32)
+        self.is_multi_output = self.y.ndim > 1
+        self.n_splits = n_splits
+        self.indices = list(KFold(n_splits=n_splits).split(self.X))
+        self.subsets = {}
+    
+    def subset(self, fraction: float, seed: int = 42) -> 'CVFolds':
+        """
+        Folds over a random fraction of the rows, for low-fidelity search rungs.
+        
+        Built once per fraction and cached, like the per-library structures.
+        
+        Args:
+            fraction: Fraction of the training rows to keep (1.0 returns self)
+            seed: Random seed for the row sample
+        """
+        if fraction >= 1.0:
+            return self
+        if fraction not in self.subsets:
+            n_rows = max(int(len(self.X) * fraction), 2 * self.n_splits)
+            rows = np.sort(np.random.default_rng(seed).choice(len(self.X), n_rows, replace=False))
+            self.subsets[fraction] = CVFolds(
+                pd.DataFrame(self.X[rows], columns=self.feature_names), self.y[rows], self.n_splits
+            )
+        return self.subsets[fraction]
+    
+    @cached_property
+    def arrays(self) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """Per-fold numpy arrays (used directly by Random Forest)."""
+        return [
+            (self.X[train_idx], self.y[train_idx], self.X[valid_idx], self.y[valid_idx])
+            for train_idx, valid_idx in self.indices
+        ]
+    
+    @cached_property
+    def dmatrices(self) -> List[Tuple['xgb.QuantileDMatrix', 'xgb.QuantileDMatrix']]:
+        """Per-fold XGBoost matrices; validation quantiles come from the training fold."""
+        import xgboost as xgb
+        
+        dmatrices = []
+        for X_tr, y_tr, X_va, y_va in self.arrays:
+            dtrain = xgb.QuantileDMatrix(X_tr, label=y_tr, feature_names=self.feature_names)
+            dvalid = xgb.QuantileDMatrix(X_va, label=y_va, feature_names=self.feature_names, ref=dtrain)
+            dmatrices.append((dtrain, dvalid))
+        return dmatrices
+    
+    @cached_property
+    def lgb_datasets(self) -> List[Tuple['lgb.Dataset', 'lgb.Dataset']]:
+        """Per-fold LightGBM datasets; validation bins reference the training fold."""
+        import lightgbm as lgb
+        
+        if self.is_multi_output:
+            raise ValueError("LightGBM has no multi-output objective")
+        
+        lgb_datasets = []
+        for X_tr, y_tr, X_va, y_va in self.arrays:
+            dtrain = lgb.Dataset(
+                X_tr, label=y_tr, feature_name=self.feature_names,
+                params=LGB_DATASET_PARAMS, free_raw_data=False
+            ).construct()
+            dvalid = lgb.Dataset(
+                X_va, label=y_va, feature_name=self.feature_names,
+                reference=dtrain, params=LGB_DATASET_PARAMS, free_raw_data=False
+            ).construct()
+            lgb_datasets.append((dtrain, dvalid))
+        return lgb_datasets
+    
+    def xgb_cv(self, params: Dict) -> float:
+        """
+        Cross-validated MSE of an XGBRegressor parameter set on the cached folds.
+        
+        Mirrors xgb.cv, but trains on the prebuilt per-fold matrices rather
+        than re-slicing a full DMatrix (and re-sketching it) on every call.
+        """
+        import xgboost as xgb
+        
+        params = dict(params)
+        num_boost_round = params.pop('n_estimators')
+        booster_params = {'objective': 'reg:squarederror', 'eval_metric': 'rmse',
+                          'tree_method': 'hist', 'seed': 42, **params}
+        if self.is_multi_output:
+            booster_params.update(MULTI_OUTPUT_XGB_PARAMS)
+        
+        fold_mse = []
+        for dtrain, dvalid in self.dmatrices:
+            evals_result = {}
+            xgb.train(booster_params, dtrain, num_boost_round=num_boost_round,
+                      evals=[(dvalid, 'valid')], evals_result=evals_result,
+                      verbose_eval=False)
+            fold_mse.append(evals_result['valid']['rmse'][-1] ** 2)
+        return float(np.mean(fold_mse))
+    
+    def lgb_cv(self, params: Dict) -> float:
+        """
+        Cross-validated MSE of an LGBMRegressor parameter set on the cached folds.
+        
+        Mirrors lgb.cv, but reuses the constructed per-fold datasets so the
+        feature binning is not recomputed for every trial.
+        """
+        import lightgbm as lgb
+        
+        params = dict(params)
+        num_boost_round = params.pop('n_estimators')
+        booster_params = {'objective': 'regression', 'metric': 'l2',
+                          'seed': 42, **LGB_DATASET_PARAMS, **params}
+        
+        fold_mse = []
+        for dtrain, dvalid in self.lgb_datasets:
+            evals_result = {}
+            lgb.train(booster_params, dtrain, num_boost_round=num_boost_round,
+                      valid_sets=[dvalid], valid_names=['valid'],
+                      callbacks=[lgb.record_evaluation(evals_result)])
+            fold_mse.append(evals_result['valid']['l2'][-1])
+        return float(np.mean(fold_mse))
+    
+    def rf_cv(self, params: Dict) -> float:
+        """Cross-validated MSE of a Random Forest parameter set on the cached fold arrays."""
+        fold_mse = []
+        for X_tr, y_tr, X_va, y_va in self.arrays:
+            model = RandomForestRegressor(**params, random_state=42)
+            model.fit(X_tr, y_tr)
+            fold_mse.append(mean_squared_error(y_va, model.predict(X_va)))
+        return float(np.mean(fold_mse))
+
+def validate_halving(schedule: List[Tuple[float, float]], n_configs: int, reduction_factor: int) -> None:
+    """
+    Check a successive-halving setup before any trial is run.
+    
+    The last rung must score at full fidelity (all rows and trees), since
+    its scores are the study's objective values. Every rung but the last
+    divides the configurations by ``reduction_factor``, so with fewer than
+    ``reduction_factor ** (len(schedule) - 1)`` of them the later rungs
+    re-score a single configuration and the search costs more than a full
+    one.
+    
+    Raises:
+        ValueError: If the schedule or the budget does not fit
+    """
+    if not schedule or tuple(schedule[-1]) != (1.0, 1.0):
+        raise ValueError("The last successive-halving rung must be full fidelity (1:1)")
+    if reduction_factor < 2:
+        raise ValueError(f"Reduction factor must be at least 2, got {reduction_factor}")
+    needed = reduction_factor ** (len(schedule) - 1)
+    if n_configs < needed:
+        raise ValueError(f"Successive halving over {len(schedule)} rungs with reduction factor "
+                         f"{reduction_factor} needs at least {needed} configurations, got {n_configs}")
+
+def successive_halving(study: 'optuna.Study', search_space: Dict, cv: Callable[[CVFolds, Dict], float],
+                       folds: CVFolds, n_configs: int, schedule: List[Tuple[float, float]] = HALVING_SCHEDULE,
+                       reduction_factor: int = 3, user_attrs: Dict = None) -> None:
+    """
+    Run a synchronous successive-halving search inside an Optuna study.
+    
+    Every configuration is scored on the cheapest rung (a row subsample and a
+    fraction of the trees or boosting rounds). Only the best
+    ``1 / reduction_factor`` of them advance to the next, larger rung. Trials
+    eliminated along the way are recorded as pruned with their intermediate
+    scores, and the survivors of the last rung complete with their last-rung
+    score, so ``study.best_params`` is the best configuration of the last rung.
+    A trial enqueued with the ``warm_start`` attribute (the previous run's
+    best) always advances, so a rerun never ends worse than that
+    configuration at full fidelity.
+    
+    Args:
+        study: Study to record the trials in (direction ``minimize``)
+        search_space: Entry of SEARCH_SPACES
+        cv: Scores a parameter set on folds, e.g. ``CVFolds.xgb_cv``
+        folds: Full-fidelity CV folds for the target
+        n_configs: Configurations sampled for the first rung
+        schedule: Rungs as (row fraction, tree/round fraction), cheapest first
+        reduction_factor: Keep one in this many configurations per rung
+        user_attrs: Attributes set on every trial (e.g. the run key)
+    
+    Raises:
+        ValueError: If the setup fails ``validate_halving``
+    """
+    import optuna
+    
+    validate_halving(schedule, n_configs, reduction_factor)
+    trials = [study.ask() for _ in range(n_configs)]
+    for trial in trials:
+        for key, value in (user_attrs or {}).items():
+            trial.set_user_attr(key, value)
+    params = {trial.number: suggest_params(trial, search_space) for trial in trials}
+    for rung, (row_fraction, estimator_fraction) in enumerate(schedule):
+        rung_folds = folds.subset(row_fraction)
+        scores = {}
+        for trial in trials:
+            rung_params = dict(params[trial.number])
+            rung_params['n_estimators'] = max(1, round(rung_params['n_estimators'] * estimator_fraction))
+            scores[trial.number] = cv(rung_folds, rung_params)
+            trial.report(scores[trial.number], rung)
+        logger.info(f"Rung {rung}: {len(trials)} configurations on {len(rung_folds.X)} rows "
+                    f"with {estimator_fraction:.0%} of the trees, best MSE {min(scores.values()):.4f}")
+        if rung == len(schedule) - 1:
+            break
+        
+        trials.sort(key=lambda trial: scores[trial.number])
+        keep = max(1, len(trials) // reduction_factor)
+        eliminated = [trial for trial in trials[keep:] if not trial.user_attrs.get('warm_start')]
+        for trial in eliminated:
+            study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+        trials = [trial for trial in trials if trial not in eliminated]
+    
+    for trial in trials:
+        study.tell(trial, scores[trial.number])
+
+def study_runs(study: 'optuna.Study') -> List[List['optuna.trial.FrozenTrial']]:
+    """Completed trials of a study grouped by their ``run`` attribute, oldest run first."""
+    from optuna.trial import TrialState
+    
+    runs = {}
+    for trial in study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)):
+        runs.setdefault(trial.user_attrs.get('run'), []).append(trial)
+    return sorted(runs.values(), key=lambda trials: trials[0].number)
+
+def run_report(study: 'optuna.Study') -> List[Dict]:
+    """
+    Summarize each run of a persistent study against the run before it.
+    
+    Args:
+        study: Study whose trials carry a ``run`` attribute
+        
+    Returns:
+        List[Dict]: Per run, oldest first: run key, completed trials, best
+        CV MSE, the previous run's best, and how many trials this run took to
+        come within WARM_START_TOLERANCE of it (None if it never did, or for
+        the first run)
+    """
+    report, previous_best = [], None
+    for trials in study_runs(study):
+        values = [trial.value for trial in trials]
+        reached = None
+        if previous_best is not None:
+            reached = next((i + 1 for i, value in enumerate(values)
+                            if value <= previous_best * (1 + WARM_START_TOLERANCE)), None)
+        report.append({
+            'run': trials[0].user_attrs.get('run'),
+            'trials': len(trials),
+            'best_mse': min(values),
+            'previous_best_mse': previous_best,
+            'trials_to_previous_best': reached
+        })
+        previous_best = min(values)
+    return report
+
+def study_report(storage_path: str) -> Dict[str, List[Dict]]:
+    """
+    Run reports of every study persisted in a SQLite storage file.
+    
+    Args:
+        storage_path: SQLite file the studies are stored in
+        
+    Returns:
+        Dict[str, List[Dict]]: ``run_report`` per study name
+    """
+    import optuna
+    
+    storage = f"sqlite:///{storage_path}"
+    return {
+        summary.study_name: run_report(optuna.load_study(study_name=summary.study_name, storage=storage))
+        for summary in optuna.get_all_study_summaries(storage)
+    }
+
 class StudentPerformanceModel:
-    def __init__(self, model_dir: str = "models"):
+    def __init__(self, model_dir: str = "models", multi_output: bool = False,
+                 n_trials: int = 1, search: str = 'full',
+                 halving_schedule: List[Tuple[float, float]] = HALVING_SCHEDULE,
+                 reduction_factor: int = 3, study_storage: Optional[str] = None):
         """
         Initialize the student performance prediction model.
         
         Args:
             model_dir (str): Directory to save trained models
+            multi_output (bool): Train joint Random Forest and XGBoost models
+                over all subject targets instead of one model per subject
+            n_trials (int): Optuna trials per hyperparameter study; with
+                ``search='halving'``, configurations on the first rung
+            search (str): ``full`` scores every trial at full fidelity,
+                ``halving`` runs successive halving over ``halving_schedule``
+            halving_schedule: Rungs as (row fraction, tree/round fraction)
+            reduction_factor (int): Keep one in this many configurations per rung
+            study_storage (str): SQLite file to persist Optuna studies in,
+                one per target and model type (None keeps them in memory)
         """
+        if search not in ('full', 'halving'):
+            raise ValueError(f"Unknown search mode: {search}")
+        if search == 'halving':
+            validate_halving(halving_schedule, n_trials, reduction_factor)
         self.model_dir = model_dir
+        self.multi_output = multi_output
+        self.n_trials = n_trials
+        self.search = search
+        self.halving_schedule = [tuple(rung) for rung in halving_schedule]
+        self.reduction_factor = reduction_factor
+        self.study_storage = study_storage
+        self.checkpoint_dir = os.path.join(model_dir, "checkpoints")
         self.models = {}
         self.subject_models = {}
         self.feature_importance = {}
         self.subject_feature_importance = {}
         os.makedirs(model_dir, exist_ok=True)
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
         
     def load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
         """
@@ -38,109 +429,268 @@ class StudentPerformanceModel:
         Returns:
             Tuple containing training and testing data
         """
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from data_preprocessing.prepare_data import load_processed_dataset
+        
         data_dir = "data/processed"
-        X_train = pd.read_csv(os.path.join(data_dir, "X_train.csv"))
-        X_test = pd.read_csv(os.path.join(data_dir, "X_test.csv"))
-        y_train = pd.read_csv(os.path.join(data_dir, "y_train.csv")).squeeze()
-        y_test = pd.read_csv(os.path.join(data_dir, "y_test.csv")).squeeze()
+        X_train = load_processed_dataset("X_train", data_dir)
+        X_test = load_processed_dataset("X_test", data_dir)
+        y_train = load_processed_dataset("y_train", data_dir).squeeze()
+        y_test = load_processed_dataset("y_test", data_dir).squeeze()
         
         logger.info(f"Loaded data - Train shape: {X_train.shape}, Test shape: {X_test.shape}")
         return X_train, X_test, y_train, y_test
     
-    def optimize_random_forest(self, X_train: pd.DataFrame, y_train: pd.Series) -> Dict:
+    def run_study(self, search_space: Dict, cv: Callable[[CVFolds, Dict], float],
+                  folds: CVFolds, study_name: str = None, run_key: str = None) -> Dict:
+        """
+        Search one model's hyperparameters with the configured search mode.
+        
+        With ``study_storage`` set, the study is stored in SQLite under
+        ``study_name``, and its trials are tagged with ``run_key``. A rerun of
+        the same job resumes with the trials it still needs. A new run, after
+        a change to the data, search space or budget, is seeded by
+        ``enqueue_trial`` with the best parameters of the latest earlier run.
+        
+        Args:
+            search_space: Entry of SEARCH_SPACES
+            cv: Scores a parameter set on folds, e.g. ``CVFolds.xgb_cv``
+            folds: Cached CV folds for this target
+            study_name: Persistent study name (``<target>-<model type>``)
+            run_key: Job key of this run
+            
+        Returns:
+            Dict: Best hyperparameters among this run's trials
+        """
+        import optuna
+        
+        if self.study_storage and study_name:
+            study = optuna.create_study(direction='minimize', study_name=study_name,
+                                        storage=f"sqlite:///{self.study_storage}", load_if_exists=True)
+        else:
+            study = optuna.create_study(direction='minimize')
+        
+        runs = study_runs(study)
+        done = next((trials for trials in runs if trials[0].user_attrs.get('run') == run_key), [])
+        earlier = [trials for trials in runs if trials[0].user_attrs.get('run') != run_key]
+        if earlier and not done:
+            warm_start = min(earlier[-1], key=lambda trial: trial.value).params
+            study.enqueue_trial(warm_start, user_attrs={'run': run_key, 'warm_start': True})
+            logger.info(f"Study {study_name}: warm-starting from the previous run's best parameters")
+        
+        if self.search == 'halving':
+            if not done:
+                successive_halving(study, search_space, cv, folds, self.n_trials,
+                                   self.halving_schedule, self.reduction_factor, {'run': run_key})
+        else:
+            def objective(trial):
+                trial.set_user_attr('run', run_key)
+                return cv(folds, suggest_params(trial, search_space))
+            
+            if done:
+                logger.info(f"Study {study_name}: resuming with {len(done)} of {self.n_trials} trials done")
+            if self.n_trials > len(done):
+                study.optimize(objective, n_trials=self.n_trials - len(done))
+        
+        trials = next(trials for trials in study_runs(study) if trials[0].user_attrs.get('run') == run_key)
+        report = next(entry for entry in run_report(study) if entry['run'] == run_key)
+        if report['previous_best_mse'] is not None:
+            logger.info(f"Study {study_name}: {report['trials_to_previous_best']} trials to come within "
+                        f"{WARM_START_TOLERANCE:.0%} of the previous best MSE {report['previous_best_mse']:.4f}")
+        return min(trials, key=lambda trial: trial.value).params
+    
+    def optimize_random_forest(self, X_train: pd.DataFrame, y_train: pd.Series,
+                               folds: CVFolds = None, study_name: str = None,
+                               run_key: str = None) -> Dict:
         """
         Optimize Random Forest hyperparameters using Optuna.
         
         Args:
             X_train: Training features
             y_train: Training labels
+            folds: Cached CV folds for this target (built if not given)
+            study_name: Persistent study name (``<target>-<model type>``)
+            run_key: Job key tagging this run's trials
             
         Returns:
             Dict: Best hyperparameters
         """
-        def objective(trial):
-            params = {
-                'n_estimators': trial.suggest_int('n_estimators', 100, 1000),
-                'max_depth': trial.suggest_int('max_depth', 3, 20),
-                'min_samples_split': trial.suggest_int('min_samples_split', 2, 10),
-                'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 5),
-                'max_features': trial.suggest_float('max_features', 0.1, 1.0)
-            }
-            
-            model = RandomForestRegressor(**params, random_state=42)
-            scores = cross_val_score(model, X_train, y_train, cv=5, scoring='neg_mean_squared_error')
-            return -scores.mean()
+        if folds is None:
+            folds = CVFolds(X_train, y_train)
         
-        study = optuna.create_study(direction='minimize')
-        study.optimize(objective, n_trials=1)
+        params = self.run_study(SEARCH_SPACES['random_forest'], CVFolds.rf_cv, folds, study_name, run_key)
         
-        logger.info(f"Best Random Forest parameters: {study.best_params}")
-        return study.best_params
+        logger.info(f"Best Random Forest parameters: {params}")
+        return params
     
-    def optimize_xgboost(self, X_train: pd.DataFrame, y_train: pd.Series) -> Dict:
+    def optimize_xgboost(self, X_train: pd.DataFrame, y_train: pd.Series,
+                         folds: CVFolds = None, study_name: str = None,
+                         run_key: str = None) -> Dict:
         """
         Optimize XGBoost hyperparameters using Optuna.
         
         Args:
             X_train: Training features
             y_train: Training labels
+            folds: Cached CV folds for this target (built if not given)
+            study_name: Persistent study name (``<target>-<model type>``)
+            run_key: Job key tagging this run's trials
             
         Returns:
             Dict: Best hyperparameters
         """
-        def objective(trial):
-            params = {
-                'max_depth': trial.suggest_int('max_depth', 3, 10),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'n_estimators': trial.suggest_int('n_estimators', 100, 1000),
-                'min_child_weight': trial.suggest_int('min_child_weight', 1, 7),
-                'subsample': trial.suggest_float('subsample', 0.6, 0.9),
-                'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 0.9),
-                'gamma': trial.suggest_float('gamma', 0, 5)
-            }
-            
-            model = xgb.XGBRegressor(**params, random_state=42)
-            scores = cross_val_score(model, X_train, y_train, cv=5, scoring='neg_mean_squared_error')
-            return -scores.mean()
+        if folds is None:
+            folds = CVFolds(X_train, y_train)
         
-        study = optuna.create_study(direction='minimize')
-        study.optimize(objective, n_trials=1)
+        params = self.run_study(SEARCH_SPACES['xgboost'], CVFolds.xgb_cv, folds, study_name, run_key)
         
-        logger.info(f"Best XGBoost parameters: {study.best_params}")
-        return study.best_params
+        logger.info(f"Best XGBoost parameters: {params}")
+        return params
     
-    def optimize_lightgbm(self, X_train: pd.DataFrame, y_train: pd.Series) -> Dict:
+    def optimize_lightgbm(self, X_train: pd.DataFrame, y_train: pd.Series,
+                          folds: CVFolds = None, study_name: str = None,
+                         run_key: str = None) -> Dict:
         """
         Optimize LightGBM hyperparameters using Optuna.
         
         Args:
             X_train: Training features
             y_train: Training labels
+            folds: Cached CV folds for this target (built if not given)
+            study_name: Persistent study name (``<target>-<model type>``)
+            run_key: Job key tagging this run's trials
             
         Returns:
             Dict: Best hyperparameters
         """
-        def objective(trial):
-            params = {
-                'max_depth': trial.suggest_int('max_depth', 3, 10),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'n_estimators': trial.suggest_int('n_estimators', 100, 1000),
-                'num_leaves': trial.suggest_int('num_leaves', 20, 100),
-                'feature_fraction': trial.suggest_float('feature_fraction', 0.6, 0.9),
-                'bagging_fraction': trial.suggest_float('bagging_fraction', 0.6, 0.9),
-                'lambda_l1': trial.suggest_float('lambda_l1', 0, 5),
-                'lambda_l2': trial.suggest_float('lambda_l2', 0, 5)
-            }
+        if folds is None:
+            folds = CVFolds(X_train, y_train)
+        
+        params = self.run_study(SEARCH_SPACES['lightgbm'], CVFolds.lgb_cv, folds, study_name, run_key)
+        
+        logger.info(f"Best LightGBM parameters: {params}")
+        return params
+    
+    def job_key(self, model_type: str, X_train: pd.DataFrame, y) -> str:
+        """
+        Content hash identifying one tune-and-fit job.
+        
+        Covers the training data, the feature list, the hyperparameter
+        search space, trial budget and search mode, so a changed input
+        yields a new key.
+        
+        Args:
+            model_type: Key of SEARCH_SPACES
+            X_train: Training features
+            y: Training labels (Series, or DataFrame for multi-output)
             
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(X_train, index=False).values.tobytes())
+        digest.update(pd.util.hash_pandas_object(pd.DataFrame(y), index=False).values.tobytes())
+        digest.update(json.dumps({
+            'model_type': model_type,
+            'features': list(X_train.columns),
+            'search_space': SEARCH_SPACES[model_type],
+            'n_trials': self.n_trials,
+            # Only successive halving adds settings, so full-search keys are unchanged
+            **({'halving_schedule': self.halving_schedule, 'reduction_factor': self.reduction_factor}
+               if self.search == 'halving' else {})
+        }, sort_keys=True).encode())
+        return digest.hexdigest()[:16]
+    
+    def train_checkpointed(self, name: str, model_type: str, X_train: pd.DataFrame, y,
+                           folds: CVFolds):
+        """
+        Tune and fit one model, persisting it as soon as it finishes.
+        
+        The artifact is stored under its job key in ``checkpoint_dir``; if it
+        already exists the job is skipped and the saved model returned, so an
+        interrupted or repeated run only redoes the missing work.
+        
+        Args:
+            name: Model name (e.g. ``ads_xgb``), used in the file name
+            model_type: One of ``random_forest``, ``xgboost``, ``lightgbm``
+            X_train: Training features
+            y: Training labels (Series, or DataFrame for multi-output)
+            folds: Cached CV folds for this target
+            
+        Returns:
+            The fitted model
+        """
+        key = self.job_key(model_type, X_train, y)
+        checkpoint_path = os.path.join(self.checkpoint_dir, f"{name}-{key}.joblib")
+        if os.path.exists(checkpoint_path):
+            logger.info(f"Reusing checkpoint {checkpoint_path}")
+            return joblib.load(checkpoint_path)
+        
+        import lightgbm as lgb
+        import xgboost as xgb
+        
+        # One persistent study per target and model type (overall models are named by type)
+        target = 'overall' if name == model_type else name.rsplit('_', 1)[0]
+        study = {'study_name': f"{target}-{model_type}", 'run_key': key}
+        if model_type == 'random_forest':
+            params = self.optimize_random_forest(X_train, y, folds, **study)
+            model = RandomForestRegressor(**params, random_state=42)
+        elif model_type == 'xgboost':
+            params = self.optimize_xgboost(X_train, y, folds, **study)
+            if folds.is_multi_output:
+                params.update(MULTI_OUTPUT_XGB_PARAMS)
+            model = xgb.XGBRegressor(**params, random_state=42)
+        else:
+            params = self.optimize_lightgbm(X_train, y, folds, **study)
             model = lgb.LGBMRegressor(**params, random_state=42)
-            scores = cross_val_score(model, X_train, y_train, cv=5, scoring='neg_mean_squared_error')
-            return -scores.mean()
+        model.fit(X_train, y)
+        
+        # Write to a temporary file first so a crash never leaves a partial artifact
+        tmp_path = f"{checkpoint_path}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, checkpoint_path)
+        return model
+    
+    def train_multi_output_models(self, X_train: pd.DataFrame, y_train: pd.DataFrame) -> None:
+        """
+        Train joint models that predict every subject target at once.
+        
+        Random Forest and XGBoost learn all five targets from shared split
+        searches and are stored as ``multi_rf``/``multi_xgb``. LightGBM has no
+        multi-output objective, so its per-subject models are still trained.
+        
+        Args:
+            X_train: Training features
+            y_train: Training labels for each subject
+        """
+        subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        y_subjects = y_train[[f'{subject}_performance' for subject in subjects]]
+        
+        logger.info("Training multi-output models for all subjects")
+        folds = CVFolds(X_train, y_subjects)
+        
+        # Train Random Forest (natively multi-output) and XGBoost (multi-target trees)
+        self.subject_models['multi_rf'] = self.train_checkpointed(
+            'multi_rf', 'random_forest', X_train, y_subjects, folds
+        )
+        self.subject_models['multi_xgb'] = self.train_checkpointed(
+            'multi_xgb', 'xgboost', X_train, y_subjects, folds
+        )
         
-        study = optuna.create_study(direction='minimize')
-        study.optimize(objective, n_trials=1)
+        # Train LightGBM per subject
+        for subject in subjects:
+            y_subject = y_train[f'{subject}_performance']
+            self.subject_models[f'{subject}_lgb'] = self.train_checkpointed(
+                f'{subject}_lgb', 'lightgbm', X_train, y_subject, CVFolds(X_train, y_subject)
+            )
         
-        logger.info(f"Best LightGBM parameters: {study.best_params}")
-        return study.best_params
+        # Store feature importance
+        for model_name, model in self.subject_models.items():
+            if hasattr(model, 'feature_importances_'):
+                self.subject_feature_importance[model_name] = {
+                    feature: float(importance)
+                    for feature, importance in zip(X_train.columns, model.feature_importances_)
+                }
     
     def train_subject_models(self, X_train: pd.DataFrame, y_train: pd.DataFrame) -> None:
         """
@@ -150,6 +700,10 @@ class StudentPerformanceModel:
             X_train: Training features
             y_train: Training labels for each subject
         """
+        if self.multi_output:
+            self.train_multi_output_models(X_train, y_train)
+            return
+        
         subjects = ['ads', 'ds', 'am', 'java', 'dbms']
         
         for subject in subjects:
@@ -158,20 +712,14 @@ class StudentPerformanceModel:
             # Get subject-specific target
             y_subject = y_train[f'{subject}_performance']
             
-            # Train Random Forest
-            rf_params = self.optimize_random_forest(X_train, y_subject)
-            self.subject_models[f'{subject}_rf'] = RandomForestRegressor(**rf_params, random_state=42)
-            self.subject_models[f'{subject}_rf'].fit(X_train, y_subject)
+            # Build CV folds once and share them across all three studies
+            folds = CVFolds(X_train, y_subject)
             
-            # Train XGBoost
-            xgb_params = self.optimize_xgboost(X_train, y_subject)
-            self.subject_models[f'{subject}_xgb'] = xgb.XGBRegressor(**xgb_params, random_state=42)
-            self.subject_models[f'{subject}_xgb'].fit(X_train, y_subject)
-            
-            # Train LightGBM
-            lgb_params = self.optimize_lightgbm(X_train, y_subject)
-            self.subject_models[f'{subject}_lgb'] = lgb.LGBMRegressor(**lgb_params, random_state=42)
-            self.subject_models[f'{subject}_lgb'].fit(X_train, y_subject)
+            # Train Random Forest, XGBoost and LightGBM
+            for model_type, suffix in [('random_forest', 'rf'), ('xgboost', 'xgb'), ('lightgbm', 'lgb')]:
+                self.subject_models[f'{subject}_{suffix}'] = self.train_checkpointed(
+                    f'{subject}_{suffix}', model_type, X_train, y_subject, folds
+                )
             
             # Store feature importance
             for model_name, model in self.subject_models.items():
@@ -194,65 +742,70 @@ class StudentPerformanceModel:
         
         # Train overall performance model
         y_overall = y_train.mean(axis=1)
+        folds = CVFolds(X_train, y_overall)
         
-        # Train Random Forest
-        rf_params = self.optimize_random_forest(X_train, y_overall)
-        self.models['random_forest'] = RandomForestRegressor(**rf_params, random_state=42)
-        self.models['random_forest'].fit(X_train, y_overall)
-        
-        # Train XGBoost
-        xgb_params = self.optimize_xgboost(X_train, y_overall)
-        self.models['xgboost'] = xgb.XGBRegressor(**xgb_params, random_state=42)
-        self.models['xgboost'].fit(X_train, y_overall)
-        
-        # Train LightGBM
-        lgb_params = self.optimize_lightgbm(X_train, y_overall)
-        self.models['lightgbm'] = lgb.LGBMRegressor(**lgb_params, random_state=42)
-        self.models['lightgbm'].fit(X_train, y_overall)
+        # Train Random Forest, XGBoost and LightGBM
+        for model_type in ['random_forest', 'xgboost', 'lightgbm']:
+            self.models[model_type] = self.train_checkpointed(
+                model_type, model_type, X_train, y_overall, folds
+            )
         
         logger.info("All models trained successfully")
     
-    def evaluate_models(self, X_test: pd.DataFrame, y_test: pd.DataFrame) -> Dict:
+    def evaluate_models(self, X_test: pd.DataFrame, y_test: pd.DataFrame, n_bootstrap: int = 0,
+                        confidence: float = 0.95, n_jobs: Optional[int] = None) -> Dict:
         """
         Evaluate all models on test data.
         
+        Every model predicts the test set in parallel; the predictions are
+        stacked into one matrix and scored in a single vectorized pass.
+        
         Args:
             X_test: Test features
             y_test: Test labels (DataFrame with subject-wise targets)
+            n_bootstrap: Bootstrap resamples for RMSE/MAE/R² confidence
+                intervals (0 disables them)
+            confidence: Two-sided confidence level of the intervals
+            n_jobs: Prediction threads (defaults to one per model)
             
         Returns:
             Dict: Evaluation metrics for each model
         """
-        metrics = {}
-        
-        # Evaluate subject-specific models
         subjects = ['ads', 'ds', 'am', 'java', 'dbms']
+        predictions = predict_models({**self.subject_models, **self.models}, X_test, n_jobs)
+        
+        # One (metric name, model, output index, target) entry per evaluated column
+        columns = []
         for subject in subjects:
-            y_subject = y_test[f'{subject}_performance']
-            
             for model_type in ['rf', 'xgb', 'lgb']:
                 model_name = f"{subject}_{model_type}"
-                if model_name in self.subject_models:
-                    y_pred = self.subject_models[model_name].predict(X_test)
-                    
-                    metrics[model_name] = {
-                        'mse': float(mean_squared_error(y_subject, y_pred)),
-                        'rmse': float(np.sqrt(mean_squared_error(y_subject, y_pred))),
-                        'mae': float(mean_absolute_error(y_subject, y_pred)),
-                        'r2': float(r2_score(y_subject, y_pred))
-                    }
+                if model_name in predictions:
+                    columns.append((model_name, model_name, None, f'{subject}_performance'))
         
-        # Evaluate overall performance models
-        y_overall = y_test.mean(axis=1)
-        for name, model in self.models.items():
-            y_pred = model.predict(X_test)
-            
-            metrics[name] = {
-                'mse': float(mean_squared_error(y_overall, y_pred)),
-                'rmse': float(np.sqrt(mean_squared_error(y_overall, y_pred))),
-                'mae': float(mean_absolute_error(y_overall, y_pred)),
-                'r2': float(r2_score(y_overall, y_pred))
-                }
+        # Multi-output models cover every subject with one predict call
+        for model_type in ['rf', 'xgb']:
+            model_name = f"multi_{model_type}"
+            if model_name in predictions:
+                for i, subject in enumerate(subjects):
+                    columns.append((f"{subject}_{model_name}", model_name, i, f'{subject}_performance'))
+        
+        # Overall performance models
+        for name in self.models:
+            columns.append((name, name, None, None))
+        
+        if not columns:
+            return {}
+        
+        targets = y_test.astype(np.float64)
+        targets['overall'] = targets.mean(axis=1)
+        Y = np.column_stack([targets[target or 'overall'].to_numpy() for _, _, _, target in columns])
+        P = np.column_stack([
+            predictions[model_name] if index is None else predictions[model_name][:, index]
+            for _, model_name, index, _ in columns
+        ])
+        
+        metrics = evaluate_predictions([name for name, _, _, _ in columns], Y, P,
+                                       n_bootstrap=n_bootstrap, confidence=confidence)
         
         logger.info("Model evaluation completed")
         return metrics
@@ -267,6 +820,15 @@ class StudentPerformanceModel:
         for name, model in self.subject_models.items():
             joblib.dump(model, os.path.join(self.model_dir, f"{name}.joblib"))
         
+        # Remove subject models this run did not produce, e.g. multi_* files
+        # left by a --multi-output run, which serving would otherwise prefer
+        # over the per-subject models just trained (and vice versa)
+        for name in SUBJECT_MODEL_NAMES:
+            path = os.path.join(self.model_dir, f"{name}.joblib")
+            if name not in self.subject_models and os.path.exists(path):
+                os.remove(path)
+                logger.info(f"Removed stale model {path}")
+        
         # Save feature importance
         with open(os.path.join(self.model_dir, "feature_importance.json"), 'w') as f:
             json.dump(self.feature_importance, f)
@@ -276,10 +838,214 @@ class StudentPerformanceModel:
         
         logger.info("Models and metadata saved successfully")
     
-    def train_and_evaluate(self) -> Dict:
+    def load_training_state(self, n_records_default: int) -> Dict:
+        """
+        Load bookkeeping about the data the saved models were trained on.
+        
+        Args:
+            n_records_default: Raw record count to assume if no state was saved
+            
+        Returns:
+            Dict: Training state (``n_records`` raw rows consumed so far and
+            ``incremental_rounds`` since the last full training)
+        """
+        state_path = os.path.join(self.model_dir, "training_state.json")
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                return json.load(f)
+        return {'n_records': n_records_default}
+    
+    def save_training_state(self, state: Dict) -> None:
+        """Save bookkeeping about the data the saved models were trained on."""
+        with open(os.path.join(self.model_dir, "training_state.json"), 'w') as f:
+            json.dump(state, f)
+    
+    def load_trained_models(self) -> None:
+        """Load models and feature importance saved by a previous run."""
+        for name in ['random_forest', 'xgboost', 'lightgbm']:
+            model_path = os.path.join(self.model_dir, f"{name}.joblib")
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found: {model_path}. Please run a full training first.")
+            self.models[name] = joblib.load(model_path)
+        
+        for name in SUBJECT_MODEL_NAMES:
+            model_path = os.path.join(self.model_dir, f"{name}.joblib")
+            if os.path.exists(model_path):
+                self.subject_models[name] = joblib.load(model_path)
+        
+        for attr, file in [('feature_importance', "feature_importance.json"),
+                           ('subject_feature_importance', "subject_feature_importance.json")]:
+            path = os.path.join(self.model_dir, file)
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    setattr(self, attr, json.load(f))
+        
+        logger.info(f"Loaded {len(self.models) + len(self.subject_models)} trained models")
+    
+    def load_new_records(self, n_records_seen: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Preprocess raw records appended since the last training run.
+        
+        Uses the preprocessors saved alongside the models so the new rows are
+        encoded and scaled exactly like the original training data.
+        
+        Args:
+            n_records_seen: Number of raw records already used for training
+            
+        Returns:
+            Tuple of new features and subject-wise targets
+        """
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from data_preprocessing.prepare_data import DataPreprocessor
+        
+        preprocessor = DataPreprocessor("data/raw")
+        preprocessor.load_preprocessors(self.model_dir)
+        records = preprocessor.load_data().iloc[n_records_seen:]
+        if records.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        
+        return preprocessor.transform_records(records)
+    
+    @staticmethod
+    def continue_training(model, X: pd.DataFrame, y, extra_rounds: int, extra_trees: int):
+        """
+        Continue training a fitted model on new data, reusing its hyperparameters.
+        
+        Boosted models get ``extra_rounds`` more rounds on top of the existing
+        booster; random forests grow ``extra_trees`` more trees via warm_start.
+        
+        Args:
+            model: Fitted RandomForestRegressor, XGBRegressor or LGBMRegressor
+            X: New training features
+            y: New training labels
+            extra_rounds: Boosting rounds to add
+            extra_trees: Trees to add to a random forest
+            
+        Returns:
+            The updated model
+        """
+        if isinstance(model, RandomForestRegressor):
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_trees)
+            return model.fit(X, y)
+        
+        import lightgbm as lgb
+        import xgboost as xgb
+        
+        params = model.get_params()
+        params['n_estimators'] = extra_rounds
+        if isinstance(model, xgb.XGBRegressor):
+            return xgb.XGBRegressor(**params).fit(X, y, xgb_model=model.get_booster())
+        return lgb.LGBMRegressor(**params).fit(X, y, init_model=model.booster_)
+    
+    def _training_target(self, name: str, y: pd.DataFrame):
+        """Return the target a saved model was trained on, given subject-wise labels."""
+        if name in self.models:
+            return y.mean(axis=1)
+        if name.startswith('multi_'):
+            return y[[f'{subject}_performance' for subject in ['ads', 'ds', 'am', 'java', 'dbms']]]
+        return y[f"{name.split('_')[0]}_performance"]
+    
+    def train_incremental_and_evaluate(self, extra_rounds: int = 50, extra_trees: int = 50,
+                                       compare_full: bool = False, n_bootstrap: int = 0) -> Dict:
+        """
+        Continue training the saved models on records appended since the last run.
+        
+        The new records are appended to the processed training split, so
+        later runs and tools (evaluation, compression, feature selection)
+        see the rows the models were trained on. A later prepare_data.py run
+        re-splits all raw records and needs a full retrain afterwards.
+        
+        Args:
+            extra_rounds: Boosting rounds to add to XGBoost/LightGBM models
+            extra_trees: Trees to add to Random Forest models
+            compare_full: Also refit every model from scratch on old + new data
+                with the same hyperparameters and report the RMSE difference
+            n_bootstrap: Bootstrap resamples for metric confidence intervals
+            
+        Returns:
+            Dict: Evaluation metrics for all models
+        """
+        X_train, X_test, y_train, y_test = self.load_data()
+        state = self.load_training_state(len(X_train) + len(X_test))
+        X_new, y_new = self.load_new_records(state['n_records'])
+        
+        self.load_trained_models()
+        if X_new.empty:
+            logger.info("No new records since the last training run")
+            return self.evaluate_models(X_test, y_test, n_bootstrap=n_bootstrap)
+        logger.info(f"Incremental training on {len(X_new)} new records")
+        
+        # Unfitted copies with the previous hyperparameters, for the full-retrain comparison
+        all_models = {**self.models, **self.subject_models}
+        fresh_models = {name: clone(model) for name, model in all_models.items()}
+        
+        start = time.perf_counter()
+        for name, model in all_models.items():
+            updated = self.continue_training(model, model_input(model, X_new), self._training_target(name, y_new),
+                                             extra_rounds, extra_trees)
+            if name in self.models:
+                self.models[name] = updated
+            else:
+                self.subject_models[name] = updated
+        logger.info(f"Incremental training finished in {time.perf_counter() - start:.2f}s")
+        
+        metrics = self.evaluate_models(X_test, y_test, n_bootstrap=n_bootstrap)
+        
+        if compare_full:
+            X_full = pd.concat([X_train, X_new], ignore_index=True)
+            y_full = pd.concat([y_train, y_new], ignore_index=True)
+            
+            full = StudentPerformanceModel(self.model_dir)
+            start = time.perf_counter()
+            for name, model in fresh_models.items():
+                model.fit(model_input(all_models[name], X_full), self._training_target(name, y_full))
+                if name in self.models:
+                    full.models[name] = model
+                else:
+                    full.subject_models[name] = model
+            logger.info(f"Full retrain finished in {time.perf_counter() - start:.2f}s")
+            
+            full_metrics = full.evaluate_models(X_test, y_test)
+            for name, model_metrics in metrics.items():
+                model_metrics['full_retrain_rmse'] = full_metrics[name]['rmse']
+                model_metrics['rmse_delta_vs_full'] = model_metrics['rmse'] - full_metrics[name]['rmse']
+        
+        self.save_models()
+        save_reference(pd.concat([X_train, X_new], ignore_index=True), self.model_dir)
+        
+        # Only the rows the processed split does not hold yet, so a rerun
+        # after an interrupted run does not append them twice
+        from data_preprocessing.prepare_data import append_processed_datasets
+        missing = min(state['n_records'] + len(X_new) - (len(X_train) + len(X_test)), len(X_new))
+        if missing > 0:
+            append_processed_datasets({'X_train': X_new.iloc[len(X_new) - missing:],
+                                       'y_train': y_new.iloc[len(y_new) - missing:]})
+        self.save_training_state({'n_records': state['n_records'] + len(X_new),
+                                  'incremental_rounds': state.get('incremental_rounds', 0) + 1})
+        
+        return metrics
+    
+    def evaluate_saved_models(self, n_bootstrap: int = 0) -> Dict:
+        """
+        Evaluate the models saved by a previous run without retraining.
+        
+        Args:
+            n_bootstrap: Bootstrap resamples for metric confidence intervals
+            
+        Returns:
+            Dict: Evaluation metrics for all models
+        """
+        _, X_test, _, y_test = self.load_data()
+        self.load_trained_models()
+        return self.evaluate_models(X_test, y_test, n_bootstrap=n_bootstrap)
+    
+    def train_and_evaluate(self, n_bootstrap: int = 0) -> Dict:
         """
         Train and evaluate all models.
         
+        Args:
+            n_bootstrap: Bootstrap resamples for metric confidence intervals
+            
         Returns:
             Dict: Evaluation metrics for all models
         """
@@ -290,17 +1056,89 @@ class StudentPerformanceModel:
         self.train_models(X_train, y_train)
         
         # Evaluate models
-        metrics = self.evaluate_models(X_test, y_test)
+        metrics = self.evaluate_models(X_test, y_test, n_bootstrap=n_bootstrap)
         
         # Save models
         self.save_models()
+        save_reference(X_train, self.model_dir)
+        self.save_training_state({'n_records': len(X_train) + len(X_test)})
         
         return metrics
 
+def parse_rung(text: str) -> Tuple[float, float]:
+    """Parse a ``rows:trees`` successive-halving rung, e.g. ``0.25:0.1``."""
+    import argparse
+    
+    try:
+        rows, trees = (float(part) for part in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected rows:trees fractions, got {text!r}")
+    if not (0 < rows <= 1 and 0 < trees <= 1):
+        raise argparse.ArgumentTypeError(f"Rung fractions must be in (0, 1], got {text!r}")
+    return rows, trees
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train student performance models")
+    parser.add_argument('--multi-output', action='store_true',
+                        help="Train joint multi-output RF/XGBoost models for the subject targets")
+    parser.add_argument('--n-trials', type=int, default=1,
+                        help="Optuna trials per hyperparameter study (first-rung configurations with --search halving)")
+    parser.add_argument('--search', choices=['full', 'halving'], default='full',
+                        help="Score every trial at full fidelity, or run successive halving")
+    parser.add_argument('--halving-schedule', type=parse_rung, nargs='+', default=HALVING_SCHEDULE,
+                        metavar='ROWS:TREES',
+                        help="Successive-halving rungs as fractions of training rows and trees/rounds")
+    parser.add_argument('--reduction-factor', type=int, default=3,
+                        help="Keep one in this many configurations per successive-halving rung")
+    parser.add_argument('--study-storage', default=os.path.join("models", "studies.sqlite"),
+                        help="SQLite file persisting the Optuna studies across runs ('' keeps them in memory)")
+    parser.add_argument('--study-report', action='store_true',
+                        help="Report how many trials each run needed to reach the previous run's best, then exit")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue training the saved models on newly appended records")
+    parser.add_argument('--extra-rounds', type=int, default=50,
+                        help="Boosting rounds added per model in incremental mode")
+    parser.add_argument('--extra-trees', type=int, default=50,
+                        help="Trees added per random forest in incremental mode")
+    parser.add_argument('--compare-full', action='store_true',
+                        help="In incremental mode, also report RMSE against a full retrain")
+    parser.add_argument('--evaluate-only', action='store_true',
+                        help="Evaluate the saved models without training")
+    parser.add_argument('--bootstrap', type=int, default=1000,
+                        help="Bootstrap resamples for metric confidence intervals (0 disables them)")
+    parser.add_argument('--metrics-output', default=os.path.join("models", "evaluation.json"),
+                        help="JSON file the evaluation metrics are written to")
+    args = parser.parse_args()
+    
+    if args.study_report:
+        print(f"{'study':<28}{'run':<18}{'trials':>7}{'best MSE':>11}{'previous':>11}{'trials to 1%':>14}")
+        for study_name, runs in study_report(args.study_storage).items():
+            for run in runs:
+                previous = run['previous_best_mse']
+                print(f"{study_name:<28}{str(run['run']):<18}{run['trials']:>7}{run['best_mse']:>11.4f}"
+                      f"{'-' if previous is None else f'{previous:.4f}':>11}"
+                      f"{str(run['trials_to_previous_best'] or '-'):>14}")
+        sys.exit(0)
+    
     # Initialize and train models
-    model = StudentPerformanceModel()
-    metrics = model.train_and_evaluate()
+    try:
+        model = StudentPerformanceModel(multi_output=args.multi_output, n_trials=args.n_trials,
+                                        search=args.search, halving_schedule=args.halving_schedule,
+                                        reduction_factor=args.reduction_factor,
+                                        study_storage=args.study_storage or None)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.evaluate_only:
+        metrics = model.evaluate_saved_models(args.bootstrap)
+    elif args.incremental:
+        metrics = model.train_incremental_and_evaluate(
+            args.extra_rounds, args.extra_trees, args.compare_full, args.bootstrap
+        )
+    else:
+        metrics = model.train_and_evaluate(args.bootstrap)
+    save_metrics(metrics, args.metrics_output, args.bootstrap)
     
     # Print evaluation metrics
     print("\nModel Evaluation Metrics:")